@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+# numpy for array tasks
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+# plotting tools
+import matplotlib.pyplot as plt
+# rent vs buy model
+from rent_vs_buy import ANNUAL_RATES, calc_params, get_user_input, \
+    init_params
+
+
+def load_history(path):
+    '''
+    loads annual history from a CSV file with a header row and the columns
+    year, int_rate, home_appr, rent_appr and inv_ret, all rates in %
+
+    Parameters
+    ----------
+    path: str
+        CSV file to read
+
+    Returns
+    -------
+    hist: dict
+        year and annual rates, one entry per year in increasing order
+    '''
+
+    data = np.genfromtxt(path, delimiter=',', names=True)
+    data = data[np.argsort(data['year'])]
+
+    hist = {'year': data['year'].astype(int)}
+    for key in ANNUAL_RATES:
+        hist[key] = data[key]
+
+    return hist
+
+
+def backtest(params, hist):
+    '''
+    Evaluates the rent vs buy model for every start year of the history at
+    once. The annual rates of the windows of params['yrs'] years are
+    sliding window views of the history, so no window is copied, and all
+    the windows are computed in one vectorized calc_params call.
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input, without the
+        annual rates
+    hist: dict
+        annual history from load_history
+
+    Returns
+    -------
+    params: dict
+        inputs and monthly results with one scenario per start year, and
+        start_year holding the first year of every window
+    '''
+
+    yrs = params['yrs']
+    if len(hist['year']) < yrs:
+        raise ValueError('history of %d years is shorter than the %d years '
+                         'to model' % (len(hist['year']), yrs))
+
+    # windows x years views into the history
+    params = dict(params)
+    for key in ANNUAL_RATES:
+        params[key] = sliding_window_view(hist[key], yrs)
+    params['start_year'] = hist['year'][:len(hist['year']) - yrs + 1]
+
+    params = init_params(params)
+    params = calc_params(params)
+
+    return params
+
+
+def main():
+    '''
+    Backtests the decision of buying vs renting over history - for every
+    start year, how buying and renting would have done over the years
+    modeled given the historical interest rates, home and rent appreciation
+    and investment returns.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('history', help='CSV file with year, int_rate, '
+                        'home_appr, rent_appr and inv_ret columns')
+    args = parser.parse_args()
+
+    hist = load_history(args.history)
+
+    # collect user input of the parameters, with the rates from history
+    params = backtest(get_user_input(rates=False), hist)
+
+    monthly = params['monthly']
+    worth_buy = monthly['mon_worth_buy_sell'][:, -1]
+    worth_rent = monthly['mon_worth_rent'][:, -1]
+
+    print('\n' + '-'*60)
+    print('%10s %18s %18s %10s' % ('Start year', 'Buying', 'Renting',
+                                   'Better'))
+    print('-'*60)
+    for year, buy, rent in zip(params['start_year'], worth_buy, worth_rent):
+        print('%10d %18.2f %18.2f %10s'
+              % (year, buy, rent, 'Buying' if buy > rent else 'Renting'))
+    print('-'*60)
+    print('Buying was better in %d of %d windows'
+          % (np.count_nonzero(worth_buy > worth_rent), len(worth_buy)))
+
+    # plot net worth after the modeled years against start year
+    plt.plot(params['start_year'], worth_buy, label='Buying', linestyle='--')
+    plt.plot(params['start_year'], worth_rent, label='Renting',
+             linestyle='-.')
+    plt.ylabel('Net worth after %d years [$]' % params['yrs'])
+    plt.xlabel('Start year')
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == '__main__':
+    main()
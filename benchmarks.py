@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+# budget files
+import json
+# every measurement runs in a fresh worker process
+import multiprocessing
+# excel writers print progress and write to a scratch directory
+import contextlib
+import os
+import tempfile
+# resident set size and memory tracing
+import resource
+import sys
+import time
+import tracemalloc
+# numpy for array tasks
+import numpy as np
+# models and writers being measured
+from housing_core import calc_affordability, calc_lifetime, calc_schedule
+import mortgage_calculator
+import pipeline
+from rent_vs_buy import calc_params, init_params, write_to_excel
+
+MB = 2**20
+
+# horizons (years) and batch sizes (scenarios) measured by default
+HORIZONS = (10, 30, 50)
+BATCHES = (1, 100, 1000)
+
+# memory budget (MB) of every case, for the larger of the traced peak and
+# the growth of the peak resident set size - about twice what the largest
+# default size takes
+BUDGETS = {'rent_vs_buy': 256,
+           'schedule': 64,
+           'affordability': 32,
+           'rent_vs_buy_excel': 32,
+           'mortgage_excel': 32}
+
+
+def scenario(batch, yrs):
+    '''
+    rent vs buy inputs of a batch of scenarios with different home values
+
+    Parameters
+    ----------
+    batch: int
+        number of scenarios
+    yrs: int
+        number of years to model
+
+    Returns
+    -------
+    params: dict
+        rent vs buy inputs
+    '''
+
+    home_val = np.linspace(5e5, 2e6, batch)
+    return {'home_val': home_val, 'down_pay': 0.2 * home_val,
+            'loan_amt': 0.8 * home_val, 'loan_term': 30, 'extra_pay': 0,
+            'hoa': 500, 'maint': 300, 'prop_tax': 1.25, 'tax_bkt': 30,
+            'rent': 3000, 'yrs': yrs, 'int_rate': np.full(yrs, 6.0),
+            'home_appr': np.full(yrs, 3.0), 'rent_appr': np.full(yrs, 3.0),
+            'inv_ret': np.full(yrs, 7.0)}
+
+
+def run_rent_vs_buy(batch, yrs):
+    '''
+    init_params and calc_params of a batch of scenarios
+    '''
+    return calc_params(init_params(scenario(batch, yrs)))
+
+
+def run_schedule(batch, yrs):
+    '''
+    calc_schedule of a batch of loans with a term of yrs
+    '''
+    return calc_schedule(np.linspace(2e5, 1e6, batch), yrs, 6.5)
+
+
+def run_affordability(batch, yrs):
+    '''
+    affordability grid and lifetime aggregates of batch home values by 100
+    interest rates, with a loan term of yrs
+    '''
+    home_val = np.linspace(5e5, 2e6, batch)[:, None]
+    int_rate = np.linspace(3, 8, 100)[None, :]
+    res = calc_affordability(home_val, 0.2 * home_val, yrs, int_rate, 500,
+                             300, 1.25)
+    res.update(calc_lifetime(0.8 * home_val, yrs, int_rate))
+    return res
+
+
+def run_rent_vs_buy_excel(batch, yrs):
+    '''
+    write_to_excel of a single scenario
+    '''
+    params = calc_params(init_params(scenario(1, yrs)))
+    params['monthly'] = params['monthly'].take(0)
+    for key in ('home_val', 'down_pay', 'loan_amt'):
+        params[key] = params[key][0]
+    with tempfile.TemporaryDirectory() as tmp:
+        write_to_excel(params, os.path.join(tmp, 'rent_vs_buy.xlsx'))
+
+
+def run_mortgage_excel(batch, yrs):
+    '''
+    mortgage_calculator.write_excel of a single loan
+    '''
+    home_param = pipeline.compute_mortgage(
+        {'home_val': 1e6, 'down_pay': 2e5, 'years': yrs, 'int_rate': 6.5,
+         'mon_hoa': 500, 'mon_maint': 300, 'prop_tax_pct': 1.25})
+    with tempfile.TemporaryDirectory() as tmp:
+        mortgage_calculator.write_excel(
+            os.path.join(tmp, 'monthly_schedule.xlsx'), home_param)
+
+
+# function of every case, and whether it scales with the batch size
+CASES = {'rent_vs_buy': (run_rent_vs_buy, True),
+         'schedule': (run_schedule, True),
+         'affordability': (run_affordability, True),
+         'rent_vs_buy_excel': (run_rent_vs_buy_excel, False),
+         'mortgage_excel': (run_mortgage_excel, False)}
+
+
+def rss():
+    '''
+    current resident set size of this process in bytes, None where
+    /proc is not available
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return None
+
+
+def peak_rss():
+    '''
+    peak resident set size of this process in bytes
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(name, batch, yrs):
+    '''
+    Runs a case twice in this process. The first run is timed and gives
+    the growth of the peak and current resident set size, the second is
+    traced with tracemalloc and gives the peak and the steady-state (still
+    allocated once the case returns, e.g. the results) python memory.
+    Call it in a fresh process, as measure_all does, since the peak
+    resident set size can never go down.
+
+    Parameters
+    ----------
+    name: str
+        case in CASES
+    batch: int
+        number of scenarios
+    yrs: int
+        horizon in years
+
+    Returns
+    -------
+    res: dict
+        case, batch and yrs, seconds taken, traced peak and steady-state
+        bytes, and growth of the peak and current resident set size in
+        bytes (None where not available)
+    '''
+
+    func = CASES[name][0]
+
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        rss_start = rss()
+        start = time.perf_counter()
+        out = func(batch, yrs)
+        elapsed = time.perf_counter() - start
+        rss_end = rss()
+        del out
+
+        tracemalloc.start()
+        out = func(batch, yrs)
+        steady, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del out
+
+    return {'case': name, 'batch': batch, 'yrs': yrs, 'time': elapsed,
+            'peak': peak, 'steady': steady,
+            'peak_rss': None if rss_start is None
+            else peak_rss() - rss_start,
+            'rss': None if rss_start is None else rss_end - rss_start}
+
+
+def measure_all(cases=tuple(CASES), horizons=HORIZONS, batches=BATCHES):
+    '''
+    measures every case at every horizon and batch size, each in a new
+    worker process so the measurements do not see each other's memory
+
+    Parameters
+    ----------
+    cases: tuple of str
+        cases in CASES
+    horizons: tuple of int
+        horizons in years
+    batches: tuple of int
+        batch sizes, only the first is used for the cases that do not
+        scale with the batch size
+
+    Returns
+    -------
+    results: list of dict
+        measurement of every run, see measure
+    '''
+
+    runs = [(name, batch, yrs) for name in cases for yrs in horizons
+            for batch in (batches if CASES[name][1] else batches[:1])]
+
+    results = []
+    for run in runs:
+        with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+            results.append(pool.apply(measure, run))
+
+    return results
+
+
+def check_budgets(results, budgets=BUDGETS):
+    '''
+    measurements that exceed the memory budget of their case
+
+    Parameters
+    ----------
+    results: list of dict
+        measurements from measure_all
+    budgets: dict
+        budget (MB) of every case, cases without one are not checked
+
+    Returns
+    -------
+    over: list of dict
+        measurements over budget
+    '''
+
+    over = []
+    for res in results:
+        if res['case'] not in budgets:
+            continue
+        used = max(res['peak'], res['peak_rss'] or 0)
+        if used > budgets[res['case']] * MB:
+            over.append(res)
+
+    return over
+
+
+def main():
+    '''
+    Measures the run time and memory of the rent vs buy, schedule and
+    affordability models and the excel writers over horizons and batch
+    sizes, and exits with an error when a case goes over its memory
+    budget.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--cases', nargs='+', choices=tuple(CASES),
+                        default=tuple(CASES))
+    parser.add_argument('--horizons', nargs='+', type=int, default=HORIZONS)
+    parser.add_argument('--batches', nargs='+', type=int, default=BATCHES)
+    parser.add_argument('--budgets', help='JSON file of budget (MB) per '
+                        'case, replacing the default budgets')
+    parser.add_argument('--json', help='write the measurements to a file')
+    args = parser.parse_args()
+
+    budgets = BUDGETS
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets = json.load(f)
+
+    results = measure_all(args.cases, args.horizons, args.batches)
+
+    print('%-18s %6s %5s %9s %11s %11s %11s %11s'
+          % ('Case', 'Batch', 'Yrs', 'Time [s]', 'Peak [MB]',
+             'Steady [MB]', 'Peak RSS', 'RSS [MB]'))
+    for res in results:
+        print('%-18s %6d %5d %9.4f %11.2f %11.2f %11s %11s'
+              % (res['case'], res['batch'], res['yrs'], res['time'],
+                 res['peak'] / MB, res['steady'] / MB,
+                 '-' if res['peak_rss'] is None
+                 else '%0.2f' % (res['peak_rss'] / MB),
+                 '-' if res['rss'] is None
+                 else '%0.2f' % (res['rss'] / MB)))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+
+    over = check_budgets(results, budgets)
+    for res in over:
+        print('Over budget: %s with batch %d over %d years used %0.2f MB of '
+              '%d MB' % (res['case'], res['batch'], res['yrs'],
+                         max(res['peak'], res['peak_rss'] or 0) / MB,
+                         budgets[res['case']]))
+    if over:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+import sys
+import time
+# numpy for array tasks
+import numpy as np
+# fast engines
+from housing_core import RVB_COLUMNS, ScheduleIndex, calc_lifetime, \
+    calc_mon_pay, calc_rent_vs_buy, calc_schedule, iter_rent_vs_buy, \
+    monthly_rates
+# month by month loops, and their numba compiled versions
+import housing_jit
+from housing_jit import calc_rent_vs_buy_loop, calc_schedule_prepay
+# original loops of the first release, the reference of every check
+import reference_impl
+
+# largest difference from the reference allowed, relative to the largest
+# value of the quantity in the scenario
+TOL = 1e-8
+
+# scenario classes of every model - the edge cases besides regular loans
+CLASSES = {'schedule': ('regular', 'zero_rate', 'interest_only',
+                        'one_year'),
+           'mon_pay': ('regular', 'zero_rate', 'interest_only', 'one_year'),
+           'lifetime': ('regular', 'zero_rate', 'interest_only',
+                        'one_year'),
+           'schedule_index': ('regular', 'zero_rate', 'interest_only',
+                              'one_year'),
+           'rent_vs_buy': ('regular', 'zero_rate', 'one_year',
+                           'negative_appreciation')}
+
+# classes the original loops can not compute - the mortgage calculator
+# divides by zero at 0%, and the rent vs buy loop at the end of the loan
+# term - which are checked against the plain python loops of housing_jit
+# instead
+LOOP_REFERENCE = {'schedule': ('zero_rate',),
+                  'lifetime': ('zero_rate',),
+                  'schedule_index': ('zero_rate',),
+                  'rent_vs_buy': ('zero_rate', 'one_year')}
+
+# loan terms (years) of the rent vs buy scenarios
+LOAN_TERMS = (10, 15, 30)
+
+# annual rates of the rent vs buy scenarios, in argument order
+RATES = ('int_rate', 'home_appr', 'rent_appr', 'inv_ret')
+
+
+def draw_loans(rng, cls, n):
+    '''
+    random loans of a scenario class, all with the same term
+
+    Parameters
+    ----------
+    rng: numpy.random.Generator
+        random number generator
+    cls: str
+        scenario class in CLASSES['schedule']
+    n: int
+        number of loans
+
+    Returns
+    -------
+    loans: dict
+        loan_amt, years, int_rate and loan_type, and a few ranges of
+        months [start, end) to query
+    '''
+
+    years = 1 if cls == 'one_year' else int(rng.choice([5, 10, 15, 30]))
+    int_rate = np.zeros(n) if cls == 'zero_rate' else rng.uniform(0.5, 12, n)
+    start = rng.integers(0, 12 * years, 8)
+
+    return {'loan_amt': rng.uniform(5e4, 2e6, n), 'years': years,
+            'int_rate': int_rate,
+            'loan_type': 'I' if cls == 'interest_only' else 'R',
+            'start': start,
+            'end': start + rng.integers(0, 12 * years - start + 1)}
+
+
+def draw_rent_vs_buy(rng, cls, n):
+    '''
+    random rent vs buy scenarios of a scenario class, with rates that
+    change every year
+
+    Parameters
+    ----------
+    rng: numpy.random.Generator
+        random number generator
+    cls: str
+        scenario class in CLASSES['rent_vs_buy']
+    n: int
+        number of scenarios
+
+    Returns
+    -------
+    scenarios: dict
+        positional arguments of housing_core.calc_rent_vs_buy in args, the
+        years modeled in yrs, and the annual rates in annual
+    '''
+
+    yrs = int(rng.choice([5, 10, 30]))
+    home_val = rng.uniform(2e5, 3e6, n)
+
+    def rates(low, high):
+        return rng.uniform(low, high, (n, yrs))
+
+    annual = {'int_rate': np.zeros((n, yrs)) if cls == 'zero_rate'
+              else rates(0.5, 12)}
+    if cls == 'negative_appreciation':
+        annual['home_appr'], annual['rent_appr'] = rates(-15, 0), \
+            rates(-10, 0)
+    else:
+        annual['home_appr'], annual['rent_appr'] = rates(-5, 10), \
+            rates(0, 8)
+    annual['inv_ret'] = rates(-20, 25)
+
+    # loans run past the years modeled, except in the one year class, where
+    # they are paid off early on
+    if cls == 'one_year':
+        loan_term = np.ones(n)
+    else:
+        loan_term = rng.choice([t for t in LOAN_TERMS if t >= yrs], n)
+
+    args = [home_val, home_val * rng.uniform(0, 0.5, n), loan_term,
+            rng.uniform(0, 1000, n), rng.uniform(0, 1000, n),
+            rng.uniform(0.5, 2.5, n), rng.uniform(0, 45, n),
+            rng.uniform(1000, 10000, n)]
+    args += [monthly_rates(annual[key], yrs) for key in RATES]
+
+    return {'args': args, 'yrs': yrs, 'annual': annual}
+
+
+def schedule_baseline(loans):
+    '''
+    amortization schedule from the original loop, one loan at a time
+    '''
+    res = [reference_impl.calc_schedule(float(amt), loans['years'],
+                                        float(rate), loans['loan_type'])
+           for amt, rate in zip(loans['loan_amt'], loans['int_rate'])]
+    return [np.array([val[i] for val in res]) for i in (0, 1, 2, 4)]
+
+
+def schedule_loop(loans):
+    '''
+    amortization schedule from the plain python monthly loop
+    '''
+    res = calc_schedule_prepay(loans['loan_amt'], loans['years'],
+                               loans['int_rate'], loans['loan_type'],
+                               use_jit=False)
+    return [res[0], res[1], res[2], res[4]]
+
+
+def schedule_closed_form(loans):
+    '''
+    amortization schedule from the closed-form annuity balance
+    '''
+    res = calc_schedule(loans['loan_amt'], loans['years'],
+                        loans['int_rate'], loans['loan_type'])
+    return [res[0], res[1], res[2], res[4]]
+
+
+def schedule_numba(loans):
+    '''
+    amortization schedule from the numba compiled monthly loop
+    '''
+    res = calc_schedule_prepay(loans['loan_amt'], loans['years'],
+                               loans['int_rate'], loans['loan_type'])
+    return [res[0], res[1], res[2], res[4]]
+
+
+def mon_pay_baseline(loans):
+    '''
+    payment, interest and principal of the first month from the original
+    calc_mon_pay, one loan at a time
+    '''
+    res = np.array([reference_impl.calc_mon_pay_rates(
+        float(amt), 12 * loans['years'], float(rate), loans['loan_type'])
+        for amt, rate in zip(loans['loan_amt'], loans['int_rate'])])
+    return [res[:, i:i + 1] for i in range(3)]
+
+
+def mon_pay_fast(loans):
+    '''
+    payment, interest and principal of the first month from calc_mon_pay
+    '''
+    res = calc_mon_pay(loans['loan_amt'], 12 * loans['years'],
+                       loans['int_rate'], loans['loan_type'])
+    return [np.asarray(val)[..., None] for val in res]
+
+
+def lifetime_of(schedule):
+    '''
+    total interest, and interest paid and outstanding principal after 7
+    and 10 years, summed from the schedule of a reference
+    '''
+
+    def lifetime(loans):
+        _, int_h, _, out_prin_h = schedule(loans)
+        months = int_h.shape[-1]
+        res = [np.sum(int_h, axis=-1)]
+        for yrs in LIFETIME_YRS:
+            k = min(12 * yrs, months)
+            res += [np.sum(int_h[:, :k], axis=-1), out_prin_h[:, k - 1]]
+        return [np.stack(res, axis=-1)]
+
+    return lifetime
+
+
+def lifetime_closed_form(loans):
+    '''
+    total interest, and interest paid and outstanding principal after 7
+    and 10 years from calc_lifetime
+    '''
+    res = calc_lifetime(loans['loan_amt'], loans['years'],
+                        loans['int_rate'], LIFETIME_YRS, loans['loan_type'])
+    out = [res['tot_int']]
+    for yrs in LIFETIME_YRS:
+        out += [res['int_%dyr' % yrs], res['out_prin_%dyr' % yrs]]
+    return [np.stack(out, axis=-1)]
+
+
+def index_of(schedule):
+    '''
+    interest and principal paid in, and balance at the end of, every range
+    of months queried, summed from the schedule of a reference
+    '''
+
+    def index(loans):
+        _, int_h, prin_h, out_prin_h = schedule(loans)
+        balance = np.concatenate([loans['loan_amt'][:, None], out_prin_h],
+                                 axis=-1)
+        res = []
+        for a, b in zip(loans['start'], loans['end']):
+            res += [np.sum(int_h[:, a:b], axis=-1),
+                    np.sum(prin_h[:, a:b], axis=-1), balance[:, b]]
+        return [np.stack(res, axis=-1)]
+
+    return index
+
+
+def index_prefix_sums(loans):
+    '''
+    interest and principal paid in, and balance at the end of, every range
+    of months queried, from a ScheduleIndex of the closed-form schedule
+    '''
+    _, int_h, prin_h, _, _ = calc_schedule(loans['loan_amt'], loans['years'],
+                                           loans['int_rate'],
+                                           loans['loan_type'])
+    index = ScheduleIndex(loans['loan_amt'], int_h, prin_h)
+    a, b = loans['start'], loans['end']
+    return [np.stack([index.interest(a, b), index.principal(a, b),
+                      index.balance(b)], axis=-1).reshape(len(int_h), -1)]
+
+
+def rent_vs_buy_baseline(scenarios):
+    '''
+    rent vs buy model from the original init_params and calc_params, one
+    scenario at a time
+    '''
+    args, annual = scenarios['args'], scenarios['annual']
+    res = []
+    for j in range(len(args[0])):
+        params = {key: float(args[i][j]) for i, key in
+                  enumerate(('home_val', 'down_pay', 'loan_term', 'hoa',
+                             'maint', 'prop_tax', 'tax_bkt', 'rent'))}
+        params['loan_amt'] = params['home_val'] - params['down_pay']
+        params['yrs'] = scenarios['yrs']
+        params.update({key: annual[key][j] for key in RATES})
+        params = reference_impl.calc_params(reference_impl.init_params(
+            params))
+        res.append([params[key] for key in RVB_COLUMNS])
+    return [np.array(res)]
+
+
+def rent_vs_buy_loop(scenarios):
+    '''
+    rent vs buy model from the plain python monthly loop
+    '''
+    return [calc_rent_vs_buy_loop(*scenarios['args'],
+                                  use_jit=False).export()]
+
+
+def rent_vs_buy_vectorized(scenarios):
+    '''
+    rent vs buy model from the vectorized kernel used by calc_params
+    '''
+    return [calc_rent_vs_buy(*scenarios['args']).export()]
+
+
+def rent_vs_buy_numba(scenarios):
+    '''
+    rent vs buy model from the numba compiled monthly loop
+    '''
+    return [calc_rent_vs_buy_loop(*scenarios['args']).export()]
+
+
+def rent_vs_buy_generator(scenarios):
+    '''
+    rent vs buy model from iter_rent_vs_buy, one month at a time
+    '''
+    rows = list(iter_rent_vs_buy(*scenarios['args']))
+    n = len(scenarios['args'][0])
+    return [np.stack([np.stack([np.broadcast_to(row[key], (n,))
+                                for row in rows], axis=-1)
+                      for key in RVB_COLUMNS], axis=-2)]
+
+
+# years after which the lifetime interest and balance are checked
+LIFETIME_YRS = (7, 10)
+
+# scenario generator, original loop, plain python monthly loop and fast
+# engines of every model
+MODELS = {'schedule': (draw_loans, schedule_baseline, schedule_loop,
+                       {'closed_form': schedule_closed_form,
+                        'numba_loop': schedule_numba}),
+          'mon_pay': (draw_loans, mon_pay_baseline, None,
+                      {'calc_mon_pay': mon_pay_fast}),
+          'lifetime': (draw_loans, lifetime_of(schedule_baseline),
+                       lifetime_of(schedule_loop),
+                       {'calc_lifetime': lifetime_closed_form}),
+          'schedule_index': (draw_loans, index_of(schedule_baseline),
+                             index_of(schedule_loop),
+                             {'prefix_sums': index_prefix_sums}),
+          'rent_vs_buy': (draw_rent_vs_buy, rent_vs_buy_baseline,
+                          rent_vs_buy_loop,
+                          {'vectorized': rent_vs_buy_vectorized,
+                           'numba_loop': rent_vs_buy_numba,
+                           'generator': rent_vs_buy_generator})}
+
+
+def max_error(ref, res):
+    '''
+    largest difference between the results of an engine and the reference,
+    relative to the largest absolute value (at least 1) of every quantity
+    in every scenario
+
+    Parameters
+    ----------
+    ref: list of array
+        reference quantities, months along the last axis
+    res: list of array
+        quantities of the engine
+
+    Returns
+    -------
+    err: float
+        largest relative difference
+    '''
+
+    err = 0.0
+    for a, b in zip(ref, res):
+        a = np.asarray(a, dtype=float)
+        b = np.broadcast_to(np.asarray(b, dtype=float), a.shape)
+        scale = np.maximum(np.max(np.abs(a), axis=-1, keepdims=True), 1)
+        err = max(err, float(np.max(np.abs(a - b) / scale)))
+
+    return err
+
+
+def best_time(func, arg, repeat):
+    '''
+    best of repeat run times of func(arg) in seconds
+    '''
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def check(n=100, seed=0, repeat=3, tol=TOL):
+    '''
+    Checks every fast engine against the original loops of the first
+    release (reference_impl) on random scenarios of every class, and
+    measures the speedup. Classes the original loops can not compute
+    (LOOP_REFERENCE) are checked against the plain python loops of
+    housing_jit instead. The numba engines are only checked when numba is
+    installed, since they are the plain python loop otherwise.
+
+    Parameters
+    ----------
+    n: int
+        number of scenarios per class
+    seed: int
+        seed of the random number generator
+    repeat: int
+        number of timed runs, the best is kept
+    tol: float
+        largest relative difference allowed
+
+    Returns
+    -------
+    rows: list of dict
+        model, class, engine, reference used, largest relative difference,
+        whether it is within tol, reference and engine run time and speedup
+    '''
+
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for model, (draw, baseline, loop, engines) in MODELS.items():
+        for cls in CLASSES[model]:
+            arg = draw(rng, cls, n)
+            if cls in LOOP_REFERENCE.get(model, ()):
+                reference, ref_func = 'loop', loop
+            else:
+                reference, ref_func = 'baseline', baseline
+            ref = ref_func(arg)
+            ref_time = best_time(ref_func, arg, repeat)
+
+            for engine, func in engines.items():
+                if engine == 'numba_loop' and housing_jit.numba is None:
+                    continue
+                # the first call also compiles, so it is not timed
+                err = max_error(ref, func(arg))
+                run_time = best_time(func, arg, repeat)
+                rows.append({'model': model, 'class': cls,
+                             'engine': engine, 'reference': reference,
+                             'error': err,
+                             'ok': err <= tol, 'ref_time': ref_time,
+                             'time': run_time,
+                             'speedup': ref_time / run_time})
+
+    return rows
+
+
+def main():
+    '''
+    Checks the fast schedule, monthly payment, lifetime aggregate,
+    schedule index and rent vs buy engines against the original monthly
+    loops on random scenarios, including 0% rates, interest only loans, 1
+    year terms and falling prices, and reports the speedup of every
+    engine. Exits with an error when an engine is off by more than the
+    tolerance.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--n', type=int, default=100,
+                        help='scenarios per class')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--tol', type=float, default=TOL)
+    args = parser.parse_args()
+
+    rows = check(args.n, args.seed, args.repeat, args.tol)
+
+    print('%-14s %-22s %-13s %-9s %10s %5s %10s %10s %9s'
+          % ('Model', 'Class', 'Engine', 'Reference', 'Max error', 'OK',
+             'Ref. [s]', 'Time [s]', 'Speedup'))
+    for row in rows:
+        print('%-14s %-22s %-13s %-9s %10.2e %5s %10.4f %10.4f %8.1fx'
+              % (row['model'], row['class'], row['engine'],
+                 row['reference'], row['error'],
+                 'yes' if row['ok'] else 'NO', row['ref_time'], row['time'],
+                 row['speedup']))
+
+    if not all(row['ok'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# hashing of the scenario inputs
+import hashlib
+# sidecar files with the scalar results
+import json
+# file handling
+import os
+import shutil
+import tempfile
+# numpy for array tasks
+import numpy as np
+
+# bump when a model changes, so older entries are no longer found
+CACHE_VERSION = 1
+
+# environment variables that switch the cache on for the programs
+CACHE_DIR_ENV = 'HOUSING_CACHE_DIR'
+CACHE_SIZE_ENV = 'HOUSING_CACHE_MB'
+
+
+def canonical(obj):
+    '''
+    convert scenario inputs into a canonical form that serializes the same
+    way for equal inputs - numbers become floats (so 20 and 20.0 agree),
+    arrays and tuples become lists and dictionaries are sorted by key
+
+    Parameters
+    ----------
+    obj: number, str, list, tuple, array or dict
+        scenario inputs
+
+    Returns
+    -------
+    obj: float, str, list or dict
+        canonical form of the inputs
+    '''
+
+    if isinstance(obj, dict):
+        return {str(key): canonical(obj[key]) for key in sorted(obj)}
+    if isinstance(obj, str):
+        return obj
+    if isinstance(obj, (list, tuple)) or np.ndim(obj) > 0:
+        return [canonical(val) for val in np.asarray(obj).tolist()]
+    return float(obj)
+
+
+def scenario_key(kind, inputs):
+    '''
+    hash of the scenario inputs, used as the name of the cache entry
+
+    Parameters
+    ----------
+    kind: str
+        calculation the inputs belong to, e.g. 'mortgage' or 'rent_vs_buy'
+    inputs: dict
+        scenario inputs
+
+    Returns
+    -------
+    key: str
+        hex digest identifying the scenario
+    '''
+
+    text = json.dumps([CACHE_VERSION, kind, canonical(inputs)],
+                      sort_keys=True, separators=(',', ':'))
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+    '''
+    Content addressed on-disk cache of computed results, shared by every
+    process pointing at the same directory. Every entry is a .npy array
+    that is memory mapped when read, a JSON sidecar with the scalar results
+    and optionally output files such as the excel workbook. Files are
+    written to a temporary name and moved into place, and the sidecar is
+    written last, so a reader never sees a partial entry. Once the
+    directory grows above max_bytes the least recently used entries are
+    removed.
+
+    Parameters
+    ----------
+    path: str
+        cache directory, created if missing
+    max_bytes: int
+        size limit of the cache directory
+    '''
+
+    def __init__(self, path, max_bytes=256 * 2**20):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        '''
+        cache configured through the HOUSING_CACHE_DIR and
+        HOUSING_CACHE_MB environment variables
+
+        Returns
+        -------
+        cache: ResultCache or None
+            None when HOUSING_CACHE_DIR is not set
+        '''
+
+        path = os.environ.get(CACHE_DIR_ENV)
+        if not path:
+            return None
+
+        max_mb = float(os.environ.get(CACHE_SIZE_ENV, 256))
+
+        return cls(path, int(max_mb * 2**20))
+
+    def _file(self, key, suffix):
+        return os.path.join(self.path, key + suffix)
+
+    def _replace(self, key, suffix, write):
+        # write to a temporary file in the cache directory and atomically
+        # move it into place
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, self._file(key, suffix))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load(self, key):
+        '''
+        look up an entry
+
+        Parameters
+        ----------
+        key: str
+            scenario key from scenario_key
+
+        Returns
+        -------
+        entry: tuple or None
+            (array, meta) - the read only memory mapped array and the
+            sidecar dictionary, or None if the entry is not cached
+        '''
+
+        try:
+            with open(self._file(key, '.json')) as f:
+                meta = json.load(f)
+            arr = np.load(self._file(key, '.npy'), mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            # missing, or removed by another process in the meantime
+            return None
+
+        # mark as recently used
+        try:
+            os.utime(self._file(key, '.json'))
+        except FileNotFoundError:
+            pass
+
+        return arr, meta
+
+    def store(self, key, arr, meta=None):
+        '''
+        add an entry, replacing an existing one
+
+        Parameters
+        ----------
+        key: str
+            scenario key from scenario_key
+        arr: array of float
+            array results
+        meta: dict, optional
+            JSON serializable scalar results
+
+        Returns
+        -------
+        None
+        '''
+
+        self._replace(key, '.npy',
+                      lambda f: np.save(f, np.ascontiguousarray(arr)))
+        self._replace(key, '.json',
+                      lambda f: f.write(json.dumps(meta or {}).encode()))
+        self.evict()
+
+    def fetch_file(self, key, dest):
+        '''
+        copy an output file cached with the entry to dest
+
+        Parameters
+        ----------
+        key: str
+            scenario key from scenario_key
+        dest: str
+            file to copy to, its extension picks the cached file
+
+        Returns
+        -------
+        found: bool
+            True if the file was cached and copied
+        '''
+
+        suffix = os.path.splitext(dest)[1]
+        try:
+            shutil.copyfile(self._file(key, suffix), dest)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def store_file(self, key, src):
+        '''
+        cache an output file with the entry
+
+        Parameters
+        ----------
+        key: str
+            scenario key from scenario_key
+        src: str
+            file to cache, stored under its extension
+
+        Returns
+        -------
+        None
+        '''
+
+        def write(f):
+            with open(src, 'rb') as g:
+                shutil.copyfileobj(g, f)
+
+        self._replace(key, os.path.splitext(src)[1], write)
+        self.evict()
+
+    def evict(self):
+        '''
+        remove the least recently used entries until the cache fits in
+        max_bytes
+
+        Returns
+        -------
+        None
+        '''
+
+        # size, files and last use of every entry - files sharing a key
+        # belong to one entry, which was last used when its sidecar was
+        # touched
+        size = {}
+        files = {}
+        used = {}
+        with os.scandir(self.path) as it:
+            for entry in it:
+                key, suffix = os.path.splitext(entry.name)
+                if suffix == '.tmp':
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                size[key] = size.get(key, 0) + stat.st_size
+                files.setdefault(key, []).append(suffix)
+                if suffix == '.json':
+                    used[key] = stat.st_mtime
+                else:
+                    used.setdefault(key, stat.st_mtime)
+
+        total = sum(size.values())
+        for key in sorted(size, key=used.get):
+            if total <= self.max_bytes:
+                break
+            # sidecar first, so readers stop finding the entry
+            for suffix in sorted(files[key], key=lambda x: x != '.json'):
+                try:
+                    os.unlink(self._file(key, suffix))
+                except FileNotFoundError:
+                    pass
+            total -= size[key]
@@ -0,0 +1,1214 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# splitting CSV rows
+import csv
+# numpy for array tasks
+import numpy as np
+
+# realtor fees paid when selling the home, as a fraction of home value
+SELL_COST = 0.06
+
+# monthly quantities of the rent vs buy model, in storage order
+RVB_COLUMNS = ('mon_home_val', 'mon_int', 'mon_prin', 'mon_out_prin',
+               'mon_proptax', 'mon_hoa', 'mon_taxbrk', 'mon_maint',
+               'mon_homeins', 'mon_buy_outflow', 'mon_worth_buy',
+               'mon_worth_buy_sell', 'mon_rent', 'mon_savings_rent',
+               'mon_worth_rent')
+
+# rent vs buy quantities that are constant over the months
+RVB_CONST_COLUMNS = ('mon_hoa', 'mon_maint')
+
+# character classes of parse_money_array - padding, the characters that are
+# stripped from the ends of an amount, then the characters of the number
+PAD, STRIP, COMMA, KILO, MEGA, PCT = range(6)
+POINT, PLUS, MINUS, OTHER, DIGIT = range(6, 11)
+
+
+def parse_money(inp, base=None):
+    '''
+    parses home prices or down payments given in a variety of formats - the
+    user could enter like 1M or 1000000 or 1000K or $1M or $10,000, etc.
+
+    Parameters
+    ----------
+    inp: str
+        text to be parsed
+    base: float, optional
+        if given, entries with a % sign, or plain values of 100 or less, are
+        taken as a percentage of base (for example down payment as a
+        percentage of home value)
+
+    Returns
+    -------
+    val: float
+        parsed value
+
+    Raises
+    ------
+    ValueError
+        if the text is not a valid amount
+    '''
+
+    mod = float(inp.strip().strip(' kK$%Mm,').replace(',', ''))
+
+    # check to see if value is in 1000's
+    if 'k' in inp or 'K' in inp:
+        val = mod * 1000
+
+    # check to see if value is in 1000000's
+    elif 'm' in inp or 'M' in inp:
+        val = mod * 1000000
+
+    # check to see if is listed in percentage or less than 100
+    elif base is not None and ('%' in inp or mod <= 100):
+        val = base * mod / 100
+
+    # else value is as listed
+    else:
+        val = mod
+
+    return val
+
+
+def parse_money_array(texts, base=None):
+    '''
+    parses a whole column of amounts in the formats accepted by parse_money
+    at once. The texts are scanned one character position at a time, with
+    every step vectorized across all the texts. Entries that can not be
+    parsed are flagged in the returned mask instead of raising, so one bad
+    row does not hold up the rest. Numbers are taken as an optional sign,
+    digits, thousands separators and at most one decimal point (no
+    exponents).
+
+    Parameters
+    ----------
+    texts: array of str
+        texts to be parsed
+    base: float or array of float, optional
+        if given, entries with a % sign, or plain values of 100 or less, are
+        taken as a percentage of base (broadcast against texts)
+
+    Returns
+    -------
+    [vals, valid]: list
+        parsed values (0 where invalid) and mask of the valid entries
+    '''
+
+    texts = np.asarray(texts, dtype=str)
+    shape = texts.shape
+    width = max(texts.dtype.itemsize // 4, 1)
+    codes = np.ascontiguousarray(texts.astype('U%d' % width)) \
+        .view(np.uint32).reshape(-1, width)
+
+    # class of every character, one row per character position - codes
+    # above 127 are not valid in an amount
+    table = np.full(129, OTHER, dtype=np.uint8)
+    table[0] = PAD
+    for chars, cls in ((' \t\n\r\v\f$', STRIP), (',', COMMA), ('kK', KILO),
+                       ('mM', MEGA), ('%', PCT), ('.', POINT), ('+', PLUS),
+                       ('-', MINUS), ('0123456789', DIGIT)):
+        table[[ord(c) for c in chars]] = cls
+    codes = np.ascontiguousarray(codes.T)
+    classes = table[np.minimum(codes, 128)]
+
+    n = codes.shape[1]
+    mantissa = np.zeros(n, dtype=np.int64)
+    n_digits = np.zeros(n, dtype=np.int64)
+    n_frac = np.zeros(n, dtype=np.int64)
+    n_point = np.zeros(n, dtype=np.int64)
+    neg = np.zeros(n, dtype=bool)
+    started = np.zeros(n, dtype=bool)
+    gap = np.zeros(n, dtype=bool)
+    valid = np.ones(n, dtype=bool)
+    kilo = np.zeros(n, dtype=bool)
+    mega = np.zeros(n, dtype=bool)
+    pct = np.zeros(n, dtype=bool)
+
+    for code, cls in zip(codes, classes):
+        digit = cls == DIGIT
+        sign = (cls == PLUS) | (cls == MINUS)
+        # characters that parse_money strips from the ends - only commas
+        # may also appear between the characters of the number
+        stripped = (cls <= PCT) & (cls != COMMA)
+        keep = cls >= POINT
+
+        valid &= ~(keep & gap) & ~(sign & started) & (cls != OTHER)
+        gap |= started & stripped
+        started |= keep
+
+        mantissa = np.where(digit, mantissa * 10 + (code - 48), mantissa)
+        n_digits += digit
+        n_frac += digit & (n_point > 0)
+        n_point += cls == POINT
+        neg |= cls == MINUS
+        kilo |= cls == KILO
+        mega |= cls == MEGA
+        pct |= cls == PCT
+
+    valid &= (n_digits > 0) & (n_point <= 1)
+
+    # the digits as one integer divided by a power of 10 - exact like
+    # float() for up to 15 digits, longer numbers are left to float()
+    mod = mantissa / 10.0 ** n_frac
+    mod = np.where(neg, -mod, mod)
+    long = valid & (n_digits > 15)
+    if long.any():
+        mod[long] = [float(x.strip().strip(' kK$%Mm,').replace(',', ''))
+                     for x in texts.ravel()[long]]
+
+    if base is None:
+        pct[...] = False
+        base = 0
+    else:
+        pct |= mod <= 100
+        base = np.broadcast_to(np.asarray(base, dtype=float), shape).ravel()
+
+    # same precedence as parse_money - thousands, millions, percentage
+    vals = np.select([kilo, mega, pct],
+                     [mod * 1000, mod * 1000000, base * mod / 100], mod)
+    vals = np.where(valid, vals, 0)
+
+    return [vals.reshape(shape), valid.reshape(shape)]
+
+
+def split_csv(lines, usecols, n_fields, delimiter=','):
+    '''
+    splits CSV lines into the text of the columns in usecols. Rows without
+    exactly n_fields fields can not be lined up with the header, so they
+    are given empty texts and flagged in the returned mask instead of
+    failing the whole file. Blank lines are skipped.
+
+    Parameters
+    ----------
+    lines: iterable of str
+        lines of the file, without the header
+    usecols: list of int
+        indices of the columns to keep
+    n_fields: int
+        number of fields of a well formed row
+    delimiter: str
+        field separator
+
+    Returns
+    -------
+    [texts, valid]: list
+        (rows, len(usecols)) array of texts, and mask of the well formed
+        rows
+    '''
+
+    texts = []
+    valid = []
+    for row in csv.reader(lines, delimiter=delimiter):
+        if not row:
+            continue
+        ok = len(row) == n_fields
+        texts.append([row[i] if ok else '' for i in usecols])
+        valid.append(ok)
+
+    return [np.array(texts, dtype=str).reshape(-1, len(usecols)),
+            np.array(valid, dtype=bool)]
+
+
+def read_money_csv(path, columns, bases=None, delimiter=','):
+    '''
+    reads columns of amounts from a CSV file with a header row, parsing each
+    column in one pass with parse_money_array. Fields containing commas
+    (e.g. "$10,000") have to be quoted, and rows with the wrong number of
+    fields are flagged as invalid. The parsed columns can be passed
+    straight to the array functions, e.g.
+    calc_affordability(cols['home_val'][valid], ...).
+
+    Parameters
+    ----------
+    path: str
+        CSV file to read
+    columns: list of str
+        names of the columns to parse
+    bases: dict, optional
+        column whose percentage entries are relative to another column,
+        e.g. {'down_pay': 'home_val'}
+    delimiter: str
+        field separator
+
+    Returns
+    -------
+    [cols, valid]: list
+        dictionary of parsed columns, and mask of the rows where all of them
+        are valid
+    '''
+
+    bases = {} if bases is None else bases
+
+    with open(path, newline='') as f:
+        header = [name.strip() for name in
+                  next(csv.reader(f, delimiter=delimiter))]
+        usecols = [header.index(name) for name in columns]
+        texts, valid = split_csv(f, usecols, len(header), delimiter)
+
+    cols = {}
+    # columns used as the base of others are parsed first
+    order = sorted(range(len(columns)), key=lambda i: columns[i] in bases)
+    for i in order:
+        name = columns[i]
+        base = cols[bases[name]] if name in bases else None
+        cols[name], ok = parse_money_array(texts[:, i], base)
+        valid &= ok
+
+    return [cols, valid]
+
+
+def get_valid_input(msg, base=None, default=None):
+    '''
+    gets valid inputs for the home prices or down payments in a variety of
+    formats - the user could enter like 1M or 1000000 or 1000K or $1M, etc.
+
+    Parameters
+    ----------
+    msg: str
+        message to be printed on the screen
+    base: float, optional
+        if given, percentage entries are taken relative to base, see
+        parse_money
+    default: float, optional
+        if given, the input is optional - a blank entry, or the end of the
+        input, gives default
+
+    Returns
+    -------
+    val: float
+        validated input
+    '''
+
+    while True:
+        try:
+            # get input
+            if default is None:
+                inp = input(msg)
+            else:
+                try:
+                    inp = input(msg)
+                except EOFError:
+                    inp = ''
+                if not inp.strip():
+                    return default
+            val = parse_money(inp, base)
+            break
+
+        except Exception as e:
+            print(e)
+            if base is None:
+                print('Enter as 100000 or $10,000 or $100K or 100K')
+            else:
+                print('Enter as 10000 or $10,000 or $10K or 10K or 10%')
+
+    return val
+
+
+def get_valid_rates(disp_text, yrs):
+    '''
+    setup a loop to make sure entities are valid, either fixed with
+    length 1 or match length of modeling period.
+
+    Parameters
+    ----------
+    disp_text: str
+        display text
+    yrs: int
+        number of years to simulate
+
+    Returns
+    -------
+    inp: list of float
+        list of validated inputs
+    '''
+    while True:
+        try:
+            # input statement
+            msg = 'Enter ' + disp_text + ' (%): '
+            inp = np.array(input(msg).strip(' []()').split(','))
+
+            # if length is not equal to yrs, or fixed, then ask to re-enter
+            j_len = len(inp)
+            if j_len == yrs or j_len == 1:
+                # if fixed rate, repeat the entry to match yrs
+                if j_len == 1:
+                    inp = np.repeat(inp[0], yrs)
+                # convert to float from string for further operations
+                inp = inp.astype(float)
+                break
+            print('You entered %d entries! Enter %d entries, '
+                  'or 1 entry to denote fixed!' % (j_len, yrs))
+        except Exception as e:
+            print(e)
+
+    return inp
+
+
+def calc_mon_pay(out_prin, months, int_rate, loan_type='R'):
+    '''
+    calculate monthly payment including interest and principal. All the
+    arguments may be numpy arrays, in which case they are broadcast
+    against each other.
+
+    Parameters
+    ----------
+    out_prin: float or array of float
+        outstanding principal amount owed to bank
+    months: int or array of int
+        number of remaining months in loan
+    int_rate: float or array of float
+        fixed annual interest rate (%)
+    loan_type: str
+        Indicator to specify if the loan is a regular loan (R) or interest
+        only (I)
+
+    Returns
+    -------
+    [payment, interest, principal]: list
+        list containing total monthly payment to bank, interest component in
+        the monthly payment, principal component in the monthly payment
+    '''
+
+    rate = np.asarray(int_rate, dtype=float) / (12 * 100)
+
+    # interest component
+    interest = rate * out_prin
+
+    if loan_type == 'I':
+        # interest only loan - so principal is 0
+        payment = interest
+        principal = np.zeros_like(interest)
+        return [payment, interest, principal]
+
+    # monthly payment not including home ins and property tax and HOA
+    # this only includes the loan amount based payment that is due to bank
+    # if interest rate is 0%, the principal is split evenly over the months
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(rate == 0, out_prin / months,
+                           out_prin * rate / (1 - (1 + rate)**(-months)))
+
+    # principal component
+    principal = payment - interest
+
+    return [payment, interest, principal]
+
+
+def calc_schedule(loan_amt, years, int_rate, loan_type='R'):
+    '''
+    Calculate schedule of payments month over month using the closed-form
+    annuity balance, so that no loop over months is needed. loan_amt and
+    int_rate may be arrays of loans, in which case the month axis is the
+    last axis of every returned array.
+
+    Parameters
+    ----------
+    loan_amt: float or array of float
+        outstanding loan amount
+    years: int
+        number of years in the loan
+    int_rate: float or array of float
+        fixed interest rate at start of the loan (%)
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+
+    Returns
+    -------
+    [pay_h, int_h, prin_h, month_h, out_prin_h]: list
+        list containing monthly total payment to bank, monthly interest
+        component to bank, monthly principal component to bank, month of
+        payment in numbers 1, 2, 3... etc, outstanding principal after
+        current monthly payment
+    '''
+
+    months = years * 12
+    month_h = np.arange(1, months + 1)
+
+    # loans along the leading axes, months along the last axis
+    loan_amt = np.asarray(loan_amt, dtype=float)[..., None]
+    rate = np.asarray(int_rate, dtype=float)[..., None] / (12 * 100)
+    shape = np.broadcast_shapes(loan_amt.shape, rate.shape, month_h.shape)
+
+    if loan_type == 'I':
+        # interest only loan - the principal is never paid down
+        out_prin_h = np.broadcast_to(loan_amt, shape).copy()
+        int_h = np.broadcast_to(rate * loan_amt, shape).copy()
+        pay_h = int_h.copy()
+        prin_h = np.zeros(shape)
+        return [pay_h, int_h, prin_h, month_h, out_prin_h]
+
+    # outstanding principal after month k of an n month annuity is
+    # L * ((1+r)^n - (1+r)^k) / ((1+r)^n - 1), or L * (1 - k/n) at 0%
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grow = (1 + rate)**month_h
+        grow_n = (1 + rate)**months
+        out_prin_h = np.where(rate == 0, loan_amt * (1 - month_h / months),
+                              loan_amt * (grow_n - grow) / (grow_n - 1))
+    out_prin_h = np.broadcast_to(out_prin_h, shape).copy()
+
+    # outstanding principal at the start of each month
+    prev_prin = np.concatenate(
+        [np.broadcast_to(loan_amt, shape[:-1] + (1,)), out_prin_h[..., :-1]],
+        axis=-1)
+
+    # level payment, split into interest and principal every month
+    pay_h = np.broadcast_to(calc_mon_pay(loan_amt, months, rate * 1200)[0],
+                            shape).copy()
+    int_h = rate * prev_prin
+    prin_h = pay_h - int_h
+
+    return [pay_h, int_h, prin_h, month_h, out_prin_h]
+
+
+def round_half_even(num, den):
+    '''
+    integer division rounded half to even (bank rounding), exact for int64
+
+    Parameters
+    ----------
+    num: int or array of int
+        numerator
+    den: int or array of int
+        positive denominator
+
+    Returns
+    -------
+    quot: int or array of int
+        num / den rounded to the nearest integer, ties to even
+    '''
+
+    quot, rem = np.divmod(num, den)
+    up = (2 * rem > den) | ((2 * rem == den) & (quot % 2 == 1))
+
+    return quot + up
+
+
+def calc_schedule_cents(loan_amt, years, int_rate, loan_type='R'):
+    '''
+    Calculate schedule of payments month over month in integer cents the
+    way servicers bill it: the level payment and every monthly interest
+    charge are rounded to cents half to even, and the last payment is
+    adjusted to pay off the remaining balance exactly. Interest is computed
+    with exact integer arithmetic, with the interest rate taken to 1/10000
+    of a percent. The months are stepped through, but every step is
+    vectorized across loans.
+
+    Parameters
+    ----------
+    loan_amt: float or array of float
+        outstanding loan amount ($)
+    years: int
+        number of years in the loan
+    int_rate: float or array of float
+        fixed interest rate at start of the loan (%)
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+
+    Returns
+    -------
+    [pay_h, int_h, prin_h, month_h, out_prin_h]: list
+        as in calc_schedule, with the amounts as int64 cents
+    '''
+
+    months = years * 12
+    month_h = np.arange(1, months + 1)
+
+    shape = np.broadcast_shapes(np.shape(loan_amt), np.shape(int_rate))
+    loan_amt = np.broadcast_to(np.asarray(loan_amt, dtype=float), shape)
+    int_rate = np.broadcast_to(np.asarray(int_rate, dtype=float), shape)
+
+    # loan in cents and the monthly rate as rate_num / rate_den exactly
+    balance = np.rint(loan_amt * 100).astype(np.int64)
+    rate_num = np.rint(int_rate * 10000).astype(np.int64)
+    rate_den = 12 * 100 * 10000
+
+    # level payment rounded to cents
+    if loan_type == 'I':
+        payment = np.zeros(shape, dtype=np.int64)
+    else:
+        payment = np.rint(calc_mon_pay(balance, months, int_rate)[0])
+        payment = payment.astype(np.int64)
+
+    # filled month by month, so months are the leading axis until the end
+    pay_h = np.zeros((months,) + shape, dtype=np.int64)
+    int_h = np.zeros((months,) + shape, dtype=np.int64)
+    prin_h = np.zeros((months,) + shape, dtype=np.int64)
+    out_prin_h = np.zeros((months,) + shape, dtype=np.int64)
+
+    for month in range(months):
+        # interest on the outstanding balance, rounded half to even
+        interest = round_half_even(balance * rate_num, rate_den)
+
+        if loan_type == 'I':
+            principal = np.zeros(shape, dtype=np.int64)
+        elif month == months - 1:
+            # final payment pays off whatever is left
+            principal = balance
+        else:
+            # never pay more than the outstanding balance
+            principal = np.minimum(payment - interest, balance)
+
+        balance = balance - principal
+
+        pay_h[month] = interest + principal
+        int_h[month] = interest
+        prin_h[month] = principal
+        out_prin_h[month] = balance
+
+    return [np.moveaxis(pay_h, 0, -1), np.moveaxis(int_h, 0, -1),
+            np.moveaxis(prin_h, 0, -1), month_h,
+            np.moveaxis(out_prin_h, 0, -1)]
+
+
+class ScheduleIndex:
+    '''
+    Cumulative interest and principal of an amortization schedule, built
+    once so that the interest paid, principal paid and outstanding balance
+    over any range of months are answered in O(1) without re-summing.
+
+    Parameters
+    ----------
+    loan_amt: float or array of float
+        loan amount of every loan
+    int_h: array of float
+        (loans..., months) monthly interest, as from calc_schedule
+    prin_h: array of float
+        (loans..., months) monthly principal, as from calc_schedule
+    '''
+
+    __slots__ = ('cum_int', 'cum_prin', 'balance_h')
+
+    def __init__(self, loan_amt, int_h, prin_h):
+        int_h = np.asarray(int_h, dtype=float)
+        prin_h = np.asarray(prin_h, dtype=float)
+        zero = np.zeros(int_h.shape[:-1] + (1,))
+
+        # cumulative sums after 0, 1, 2 ... months
+        self.cum_int = np.concatenate([zero, np.cumsum(int_h, axis=-1)],
+                                      axis=-1)
+        self.cum_prin = np.concatenate([zero, np.cumsum(prin_h, axis=-1)],
+                                       axis=-1)
+
+        # outstanding principal after 0, 1, 2 ... months
+        self.balance_h = np.asarray(loan_amt, dtype=float)[..., None] - \
+            self.cum_prin
+
+    def __len__(self):
+        return self.cum_int.shape[-1] - 1
+
+    def clip(self, month):
+        '''
+        months beyond the loan term count as the end of the loan
+        '''
+        return np.clip(month, 0, len(self))
+
+    def interest(self, a, b):
+        '''
+        interest paid in months [a, b), i.e. after a months have elapsed
+        and up to b months. a and b may be arrays of months.
+
+        Parameters
+        ----------
+        a: int or array of int
+            start of the range, in elapsed months
+        b: int or array of int
+            end of the range, in elapsed months
+
+        Returns
+        -------
+        interest: float or array of float
+            interest paid in the range, for every loan
+        '''
+
+        return np.take(self.cum_int, self.clip(b), axis=-1) - \
+            np.take(self.cum_int, self.clip(a), axis=-1)
+
+    def principal(self, a, b):
+        '''
+        principal paid in months [a, b), see interest
+        '''
+
+        return np.take(self.cum_prin, self.clip(b), axis=-1) - \
+            np.take(self.cum_prin, self.clip(a), axis=-1)
+
+    def balance(self, month):
+        '''
+        outstanding principal after month months have elapsed
+
+        Parameters
+        ----------
+        month: int or array of int
+            elapsed months
+
+        Returns
+        -------
+        balance: float or array of float
+            outstanding principal, for every loan
+        '''
+
+        return np.take(self.balance_h, self.clip(month), axis=-1)
+
+
+def calc_affordability(home_val, down_pay, loan_term, int_rate, hoa, maint,
+                       prop_tax_pct, loan_type='R'):
+    '''
+    first month payment and total monthly commitment for every combination
+    of home value and interest rate, broadcast over numpy arrays.
+
+    Parameters
+    ----------
+    home_val: float or array of float
+        home prices
+    down_pay: float or array of float
+        down payment
+    loan_term: int
+        loan term in years
+    int_rate: float or array of float
+        annual interest rates (%)
+    hoa: float
+        monthly HOA and Mello-Roos
+    maint: float
+        monthly maintenance
+    prop_tax_pct: float
+        annual property tax percentage (%)
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+
+    Returns
+    -------
+    res: dict
+        payment, interest and principal to bank, monthly property tax, home
+        insurance and total monthly commitment
+    '''
+
+    res = {}
+
+    # loan amount is home value minus down payment
+    loan_amt = np.asarray(home_val) - down_pay
+
+    # payment to bank
+    res['payment'], res['interest'], res['principal'] = \
+        calc_mon_pay(loan_amt, loan_term*12, int_rate, loan_type)
+
+    # monthly property tax
+    res['prop_tax'] = prop_tax_pct / (12*100) * np.asarray(home_val)
+
+    # monthly home insurance
+    res['home_ins'] = prop_tax_pct / (12*100) * np.asarray(home_val) / 10
+
+    # total monthly commitment is sum of payment to bank, hoa, home ins and
+    # prop tax, maintenance
+    res['mon_commit'] = res['payment'] + hoa + res['home_ins'] + \
+        res['prop_tax'] + maint
+
+    return res
+
+
+def calc_lifetime(loan_amt, loan_term, int_rate, yrs=(7, 10),
+                  loan_type='R'):
+    '''
+    total interest over the life of the loan, and interest paid and
+    outstanding principal after the first few years, from closed form
+    annuity sums without a month axis - as cheap as the monthly payment for
+    any grid of loan amounts and interest rates.
+
+    Parameters
+    ----------
+    loan_amt: float or array of float
+        loan amount
+    loan_term: int
+        loan term in years
+    int_rate: float or array of float
+        annual interest rates (%), broadcast against loan_amt
+    yrs: tuple of int
+        years after which the interest paid and outstanding principal are
+        reported
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+
+    Returns
+    -------
+    res: dict
+        tot_int, and int_<N>yr, prin_<N>yr and out_prin_<N>yr for every N
+        in yrs
+    '''
+
+    loan_amt = np.asarray(loan_amt, dtype=float)
+    rate = np.asarray(int_rate, dtype=float) / (12 * 100)
+    months = loan_term * 12
+    payment = calc_mon_pay(loan_amt, months, int_rate, loan_type)[0]
+
+    res = {}
+    # every payment of a regular loan is the same, so the interest is all
+    # the payments less the principal paid back
+    if loan_type == 'I':
+        res['tot_int'] = payment * months
+    else:
+        res['tot_int'] = payment * months - loan_amt
+
+    for n in yrs:
+        k = min(n * 12, months)
+
+        # outstanding principal after month k of an n month annuity is
+        # L * ((1+r)^n - (1+r)^k) / ((1+r)^n - 1), or L * (1 - k/n) at 0%
+        if loan_type == 'I':
+            out_prin = loan_amt * np.ones_like(rate)
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                grow = (1 + rate)**k
+                grow_n = (1 + rate)**months
+                out_prin = np.where(rate == 0, loan_amt * (1 - k / months),
+                                    loan_amt * (grow_n - grow) / (grow_n - 1))
+
+        res['out_prin_%dyr' % n] = out_prin
+        res['prin_%dyr' % n] = loan_amt - out_prin
+        res['int_%dyr' % n] = payment * k - res['prin_%dyr' % n]
+
+    return res
+
+
+def monthly_rates(annual, yrs):
+    '''
+    expand per-year annual rates into per-month rates
+
+    Parameters
+    ----------
+    annual: array of float
+        annual rates (%), one per year along the last axis
+    yrs: int
+        number of years to model
+
+    Returns
+    -------
+    monthly: StepSeries
+        monthly rates (%), annual rate divided by 12, for 12*yrs months,
+        stored as one value per year
+    '''
+
+    return StepSeries(np.asarray(annual, dtype=float) / 12, 12, 12 * yrs)
+
+
+class StepSeries:
+    '''
+    Monthly series that only changes every few months, e.g. a rate that is
+    fixed for every year or a constant monthly amount. Only one value per
+    step is stored, and the series is expanded to months only when an
+    array is needed.
+
+    Parameters
+    ----------
+    values: array of float
+        (scenarios..., steps) value for every step
+    step: int
+        number of months in a step
+    months: int
+        number of months in the series
+    '''
+
+    __slots__ = ('values', 'step', 'months')
+
+    def __init__(self, values, step, months):
+        self.values = np.asarray(values, dtype=float)
+        self.step = step
+        self.months = months
+
+    def __len__(self):
+        return self.months
+
+    def __getitem__(self, month):
+        return self.values[..., month // self.step]
+
+    def __iter__(self):
+        # value of every month in turn, without expanding the series
+        for month in range(self.months):
+            yield self.values[..., month // self.step]
+
+    @property
+    def shape(self):
+        '''
+        shape of the expanded series
+        '''
+        return self.values.shape[:-1] + (self.months,)
+
+    def expand(self):
+        '''
+        expand into a monthly array
+
+        Returns
+        -------
+        arr: array of float
+            (scenarios..., months) monthly values
+        '''
+
+        return self.values[..., np.arange(self.months) // self.step]
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.expand()
+        return arr if dtype is None else arr.astype(dtype)
+
+
+class MonthlyBlock:
+    '''
+    Monthly results stored as one contiguous float block, with one row of
+    months per named column. Columns are accessed by name as views into the
+    block, so allocating, slicing, exporting or sending the results to
+    another process touches a single buffer. Columns that are constant over
+    the months are kept as one value per scenario and read as zero-copy
+    broadcast views.
+
+    Parameters
+    ----------
+    data: array of float
+        (scenarios..., stored columns, months) block of values - a new
+        array, a memory map or a shared memory buffer
+    columns: tuple of str
+        names of all the columns, in export order
+    consts: dict, optional
+        value per scenario of every constant column
+    '''
+
+    __slots__ = ('data', 'columns', 'consts', 'index')
+
+    def __init__(self, data, columns=RVB_COLUMNS, consts=None):
+        self.data = data
+        self.columns = tuple(columns)
+        self.consts = {} if consts is None else consts
+        self.index = {key: i for i, key in enumerate(
+            [key for key in self.columns if key not in self.consts])}
+
+    @classmethod
+    def zeros(cls, months, shape=(), columns=RVB_COLUMNS,
+              const_columns=RVB_CONST_COLUMNS):
+        '''
+        allocate a zero filled block
+
+        Parameters
+        ----------
+        months: int
+            number of months
+        shape: tuple of int
+            shape of the scenario axes, () for a single scenario
+        columns: tuple of str
+            names of all the columns, in export order
+        const_columns: tuple of str
+            columns that are constant over the months
+
+        Returns
+        -------
+        block: MonthlyBlock
+            zero filled block
+        '''
+
+        shape = tuple(shape)
+        consts = {key: np.zeros(shape) for key in const_columns}
+        n_stored = len(columns) - len(consts)
+
+        return cls(np.zeros(shape + (n_stored, months)), columns, consts)
+
+    def __getitem__(self, key):
+        if key in self.consts:
+            return np.broadcast_to(self.consts[key][..., None],
+                                   self.shape + (len(self),))
+        return self.data[..., self.index[key], :]
+
+    def __setitem__(self, key, val):
+        if key in self.consts:
+            # the value of a constant column is given per scenario
+            self.consts[key][...] = val
+        else:
+            self.data[..., self.index[key], :] = val
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return self.data.shape[-1]
+
+    def keys(self):
+        return self.columns
+
+    def items(self):
+        return [(key, self[key]) for key in self.columns]
+
+    @property
+    def shape(self):
+        '''
+        shape of the scenario axes
+        '''
+        return self.data.shape[:-2]
+
+    def take(self, idx):
+        '''
+        select scenarios, e.g. block.take(3) or block.take(slice(0, 10))
+
+        Parameters
+        ----------
+        idx: int, slice or array of int
+            index along the scenario axes
+
+        Returns
+        -------
+        block: MonthlyBlock
+            block with the selected scenarios
+        '''
+
+        return MonthlyBlock(self.data[idx], self.columns,
+                            {key: val[idx] for key, val in
+                             self.consts.items()})
+
+    def export(self):
+        '''
+        expand all the columns, including the constant ones, into one
+        array for writing out
+
+        Returns
+        -------
+        arr: array of float
+            (scenarios..., columns, months) values in export order
+        '''
+
+        return np.stack([self[key] for key in self.columns], axis=-2)
+
+
+def calc_rent_vs_buy(home_val, down_pay, loan_term, hoa, maint, prop_tax,
+                     tax_bkt, rent, mon_int_rate, mon_home_appr,
+                     mon_rent_appr, mon_inv_ret, out=None):
+    '''
+    Vectorized monthly rent vs buy model. The month-to-month recurrences are
+    solved with cumulative products and sums instead of a loop over months.
+    Scalar arguments may also be arrays of scenarios, and the monthly rate
+    arrays have the months along the last axis, so many scenarios are
+    computed in one call.
+
+    Parameters
+    ----------
+    home_val: float or array of float
+        purchase price of home
+    down_pay: float or array of float
+        down payment
+    loan_term: int or array of int
+        loan term in years
+    hoa: float or array of float
+        monthly HOA and Mello-Roos
+    maint: float or array of float
+        monthly maintenance
+    prop_tax: float or array of float
+        annual property tax percentage (%)
+    tax_bkt: float or array of float
+        tax bracket (%)
+    rent: float or array of float
+        monthly rent in the first month
+    mon_int_rate: array of float or StepSeries
+        monthly interest rate (%) for every month
+    mon_home_appr: array of float or StepSeries
+        monthly home appreciation (%) for every month
+    mon_rent_appr: array of float or StepSeries
+        monthly rent appreciation (%) for every month
+    mon_inv_ret: array of float or StepSeries
+        monthly investment returns (%) for every month
+    out: MonthlyBlock, optional
+        block to store the results in, allocated if not given
+
+    Returns
+    -------
+    out: MonthlyBlock
+        monthly quantities for the buying and renting scenarios, with the
+        column names in RVB_COLUMNS
+    '''
+
+    def col(x):
+        # scenario parameters broadcast against the month axis
+        return np.asarray(x, dtype=float)[..., None]
+
+    def shift(x, first):
+        # value of the previous month, with first used for the first month
+        first = np.broadcast_to(first, x.shape[:-1] + (1,))
+        return np.concatenate([first, x[..., :-1]], axis=-1)
+
+    rate = np.asarray(mon_int_rate, dtype=float) / 100
+    months = rate.shape[-1]
+    home_val, down_pay, rent = col(home_val), col(down_pay), col(rent)
+
+    res = {}
+
+    # loan amount is home value minus down payment
+    loan_amt = home_val - down_pay
+
+    # rem_term is the months left in life of loan. Payment per dollar of
+    # outstanding principal, 0 once the loan is paid off
+    rem_term = col(loan_term) * 12 - np.arange(months)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ann = np.where(rate == 0, 1 / rem_term,
+                       rate / (1 - (1 + rate)**(-rem_term)))
+        ann = np.where(rem_term > 0, ann, 0)
+
+    # outstanding principal shrinks by a constant factor every month
+    growth = np.where(rem_term > 1, 1 + rate - ann, 0)
+    res['mon_out_prin'] = loan_amt * np.cumprod(growth, axis=-1)
+    prev_prin = shift(res['mon_out_prin'], loan_amt)
+
+    # interest and principal component of loan
+    res['mon_int'] = rate * prev_prin
+    res['mon_prin'] = prev_prin * (ann - rate)
+
+    # home value appreciates every month
+    res['mon_home_val'] = home_val * \
+        np.cumprod(1 + np.asarray(mon_home_appr) / 100, axis=-1)
+
+    # monthly property tax is based on the previous months home value
+    res['mon_proptax'] = col(prop_tax) / (12*100) * \
+        shift(res['mon_home_val'], home_val)
+
+    # monthly HOA and maintenance are constant
+    res['mon_hoa'] = col(hoa)
+    res['mon_maint'] = col(maint)
+
+    # monthly tax break based on mortgage interest and property tax
+    res['mon_taxbrk'] = col(tax_bkt) / 100 * \
+        (res['mon_proptax'] + res['mon_int'])
+
+    # monthly home insurance - assuming home insurance is 10% of prop tax
+    res['mon_homeins'] = res['mon_proptax'] / 10
+
+    # monthly cash outflow to buy a home
+    res['mon_buy_outflow'] = res['mon_prin'] + res['mon_int'] + \
+        res['mon_proptax'] + res['mon_hoa'] + res['mon_homeins'] + \
+        res['mon_maint'] - res['mon_taxbrk']
+
+    # monthly net worth if buying is the difference between home value
+    # outstanding principal
+    res['mon_worth_buy'] = res['mon_home_val'] - res['mon_out_prin']
+
+    # monthly net worth if owning home and selling
+    # based on 6% realtor fees
+    res['mon_worth_buy_sell'] = res['mon_worth_buy'] - \
+        SELL_COST * res['mon_home_val']
+
+    # renting scenario - rent appreciates from the second month on
+    rent_growth = 1 + np.asarray(mon_rent_appr, dtype=float) / 100
+    rent_growth[..., 0] = 1
+    res['mon_rent'] = rent * np.cumprod(rent_growth, axis=-1)
+
+    # monthly cash savings by renting
+    res['mon_savings_rent'] = res['mon_buy_outflow'] - res['mon_rent']
+
+    # monthly net worth by renting and investing the down payment and the
+    # savings from the second month on. W[k] = s[k] + (1+i[k]) W[k-1] is
+    # solved as W = G * (down_pay + cumsum(s / G)) with G = cumprod(1+i)
+    inv_growth = np.cumprod(1 + np.asarray(mon_inv_ret) / 100, axis=-1)
+    savings = res['mon_savings_rent'].copy()
+    savings[..., 0] = 0
+    res['mon_worth_rent'] = inv_growth * \
+        (down_pay + np.cumsum(savings / inv_growth, axis=-1))
+
+    # store all the columns in one contiguous block, with the constant
+    # columns kept as one value per scenario
+    if out is None:
+        shape = np.broadcast_shapes(*[res[key].shape for key in res])
+        out = MonthlyBlock.zeros(months, shape[:-1])
+    for key in RVB_COLUMNS:
+        out[key] = res[key][..., 0] if key in out.consts else res[key]
+
+    return out
+
+
+def iter_rent_vs_buy(home_val, down_pay, loan_term, hoa, maint, prop_tax,
+                     tax_bkt, rent, mon_int_rate, mon_home_appr,
+                     mon_rent_appr, mon_inv_ret, extra_pay=0.0):
+    '''
+    Month by month rent vs buy model as a generator. Only the state of the
+    current month is kept, so rows can be written out as they are computed,
+    the horizon can be open-ended, and the consumer can stop at any month,
+    e.g. at breakeven. Follows the same recurrences as the monthly loop of
+    housing_jit, including the additional principal payment.
+
+    Parameters
+    ----------
+    home_val, down_pay, loan_term, hoa, maint, prop_tax, tax_bkt, rent:
+    float or array of float
+        scenario parameters, see calc_rent_vs_buy
+    mon_int_rate, mon_home_appr, mon_rent_appr, mon_inv_ret: iterable
+        monthly rate (%) of every month, e.g. a StepSeries, a list or an
+        endless generator - the model stops when any of them runs out
+    extra_pay: float or array of float
+        additional monthly principal payment
+
+    Yields
+    ------
+    row: dict
+        month number, starting at 1, and the quantities in RVB_COLUMNS of
+        that month
+    '''
+
+    home = np.asarray(home_val, dtype=float)
+    down_pay = np.asarray(down_pay, dtype=float)
+    out_prin = home - down_pay
+    sched_prin = out_prin
+    cur_rent = np.asarray(rent, dtype=float)
+    worth_rent = down_pay
+    term = np.asarray(loan_term) * 12
+
+    rates = zip(mon_int_rate, mon_home_appr, mon_rent_appr, mon_inv_ret)
+    for month, (int_rate, home_appr, rent_appr, inv_ret) in enumerate(rates):
+        rate = np.asarray(int_rate, dtype=float) / 100
+
+        # monthly property tax is based on the previous months home value,
+        # then the home value appreciates
+        proptax = prop_tax / (12*100) * home
+        home = (1 + np.asarray(home_appr) / 100) * home
+
+        # payment due on the scheduled balance, as if no additional
+        # principal was paid, over the months left in life of loan
+        # (rem_term)
+        rem_term = term - month
+        with np.errstate(divide='ignore', invalid='ignore'):
+            payment = np.where(rate == 0, sched_prin / rem_term,
+                               sched_prin * rate /
+                               (1 - (1 + rate)**(-rem_term)))
+        payment = np.where(rem_term > 0, payment, 0)
+        sched_prin = sched_prin - (payment - rate * sched_prin)
+
+        # interest and principal component of loan, capped at the
+        # outstanding principal
+        interest = rate * out_prin
+        principal = np.minimum(payment - interest + extra_pay, out_prin)
+        out_prin = out_prin - principal
+
+        taxbrk = tax_bkt / 100 * (proptax + interest)
+        homeins = proptax / 10
+        outflow = principal + interest + proptax + hoa + homeins + maint - \
+            taxbrk
+        worth_buy = home - out_prin
+
+        # rent appreciates from the second month on, and the down payment
+        # and monthly savings are invested
+        if month > 0:
+            cur_rent = (1 + np.asarray(rent_appr) / 100) * cur_rent
+        savings = outflow - cur_rent
+        worth_rent = (1 + np.asarray(inv_ret) / 100) * worth_rent
+        if month > 0:
+            worth_rent = worth_rent + savings
+
+        yield {'month': month + 1,
+               'mon_home_val': home,
+               'mon_int': interest,
+               'mon_prin': principal,
+               'mon_out_prin': out_prin,
+               'mon_proptax': proptax,
+               'mon_hoa': np.asarray(hoa, dtype=float),
+               'mon_taxbrk': taxbrk,
+               'mon_maint': np.asarray(maint, dtype=float),
+               'mon_homeins': homeins,
+               'mon_buy_outflow': outflow,
+               'mon_worth_buy': worth_buy,
+               'mon_worth_buy_sell': worth_buy - SELL_COST * home,
+               'mon_rent': cur_rent,
+               'mon_savings_rent': savings,
+               'mon_worth_rent': worth_rent}
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# constants and result container of the rent vs buy model
+from housing_core import SELL_COST, MonthlyBlock
+
+# numba is optional - without it the loops below run as plain python
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def jit(func):
+    '''
+    compile func with numba in nopython mode when numba is installed,
+    otherwise return func unchanged
+
+    Parameters
+    ----------
+    func: function
+        monthly loop to be compiled
+
+    Returns
+    -------
+    func: function
+        compiled or plain python function
+    '''
+
+    if numba is None:
+        return func
+
+    return numba.njit(cache=True)(func)
+
+
+def _schedule_loop(loan_amt, int_rate, months, interest_only, extra_pay,
+                   out):
+    '''
+    month by month amortization of a batch of loans with an additional
+    monthly principal payment. The level payment is set once from the loan
+    amount and term, and the additional payment goes on top of it, so the
+    loan is paid off early and the months after are 0, which makes the
+    schedule path dependent.
+
+    Parameters
+    ----------
+    loan_amt: array of float
+        loan amount of every loan
+    int_rate: array of float
+        annual interest rate (%) of every loan
+    months: int
+        number of months in the loan term
+    interest_only: bool
+        True for interest only loans
+    extra_pay: array of float
+        additional monthly principal payment of every loan
+    out: array of float
+        (loans, 4, months) array filled with the payment, interest,
+        principal and outstanding principal after the payment
+
+    Returns
+    -------
+    n_paid: array of int
+        number of months until every loan is paid off (months if never)
+    '''
+
+    n_paid = np.full(len(loan_amt), months)
+
+    for j in range(len(loan_amt)):
+        out_prin = loan_amt[j]
+        rate = int_rate[j] / (12 * 100)
+
+        # level payment over the loan term - the term is kept as float so
+        # that numba and python both evaluate the power with pow
+        if rate == 0:
+            payment = out_prin / float(months)
+        else:
+            payment = out_prin * rate / (1 - (1 + rate)**(-float(months)))
+
+        for month in range(months):
+            # interest component
+            interest = rate * out_prin
+
+            if interest_only:
+                # only the additional payment goes towards principal
+                principal = extra_pay[j]
+            else:
+                principal = payment - interest + extra_pay[j]
+
+            # can not pay more than the outstanding principal
+            if principal > out_prin:
+                principal = out_prin
+
+            out_prin = out_prin - principal
+
+            out[j, 0, month] = interest + principal
+            out[j, 1, month] = interest
+            out[j, 2, month] = principal
+            out[j, 3, month] = out_prin
+
+            # when the loan is paid off - stop looping
+            if out_prin <= 0:
+                n_paid[j] = month + 1
+                break
+
+    return n_paid
+
+
+def _rent_vs_buy_loop(home_val, down_pay, loan_term, hoa, maint, prop_tax,
+                      tax_bkt, rent, mon_int_rate, mon_home_appr,
+                      mon_rent_appr, mon_inv_ret, extra_pay, out):
+    '''
+    month by month rent vs buy model for a batch of scenarios, following
+    the original calc_params loop, with an additional monthly principal
+    payment that stops once the loan is paid off. The payment is the one
+    due without the additional payments - it follows the scheduled balance,
+    and only changes with the interest rate - so extra principal shortens
+    the loan instead of lowering later payments.
+
+    Parameters
+    ----------
+    home_val, down_pay, loan_term, hoa, maint, prop_tax, tax_bkt, rent,
+    extra_pay: array of float
+        scenario parameters, one entry per scenario
+    mon_int_rate, mon_home_appr, mon_rent_appr, mon_inv_ret: array of float
+        (scenarios, months) monthly rates (%)
+    out: array of float
+        (scenarios, 13, months) array filled with the monthly quantities in
+        RVB_COLUMNS order, leaving out the constant HOA and maintenance
+
+    Returns
+    -------
+    None
+    '''
+
+    months = mon_int_rate.shape[1]
+
+    for j in range(len(home_val)):
+        home = home_val[j]
+        out_prin = home_val[j] - down_pay[j]
+        sched_prin = out_prin
+        cur_rent = rent[j]
+        worth_rent = down_pay[j]
+
+        for month in range(months):
+            rate = mon_int_rate[j, month] / 100
+
+            # monthly property tax is based on the previous months home
+            # value, then the home value appreciates
+            proptax = prop_tax[j] / (12*100) * home
+            home = (1 + mon_home_appr[j, month]/100) * home
+
+            # payment due on the scheduled balance over the months left
+            # in life of loan (rem_term)
+            rem_term = loan_term[j] * 12 - month
+            if rem_term <= 0:
+                payment = 0.0
+            elif rate == 0:
+                payment = sched_prin / rem_term
+            else:
+                payment = sched_prin * rate / (1 - (1 + rate)**(-rem_term))
+            sched_prin = sched_prin - (payment - rate * sched_prin)
+
+            # interest and principal component of loan
+            interest = rate * out_prin
+            principal = payment - interest + extra_pay[j]
+            if principal > out_prin:
+                principal = out_prin
+            out_prin = out_prin - principal
+
+            taxbrk = tax_bkt[j] / 100 * (proptax + interest)
+            homeins = proptax / 10
+            outflow = principal + interest + proptax + hoa[j] + homeins + \
+                maint[j] - taxbrk
+            worth_buy = home - out_prin
+
+            # rent appreciates from the second month on, and the down
+            # payment and monthly savings are invested
+            if month > 0:
+                cur_rent = (1 + mon_rent_appr[j, month]/100) * cur_rent
+            savings = outflow - cur_rent
+            if month == 0:
+                worth_rent = (1 + mon_inv_ret[j, month]/100) * worth_rent
+            else:
+                worth_rent = savings + \
+                    (1 + mon_inv_ret[j, month]/100) * worth_rent
+
+            out[j, 0, month] = home
+            out[j, 1, month] = interest
+            out[j, 2, month] = principal
+            out[j, 3, month] = out_prin
+            out[j, 4, month] = proptax
+            out[j, 5, month] = taxbrk
+            out[j, 6, month] = homeins
+            out[j, 7, month] = outflow
+            out[j, 8, month] = worth_buy
+            out[j, 9, month] = worth_buy - SELL_COST * home
+            out[j, 10, month] = cur_rent
+            out[j, 11, month] = savings
+            out[j, 12, month] = worth_rent
+
+
+# compiled versions, or the plain python loops when numba is missing
+schedule_loop = jit(_schedule_loop)
+rent_vs_buy_loop = jit(_rent_vs_buy_loop)
+
+
+def calc_schedule_prepay(loan_amt, years, int_rate, loan_type='R',
+                         extra_pay=0.0, use_jit=True):
+    '''
+    Calculate schedule of payments month over month with an additional
+    monthly principal payment. Months after a loan is paid off are 0.
+
+    Parameters
+    ----------
+    loan_amt: float or array of float
+        outstanding loan amount
+    years: int
+        number of years in the loan
+    int_rate: float or array of float
+        fixed interest rate at start of the loan (%)
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+    extra_pay: float or array of float
+        additional monthly principal payment
+    use_jit: bool
+        use the numba compiled loop when available
+
+    Returns
+    -------
+    [pay_h, int_h, prin_h, month_h, out_prin_h]: list
+        list containing monthly total payment to bank, monthly interest
+        component to bank, monthly principal component to bank, month of
+        payment in numbers 1, 2, 3... etc, outstanding principal after
+        current monthly payment
+    '''
+
+    months = years * 12
+    shape = np.broadcast_shapes(np.shape(loan_amt), np.shape(int_rate),
+                                np.shape(extra_pay))
+
+    def flat(x):
+        return np.broadcast_to(np.asarray(x, dtype=float), shape).ravel()
+
+    out = np.zeros((int(np.prod(shape)), 4, months))
+    loop = schedule_loop if use_jit else _schedule_loop
+    loop(flat(loan_amt), flat(int_rate), months, loan_type == 'I',
+         flat(extra_pay), out)
+
+    out = out.reshape(shape + (4, months))
+    return [out[..., 0, :], out[..., 1, :], out[..., 2, :],
+            np.arange(1, months + 1), out[..., 3, :]]
+
+
+def calc_rent_vs_buy_loop(home_val, down_pay, loan_term, hoa, maint,
+                          prop_tax, tax_bkt, rent, mon_int_rate,
+                          mon_home_appr, mon_rent_appr, mon_inv_ret,
+                          extra_pay=0.0, use_jit=True, out=None):
+    '''
+    Monthly rent vs buy model computed with the month by month loop, which
+    supports an additional monthly principal payment. Arguments are as in
+    housing_core.calc_rent_vs_buy.
+
+    Parameters
+    ----------
+    home_val, down_pay, loan_term, hoa, maint, prop_tax, tax_bkt, rent:
+    float or array of float
+        scenario parameters, see housing_core.calc_rent_vs_buy
+    mon_int_rate, mon_home_appr, mon_rent_appr, mon_inv_ret: array of float
+        monthly rates (%) with the months along the last axis
+    extra_pay: float or array of float
+        additional monthly principal payment
+    use_jit: bool
+        use the numba compiled loop when available
+    out: MonthlyBlock, optional
+        block to store the results in, allocated if not given
+
+    Returns
+    -------
+    out: MonthlyBlock
+        monthly quantities for the buying and renting scenarios, with the
+        column names in housing_core.RVB_COLUMNS
+    '''
+
+    scalars = [home_val, down_pay, loan_term, hoa, maint, prop_tax,
+               tax_bkt, rent, extra_pay]
+    rates = [np.asarray(x, dtype=float) for x in
+             (mon_int_rate, mon_home_appr, mon_rent_appr, mon_inv_ret)]
+    months = rates[0].shape[-1]
+    shape = np.broadcast_shapes(*[np.shape(x) for x in scalars],
+                                *[np.shape(x)[:-1] for x in rates])
+    n = int(np.prod(shape))
+
+    scalars = [np.broadcast_to(np.asarray(x, dtype=float), shape).ravel()
+               for x in scalars]
+    rates = [np.ascontiguousarray(np.broadcast_to(
+        x, shape + (months,)).reshape(n, months)) for x in rates]
+
+    # the loop writes straight into the block, unless the block is not
+    # contiguous and has to be copied back
+    if out is None:
+        out = MonthlyBlock.zeros(months, shape)
+    data = out.data.reshape(n, len(out.index), months)
+    loop = rent_vs_buy_loop if use_jit else _rent_vs_buy_loop
+    loop(*scalars[:8], *rates, scalars[8], data)
+    if not np.shares_memory(data, out.data):
+        out.data[...] = data.reshape(out.data.shape)
+
+    # constant columns
+    out['mon_hoa'] = scalars[3].reshape(shape)
+    out['mon_maint'] = scalars[4].reshape(shape)
+
+    return out
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+# event loop, streams and futures
+import asyncio
+# request and response bodies
+import json
+# numpy for array tasks
+import numpy as np
+# shared numeric core
+from housing_core import calc_affordability, calc_mon_pay, \
+    calc_rent_vs_buy, monthly_rates
+
+
+def get_number(req, key):
+    '''
+    a finite number from a request
+
+    Parameters
+    ----------
+    req: dict
+        request
+    key: str
+        entry to read
+
+    Returns
+    -------
+    val: float
+        value of the entry
+
+    Raises
+    ------
+    ValueError
+        the value is not finite
+    '''
+
+    val = float(req[key])
+    if not np.isfinite(val):
+        raise ValueError('%s must be a finite number' % key)
+
+    return val
+
+
+def get_years(req, key):
+    '''
+    a number of years of at least 1 from a request
+
+    Parameters
+    ----------
+    req: dict
+        request
+    key: str
+        entry to read
+
+    Returns
+    -------
+    val: int
+        value of the entry
+
+    Raises
+    ------
+    ValueError
+        the value is less than 1
+    '''
+
+    val = int(get_number(req, key))
+    if val < 1:
+        raise ValueError('%s must be at least 1' % key)
+
+    return val
+
+
+def norm_mortgage(req):
+    '''
+    validate a mortgage request and fill in defaults
+
+    Parameters
+    ----------
+    req: dict
+        loan_amt (or home_val and down_pay), years, int_rate and optionally
+        loan_type (R or I)
+
+    Returns
+    -------
+    req: dict
+        normalized request
+    '''
+
+    if 'loan_amt' in req:
+        loan_amt = get_number(req, 'loan_amt')
+    else:
+        loan_amt = get_number(req, 'home_val') - get_number(req, 'down_pay')
+
+    return {'loan_amt': loan_amt,
+            'years': get_years(req, 'years'),
+            'int_rate': get_number(req, 'int_rate'),
+            'loan_type': str(req.get('loan_type', 'R')).upper()}
+
+
+def norm_affordability(req):
+    '''
+    validate an affordability request and fill in defaults
+
+    Parameters
+    ----------
+    req: dict
+        home_val, down_pay, loan_term, int_rate, hoa, maint, prop_tax_pct
+        and optionally loan_type (R or I)
+
+    Returns
+    -------
+    req: dict
+        normalized request
+    '''
+
+    res = {key: get_number(req, key) for key in
+           ('home_val', 'down_pay', 'int_rate', 'hoa', 'maint',
+            'prop_tax_pct')}
+    res['loan_term'] = get_years(req, 'loan_term')
+    res['loan_type'] = str(req.get('loan_type', 'R')).upper()
+
+    return res
+
+
+def norm_rent_vs_buy(req):
+    '''
+    validate a rent vs buy request. The annual rates may be a single value
+    or one value per modeled year, as in rent_vs_buy.
+
+    Parameters
+    ----------
+    req: dict
+        home_val, down_pay, loan_term, hoa, maint, prop_tax, tax_bkt, rent,
+        yrs, int_rate, home_appr, rent_appr, inv_ret and optionally monthly
+        to return the monthly net worth
+
+    Returns
+    -------
+    req: dict
+        normalized request with per-year arrays for the annual rates
+    '''
+
+    res = {key: get_number(req, key) for key in
+           ('home_val', 'down_pay', 'hoa', 'maint', 'prop_tax', 'tax_bkt',
+            'rent')}
+    res['loan_term'] = get_years(req, 'loan_term')
+    res['yrs'] = get_years(req, 'yrs')
+    res['monthly'] = bool(req.get('monthly', False))
+
+    for key in ('int_rate', 'home_appr', 'rent_appr', 'inv_ret'):
+        val = np.atleast_1d(np.asarray(req[key], dtype=float))
+        if len(val) not in (1, res['yrs']):
+            raise ValueError('%s needs 1 or %d entries' % (key, res['yrs']))
+        if not np.all(np.isfinite(val)):
+            raise ValueError('%s must be finite numbers' % key)
+        res[key] = np.broadcast_to(val, (res['yrs'],))
+
+    return res
+
+
+def batch_mortgage(reqs):
+    '''
+    monthly payment and total interest for a batch of mortgage requests in
+    one vectorized call per loan type
+
+    Parameters
+    ----------
+    reqs: list of dict
+        normalized mortgage requests
+
+    Returns
+    -------
+    res: list of dict
+        one result per request
+    '''
+
+    res = [None] * len(reqs)
+
+    for loan_type in set(req['loan_type'] for req in reqs):
+        idx = [i for i, req in enumerate(reqs)
+               if req['loan_type'] == loan_type]
+        loan_amt = np.array([reqs[i]['loan_amt'] for i in idx])
+        months = np.array([reqs[i]['years'] for i in idx]) * 12
+        int_rate = np.array([reqs[i]['int_rate'] for i in idx])
+
+        payment, interest, principal = \
+            calc_mon_pay(loan_amt, months, int_rate, loan_type)
+        # the payment is level, so total interest is all payments minus
+        # the principal returned (none for interest only loans)
+        tot_int = payment * months - np.where(loan_type == 'I', 0, loan_amt)
+
+        for j, i in enumerate(idx):
+            res[i] = {'mon_bank_pay': float(payment[j]),
+                      'interest': float(interest[j]),
+                      'principal': float(principal[j]),
+                      'tot_int': float(tot_int[j])}
+
+    return res
+
+
+def batch_affordability(reqs):
+    '''
+    monthly commitment for a batch of affordability requests in one
+    vectorized call per loan type
+
+    Parameters
+    ----------
+    reqs: list of dict
+        normalized affordability requests
+
+    Returns
+    -------
+    res: list of dict
+        one result per request
+    '''
+
+    res = [None] * len(reqs)
+
+    for loan_type in set(req['loan_type'] for req in reqs):
+        idx = [i for i, req in enumerate(reqs)
+               if req['loan_type'] == loan_type]
+        cols = {key: np.array([reqs[i][key] for i in idx]) for key in
+                ('home_val', 'down_pay', 'loan_term', 'int_rate', 'hoa',
+                 'maint', 'prop_tax_pct')}
+
+        out = calc_affordability(cols['home_val'], cols['down_pay'],
+                                 cols['loan_term'], cols['int_rate'],
+                                 cols['hoa'], cols['maint'],
+                                 cols['prop_tax_pct'], loan_type)
+
+        for j, i in enumerate(idx):
+            res[i] = {key: float(val[j]) for key, val in out.items()}
+
+    return res
+
+
+def batch_rent_vs_buy(reqs):
+    '''
+    rent vs buy model for a batch of requests, in one vectorized call per
+    modeling horizon
+
+    Parameters
+    ----------
+    reqs: list of dict
+        normalized rent vs buy requests
+
+    Returns
+    -------
+    res: list of dict
+        one result per request - the final net worth for buying and renting,
+        and the monthly net worth if requested
+    '''
+
+    res = [None] * len(reqs)
+
+    for yrs in set(req['yrs'] for req in reqs):
+        idx = [i for i, req in enumerate(reqs) if req['yrs'] == yrs]
+
+        def col(key):
+            return np.array([reqs[i][key] for i in idx])
+
+        out = calc_rent_vs_buy(col('home_val'), col('down_pay'),
+                               col('loan_term'), col('hoa'), col('maint'),
+                               col('prop_tax'), col('tax_bkt'), col('rent'),
+                               monthly_rates(col('int_rate'), yrs),
+                               monthly_rates(col('home_appr'), yrs),
+                               monthly_rates(col('rent_appr'), yrs),
+                               monthly_rates(col('inv_ret'), yrs))
+
+        for j, i in enumerate(idx):
+            res[i] = {
+                'worth_buy_sell': float(out['mon_worth_buy_sell'][j, -1]),
+                'worth_rent': float(out['mon_worth_rent'][j, -1])}
+            if reqs[i]['monthly']:
+                res[i]['mon_worth_buy_sell'] = \
+                    out['mon_worth_buy_sell'][j].tolist()
+                res[i]['mon_worth_rent'] = out['mon_worth_rent'][j].tolist()
+
+    return res
+
+
+# request kinds - how to validate one request and compute a batch
+KINDS = {'mortgage': (norm_mortgage, batch_mortgage),
+         'affordability': (norm_affordability, batch_affordability),
+         'rent_vs_buy': (norm_rent_vs_buy, batch_rent_vs_buy)}
+
+
+class MicroBatcher:
+    '''
+    Collects concurrent requests of one kind for a short window, computes
+    them together in one batched call in a worker thread, and hands every
+    caller its own result.
+
+    Parameters
+    ----------
+    batch_fn: function
+        computes a list of results from a list of requests
+    window: float
+        seconds to wait for more requests after the first one arrives
+    max_batch: int
+        maximum number of requests in one batch
+    '''
+
+    def __init__(self, batch_fn, window=0.005, max_batch=4096):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.task = None
+
+    async def submit(self, req):
+        '''
+        queue a request and wait for its result
+
+        Parameters
+        ----------
+        req: dict
+            normalized request
+
+        Returns
+        -------
+        res: dict
+            result of the request
+        '''
+
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((req, fut))
+
+        return await fut
+
+    async def run(self):
+        '''
+        collect requests into batches and compute them, forever
+        '''
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # wait for the first request, then gather more for a window
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(),
+                                                        timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # compute off the event loop so that requests keep arriving
+            reqs = [req for req, fut in batch]
+            try:
+                res = await loop.run_in_executor(None, self.batch_fn, reqs)
+            except Exception:
+                # compute the requests one by one, so a bad request only
+                # fails its own caller
+                res = None
+
+            for i, (req, fut) in enumerate(batch):
+                if fut.done():
+                    continue
+                if res is not None:
+                    fut.set_result(res[i])
+                    continue
+                try:
+                    val = await loop.run_in_executor(None, self.batch_fn,
+                                                     [req])
+                    fut.set_result(val[0])
+                except Exception as e:
+                    fut.set_exception(e)
+
+
+class ScenarioService:
+    '''
+    Long-lived HTTP service for mortgage, affordability and rent vs buy
+    requests. POST a JSON object to /mortgage, /affordability or
+    /rent_vs_buy and the result comes back as JSON.
+
+    Parameters
+    ----------
+    window: float
+        micro-batching window in seconds
+    max_batch: int
+        maximum number of requests in one batch
+    '''
+
+    def __init__(self, window=0.005, max_batch=4096):
+        self.batchers = {kind: MicroBatcher(batch_fn, window, max_batch)
+                         for kind, (norm_fn, batch_fn) in KINDS.items()}
+
+    async def handle(self, kind, body):
+        '''
+        compute one request
+
+        Parameters
+        ----------
+        kind: str
+            request kind - mortgage, affordability or rent_vs_buy
+        body: bytes
+            JSON request body
+
+        Returns
+        -------
+        [status, res]: list
+            HTTP status code and JSON serializable result
+        '''
+
+        if kind not in KINDS:
+            return [404, {'error': 'unknown request kind %s' % kind}]
+
+        try:
+            req = KINDS[kind][0](json.loads(body))
+        except Exception as e:
+            return [400, {'error': '%s: %s' % (type(e).__name__, e)}]
+
+        try:
+            return [200, await self.batchers[kind].submit(req)]
+        except Exception as e:
+            return [500, {'error': '%s: %s' % (type(e).__name__, e)}]
+
+    async def serve_client(self, reader, writer):
+        '''
+        serve HTTP/1.1 requests on one connection, with keep-alive
+        '''
+
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                   500: 'Internal Server Error'}
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode('latin-1').split()
+
+                # headers
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, val = line.decode('latin-1').split(':', 1)
+                    headers[key.strip().lower()] = val.strip()
+
+                body = await reader.readexactly(
+                    int(headers.get('content-length', 0)))
+
+                if method == 'POST':
+                    status, res = await self.handle(target.strip('/'), body)
+                else:
+                    status, res = [404, {'error': 'POST a JSON request'}]
+
+                data = json.dumps(res).encode()
+                writer.write(('HTTP/1.1 %d %s\r\n'
+                              'Content-Type: application/json\r\n'
+                              'Content-Length: %d\r\n\r\n'
+                              % (status, reasons[status], len(data))
+                              ).encode() + data)
+                await writer.drain()
+
+                if headers.get('connection', '').lower() == 'close' or \
+                        version == 'HTTP/1.0':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=8080, path=None, window=0.005,
+                max_batch=4096):
+    '''
+    run the scenario service until cancelled
+
+    Parameters
+    ----------
+    host: str
+        address to listen on
+    port: int
+        TCP port to listen on
+    path: str, optional
+        listen on this Unix socket instead of TCP
+    window: float
+        micro-batching window in seconds
+    max_batch: int
+        maximum number of requests in one batch
+
+    Returns
+    -------
+    None
+    '''
+
+    service = ScenarioService(window, max_batch)
+
+    if path is None:
+        server = await asyncio.start_server(service.serve_client, host, port)
+        print('Serving on http://%s:%d' % (host, port))
+    else:
+        server = await asyncio.start_unix_server(service.serve_client, path)
+        print('Serving on unix socket %s' % (path))
+
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    '''
+    Runs mortgage, affordability and rent vs buy calculations as a local
+    service.
+
+    Requests that arrive within a few milliseconds of each other are
+    computed together in one vectorized call, which avoids starting a new
+    process for every quote and keeps throughput high under load.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', default=None,
+                        help='listen on a Unix socket path instead of TCP')
+    parser.add_argument('--window', type=float, default=5,
+                        help='micro-batching window in milliseconds')
+    parser.add_argument('--max-batch', type=int, default=4096)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix,
+                          args.window / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -7,8 +7,13 @@ __email__ = 'arunmano121@outlook.com'
 
 # plotting tools
 import matplotlib.pyplot as plt
+# slider widgets for the interactive mode
+from matplotlib.widgets import Slider
 # numpy for array tasks
 import numpy as np
+# shared numeric core
+from housing_core import calc_affordability, calc_lifetime, calc_mon_pay, \
+    get_valid_input
 
 
 def visualize_results(home_param):
@@ -45,7 +50,7 @@ def visualize_results(home_param):
     for i in range(len(home_param['home_val'])):
         ax.plot(np.squeeze(home_param['int_rate']),
                 home_param['mon_commit'][i, :],
-                label='%0.3f' % (home_param['home_val'][i]/1e6))
+                label='%0.3f' % (home_param['home_val'][i, 0]/1e6))
 
     # add horizontal line showing the max budget
     ax.axhline(home_param['mon_budget'],
@@ -67,49 +72,123 @@ def visualize_results(home_param):
     return
 
 
-def calc_mon_pay(out_prin, months, int_rate, loan_type):
+def interactive_results(home_param):
     '''
-    calculate monthly payment including interest and principal
+    Interactive version of visualize_results. Sliders for down payment,
+    monthly HOA, property tax percentage and monthly budget update the
+    existing line artists in place, and only the plot area is redrawn
+    using blitting, so each update is cheap enough to explore live.
 
     Parameters
     ----------
-    out_prin: float
-        outstanding principal amount owed to bank
-    months: int
-        number of remaining months in loan
-    int_rate: float
-        fixed interest rate
-    loan_type: str
-        Indicator to specify if the loan is a regular loan or interest only
+    home_param: dict
+        parameters of the home and the calculated quantities
 
     Returns
     -------
-    [payment, interest, principal]: list
-        list containing total monthly payment to bank, interest component in
-        the monthly payment, principal component in the monthly payment
+    None
     '''
 
-    # monthly payment not including home ins and property tax and HOA
-    # this only includes the loan amount based payment that is due to bank
-    try:
-        payment = (out_prin * (int_rate / (12 * 100)) /
-                   (1 - (1 + int_rate / (12 * 100))**(-months)))
-    except ZeroDivisionError:
-        # if interest rate is 0%
-        payment = out_prin/months
+    int_rate = np.squeeze(home_param['int_rate'])
+    home_val = home_param['home_val']
+
+    # bank payment is linear in loan amount, so compute the payment per
+    # dollar of loan once and scale it on every update
+    pay_factor = calc_mon_pay(1.0, home_param['loan_term']*12,
+                              home_param['int_rate'],
+                              home_param['loan_type'])[0]
+
+    def mon_commit(down_pay, hoa, prop_tax_pct):
+        # payment to bank, hoa, prop tax, home ins (10% of prop tax) and
+        # maintenance - same quantities as compute_mortgage_quantities
+        prop_tax = prop_tax_pct / (12*100) * home_val
+        return (home_val - down_pay) * pay_factor + hoa + prop_tax + \
+            prop_tax / 10 + home_param['maint']
 
-    # interest component
-    interest = (int_rate/(12 * 100))*out_prin
+    # slider ranges - down payment can not exceed the cheapest home
+    down_max = float(home_param['home_val_lb'])
+    hoa_max = max(2 * home_param['hoa'], 1000)
+    tax_max = max(2 * home_param['prop_tax_pct'], 3.0)
+    budget_max = max(2 * home_param['mon_budget'], 1000)
 
-    # principal component
-    principal = payment - interest
+    fig, ax = plt.subplots(nrows=1, ncols=1)
+    fig.subplots_adjust(bottom=0.35, right=0.75)
+    fig.suptitle('Loan Term: %d years, Monthly Maint.: \\$%d'
+                 % (home_param['loan_term'], home_param['maint']))
+
+    # line artists are animated so that they are left out of the cached
+    # background and drawn on top of it on every update
+    commit = mon_commit(home_param['down_pay'], home_param['hoa'],
+                        home_param['prop_tax_pct'])
+    lines = []
+    for i in range(len(home_val)):
+        line, = ax.plot(int_rate, commit[i, :], animated=True,
+                        label='%0.3f' % (home_val[i, 0]/1e6))
+        lines.append(line)
+    budget = ax.axhline(home_param['mon_budget'], linestyle='-.',
+                        linewidth=2, label='Max. budget', animated=True)
+
+    # fixed axis limits covering every slider position, so that updates
+    # never need a rescale (and hence a full redraw)
+    y_lo = min(mon_commit(down_max, 0, 0).min(), 0)
+    y_hi = max(mon_commit(0, hoa_max, tax_max).max(), budget_max)
+    ax.set_xlim([int_rate[0], int_rate[-1]])
+    ax.set_ylim([y_lo, 1.05 * y_hi])
+    ax.set_xlabel('Interest Rate [%]')
+    ax.set_ylabel('Monthly Commitment ($)')
+    ax.set_title('Monthly Commitment vs Interest Rate')
+    ax.legend(title='Home price [\\$M]', bbox_to_anchor=(1.05, 1),
+              loc='upper left', borderaxespad=0.)
+    ax.grid()
+
+    # sliders - drawon is off, they are blitted together with the lines
+    sliders = {}
+    specs = [('down_pay', 'Down payment ($)', 0, down_max),
+             ('hoa', 'HOA ($)', 0, hoa_max),
+             ('prop_tax_pct', 'Prop. tax (%)', 0, tax_max),
+             ('mon_budget', 'Budget ($)', 0, budget_max)]
+    for j, (key, label, lo, hi) in enumerate(specs):
+        s_ax = fig.add_axes([0.2, 0.22 - 0.05*j, 0.5, 0.03])
+        sliders[key] = Slider(s_ax, label, lo, hi, valinit=home_param[key])
+        sliders[key].drawon = False
+
+    canvas = fig.canvas
+    cache = {}
+
+    def draw_animated():
+        for line in lines:
+            ax.draw_artist(line)
+        ax.draw_artist(budget)
+
+    def on_draw(event):
+        # cache the static background after every full draw
+        cache['bg'] = canvas.copy_from_bbox(fig.bbox)
+        draw_animated()
+
+    def update(val):
+        # recompute only the monthly commitment and update the lines
+        commit = mon_commit(sliders['down_pay'].val, sliders['hoa'].val,
+                            sliders['prop_tax_pct'].val)
+        for i, line in enumerate(lines):
+            line.set_ydata(commit[i, :])
+        budget.set_ydata([sliders['mon_budget'].val]*2)
+
+        if 'bg' not in cache:
+            canvas.draw()
+            return
+        canvas.restore_region(cache['bg'])
+        draw_animated()
+        for slider in sliders.values():
+            fig.draw_artist(slider.ax)
+        canvas.blit(fig.bbox)
+
+    canvas.mpl_connect('draw_event', on_draw)
+    for slider in sliders.values():
+        slider.on_changed(update)
 
-    # interest only loan - so set back principal to 0
-    if loan_type == 'I':
-        principal = 0
-        payment = interest
+    plt.show()
 
-    return [payment, interest, principal]
+    return
 
 
 def compute_mortgage_quantities(home_param):
@@ -131,68 +210,25 @@ def compute_mortgage_quantities(home_param):
         the output and computed entities
     '''
 
-    # calculate the schedule of payments
-    home_param['payment'], home_param['interest'], home_param['principal'] =\
-        calc_mon_pay(home_param['loan_amt'], home_param['loan_term']*12,
-                     home_param['int_rate'], home_param['loan_type'])
-
-    # monthly property tax
-    home_param['prop_tax'] = home_param['prop_tax_pct'] / (12*100) * \
-        home_param['home_val']
-
-    # monthly home insurance
-    home_param['home_ins'] = home_param['prop_tax_pct'] / (12*100) * \
-        home_param['home_val'] / 10
-
-    # total monthly commitment is sum of payment to bank, hoa, home ins and
-    # prop tax, maintenance
-    home_param['mon_commit'] = home_param['payment'] + home_param['hoa'] + \
-        home_param['home_ins'] + home_param['prop_tax'] + home_param['maint']
+    # payment to bank, property tax, home insurance and total monthly
+    # commitment for every home value and interest rate
+    home_param.update(
+        calc_affordability(home_param['home_val'], home_param['down_pay'],
+                           home_param['loan_term'], home_param['int_rate'],
+                           home_param['hoa'], home_param['maint'],
+                           home_param['prop_tax_pct'],
+                           home_param['loan_type']))
+
+    # total interest, and interest paid and outstanding principal after 7
+    # and 10 years, for every home value and interest rate
+    home_param.update(
+        calc_lifetime(home_param['home_val'] - home_param['down_pay'],
+                      home_param['loan_term'], home_param['int_rate'],
+                      loan_type=home_param['loan_type']))
 
     return home_param
 
 
-def get_valid_input(msg):
-    '''
-    gets valid inputs for the home prices or down payments in a variety of
-    formats - the user could enter like 1M or 1000000 or 1000K or $1M, etc.
-
-    Parameters
-    ----------
-    msg: str
-        message to be printed on the screen
-
-    Returns
-    -------
-    None
-    '''
-
-    while True:
-        try:
-            # get input
-            inp = input(msg)
-            mod = float(inp.strip(' kK$%Mm,'))
-
-            # check to see if value is in 1000's
-            if 'k' in inp or 'K' in inp:
-                val = mod * 1000
-
-            # check to see if value is in 1000000's
-            elif 'm' in inp or 'M' in inp:
-                val = mod * 1000000
-
-            # else value is as listed
-            else:
-                val = mod
-            break
-
-        except Exception as e:
-            print(e)
-            print('Enter as 100000 or $10,000 or $100K or 100K')
-
-    return val
-
-
 def get_inputs(home_param):
     '''
     gets user inputs for the parameters of the home, and other purchase
@@ -209,6 +245,8 @@ def get_inputs(home_param):
     home_param: dict
         dictionary that contains the main input quantities and also carries
         the output and computed entities
+    interactive_flag: str
+        flag to indicate if the results are explored interactively
     '''
 
     # home value lower bound
@@ -266,7 +304,10 @@ def get_inputs(home_param):
     # reshape to help with numpy broadcasting
     home_param['int_rate'] = int_rate.reshape(1, len(int_rate))
 
-    return home_param
+    # explore results interactively with sliders
+    interactive_flag = input('Interactive mode (y/n): ')
+
+    return home_param, interactive_flag
 
 
 def main():
@@ -287,13 +328,17 @@ def main():
     home_param = {}
 
     # get inputs
-    home_param = get_inputs(home_param)
+    home_param, interactive_flag = get_inputs(home_param)
 
     # computing mortgage quantities
     home_param = compute_mortgage_quantities(home_param)
 
-    # visualize the results
-    visualize_results(home_param)
+    if interactive_flag.upper() == 'Y':
+        # explore the results with sliders
+        interactive_results(home_param)
+    else:
+        # visualize the results
+        visualize_results(home_param)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# plotting tools
+import matplotlib.pyplot as plt
+# shared numeric core
+from housing_core import calc_rent_vs_buy, monthly_rates
+# monthly loop for paths with additional principal payments
+from housing_jit import calc_rent_vs_buy_loop
+# mergeable per-month statistics
+from streaming_stats import QuantileSketch, RunningMoments
+# interactive inputs of the rent vs buy model
+from rent_vs_buy import get_user_input
+
+# scipy is optional - it is only needed for quasi-random (Sobol) sampling
+try:
+    from scipy.special import ndtri
+    from scipy.stats import qmc
+except ImportError:
+    qmc = None
+
+# annual rates that are drawn at random every year of every path
+RATES = ('int_rate', 'home_appr', 'rent_appr', 'inv_ret')
+
+# monthly quantities whose distribution is tracked
+TRACKED = ('mon_worth_buy_sell', 'mon_worth_rent')
+
+
+def init_stats(months, compression=200):
+    '''
+    empty statistics of the tracked quantities
+
+    Parameters
+    ----------
+    months: int
+        number of months modeled
+    compression: int
+        accuracy of the quantile sketches, see QuantileSketch
+
+    Returns
+    -------
+    stats: dict
+        running moments and quantile sketch of every tracked quantity
+    '''
+
+    return {key: {'moments': RunningMoments(months),
+                  'sketch': QuantileSketch(months, compression)}
+            for key in TRACKED}
+
+
+def merge_stats(stats, other):
+    '''
+    merge the statistics of another run, e.g. from another worker, into
+    stats
+
+    Parameters
+    ----------
+    stats: dict
+        statistics from init_stats, updated in place
+    other: dict
+        statistics to merge in
+
+    Returns
+    -------
+    stats: dict
+        merged statistics
+    '''
+
+    for key in TRACKED:
+        stats[key]['moments'].merge(other[key]['moments'])
+        stats[key]['sketch'].merge(other[key]['sketch'])
+
+    return stats
+
+
+def sobol_normals(keys, yrs, seed=None):
+    '''
+    standard normal shocks of the annual rates from a scrambled Sobol
+    sequence, with one dimension per rate and year
+
+    Parameters
+    ----------
+    keys: list of str
+        annual rates that vary
+    yrs: int
+        number of years to model
+    seed: int, optional
+        seed of the scrambling
+
+    Returns
+    -------
+    draw: function
+        draw(n) returns the shocks of the next n paths as a dictionary of
+        (n, yrs) arrays
+    '''
+
+    if qmc is None:
+        raise ImportError('Sobol sampling requires scipy')
+
+    engine = qmc.Sobol(len(keys) * yrs, scramble=True, seed=seed)
+    # keep the normal shocks finite if a point lands on 0
+    eps = 2.0**-53
+
+    def draw(n):
+        shocks = ndtri(np.clip(engine.random(n), eps, 1 - eps))
+        shocks = shocks.reshape(n, len(keys), yrs)
+        return {key: shocks[:, i] for i, key in enumerate(keys)}
+
+    return draw
+
+
+def random_normals(yrs, seed=None):
+    '''
+    standard normal shocks of the annual rates from a pseudo-random number
+    generator
+
+    Parameters
+    ----------
+    yrs: int
+        number of years to model
+    seed: int, optional
+        seed of the random number generator
+
+    Returns
+    -------
+    draw: function
+        draw(n) returns the shocks of the next n paths as a dictionary of
+        (n, yrs) arrays
+    '''
+
+    rng = np.random.default_rng(seed)
+
+    def draw(n):
+        return {key: rng.standard_normal((n, yrs)) for key in RATES}
+
+    return draw
+
+
+def simulate_paths(params, vol, shocks, n):
+    '''
+    rent vs buy model of a batch of paths in one vectorized call, or with
+    the monthly loop when an additional principal is paid, since that
+    makes the paths path dependent
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs, with the annual rates as the mean of every year
+    vol: dict
+        standard deviation (%) of the annual rates in RATES, 0 if missing
+    shocks: dict
+        (n, yrs) standard normal shocks of the rates that vary
+    n: int
+        number of paths
+
+    Returns
+    -------
+    monthly: MonthlyBlock
+        monthly quantities of every path
+    '''
+
+    yrs = params['yrs']
+
+    # annual rates of every path and year
+    rates = {}
+    for key in RATES:
+        rate = np.asarray(params[key], dtype=float)
+        if key in shocks:
+            rate = rate + vol.get(key, 0) * shocks[key]
+        rates[key] = np.broadcast_to(rate, (n, yrs))
+
+    args = [params['home_val'], params['down_pay'], params['loan_term'],
+            params['hoa'], params['maint'], params['prop_tax'],
+            params['tax_bkt'], params['rent']]
+    args += [monthly_rates(rates[key], yrs) for key in RATES]
+
+    extra_pay = params.get('extra_pay', 0)
+    if np.any(np.asarray(extra_pay) > 0):
+        return calc_rent_vs_buy_loop(*args, extra_pay=extra_pay)
+
+    return calc_rent_vs_buy(*args)
+
+
+def get_sampler(sampler, vol, yrs, seed=None):
+    '''
+    shock generator of the given kind
+
+    Parameters
+    ----------
+    sampler: str
+        'random' for pseudo-random or 'sobol' for quasi-random shocks
+    vol: dict
+        standard deviation (%) of the annual rates in RATES
+    yrs: int
+        number of years to model
+    seed: int, optional
+        seed of the generator
+
+    Returns
+    -------
+    draw: function
+        see random_normals and sobol_normals
+    '''
+
+    if sampler == 'sobol':
+        # only the rates that vary take up dimensions of the sequence
+        return sobol_normals([key for key in RATES if vol.get(key, 0)],
+                             yrs, seed)
+    if sampler == 'random':
+        return random_normals(yrs, seed)
+
+    raise ValueError('sampler must be random or sobol')
+
+
+def update_stats(stats, monthly):
+    '''
+    add a batch of paths to the statistics
+
+    Parameters
+    ----------
+    stats: dict
+        statistics from init_stats, updated in place
+    monthly: MonthlyBlock
+        monthly quantities of the batch
+
+    Returns
+    -------
+    None
+    '''
+
+    for key in TRACKED:
+        stats[key]['moments'].update(monthly[key])
+        stats[key]['sketch'].update(monthly[key])
+
+
+def round_pow2(n, up=True):
+    '''
+    nearest power of 2 above or below n
+
+    Parameters
+    ----------
+    n: int
+        number of paths, at least 1
+    up: bool
+        round up if True, down otherwise
+
+    Returns
+    -------
+    n: int
+        power of 2
+    '''
+    return 2**int(np.ceil(np.log2(n)) if up else np.floor(np.log2(n)))
+
+
+def simulate(params, vol, n_paths, batch_size=2000, seed=None,
+             stats=None, sampler='random'):
+    '''
+    Monte Carlo simulation of the rent vs buy model. Every year of every
+    path draws the annual rates from a normal distribution around the
+    entered rates. Paths are computed in vectorized batches, and only the
+    running moments and quantile sketches of the net worth are kept, so
+    memory is O(batch_size x months) however many paths are run.
+
+    With sampler='sobol' the shocks come from a scrambled Sobol sequence
+    (quasi Monte Carlo, needs scipy), which covers the space of shocks more
+    evenly than pseudo-random draws so the bands converge with fewer paths.
+    The Sobol sequence is balanced in powers of 2, so n_paths is rounded up
+    and batch_size down to a power of 2.
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input, with the
+        annual rates as the mean of every year
+    vol: dict
+        standard deviation (%) of the annual rates in RATES, 0 if missing
+    n_paths: int
+        number of paths
+    batch_size: int
+        number of paths computed at once
+    seed: int, optional
+        seed of the random number generator - use different seeds on
+        different workers and merge the results with merge_stats
+    stats: dict, optional
+        statistics to add the paths to, created if not given
+    sampler: str
+        'random' for pseudo-random or 'sobol' for quasi-random shocks
+
+    Returns
+    -------
+    stats: dict
+        running moments and quantile sketch of every tracked quantity
+    '''
+
+    if stats is None:
+        stats = init_stats(12 * params['yrs'])
+
+    draw = get_sampler(sampler, vol, params['yrs'], seed)
+    if sampler == 'sobol':
+        n_paths = round_pow2(n_paths)
+        batch_size = min(round_pow2(batch_size, up=False), n_paths)
+
+    for start in range(0, n_paths, batch_size):
+        n = min(batch_size, n_paths - start)
+        update_stats(stats, simulate_paths(params, vol, draw(n), n))
+
+    return stats
+
+
+def simulate_adaptive(params, vol, tol, prob_tol=0.01, max_paths=10**6,
+                      min_batch=256, batch_size=8192, seed=None,
+                      sampler='random', min_paths=1024):
+    '''
+    Monte Carlo simulation that runs until the result is known well enough
+    instead of for a fixed number of paths. Batches start at min_batch
+    paths and double up to batch_size, and after every batch the standard
+    error of the mean final advantage of buying (net worth after selling
+    less net worth when renting) and of the probability that buying wins
+    are checked against the tolerances once min_paths have run. Clear-cut
+    scenarios stop early, and only borderline ones run up to max_paths.
+
+    The standard error of the probability is the Agresti-Coull one, with
+    2 wins and 2 losses added, so it does not drop to 0 when every path so
+    far went the same way.
+
+    For sampler='sobol' the standard errors are those of independent
+    draws, which overstate the error of the quasi-random estimate, so the
+    run stops no later than it should. The Sobol sequence is balanced in
+    powers of 2, so max_paths and min_batch are rounded up and batch_size
+    down to a power of 2, which makes every batch a power of 2.
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input
+    vol: dict
+        standard deviation (%) of the annual rates in RATES, 0 if missing
+    tol: float
+        target standard error of the mean final advantage of buying ($)
+    prob_tol: float
+        target standard error of the probability that buying wins
+    max_paths: int
+        most paths to run
+    min_batch: int
+        paths in the first batch
+    batch_size: int
+        most paths computed at once
+    seed: int, optional
+        seed of the generator
+    sampler: str
+        'random' for pseudo-random or 'sobol' for quasi-random shocks
+    min_paths: int
+        fewest paths to run before checking the tolerances
+
+    Returns
+    -------
+    [stats, conv]: list
+        statistics as from simulate, and a dictionary with the number of
+        paths run, mean and standard error of the final advantage, the
+        probability that buying wins and its standard error, and whether
+        the tolerances were met
+    '''
+
+    stats = init_stats(12 * params['yrs'])
+    draw = get_sampler(sampler, vol, params['yrs'], seed)
+    if sampler == 'sobol':
+        max_paths = round_pow2(max_paths)
+        min_batch = min(round_pow2(min_batch), max_paths)
+        batch_size = round_pow2(batch_size, up=False)
+    diff = RunningMoments(1)
+    wins = 0
+
+    n = min_batch
+    while True:
+        monthly = simulate_paths(params, vol, draw(n), n)
+        update_stats(stats, monthly)
+
+        # final advantage of buying over renting of every path
+        adv = monthly['mon_worth_buy_sell'][:, -1] - \
+            monthly['mon_worth_rent'][:, -1]
+        diff.update(adv[:, None])
+        wins += int(np.count_nonzero(adv > 0))
+
+        # Agresti-Coull estimate for the standard error of the probability
+        prob = (wins + 2) / (diff.count + 4)
+        conv = {'n_paths': diff.count,
+                'adv_mean': diff.mean[0],
+                'adv_se': diff.std[0] / np.sqrt(diff.count),
+                'prob_buy': wins / diff.count,
+                'prob_se': np.sqrt(prob * (1 - prob) / (diff.count + 4))}
+        conv['converged'] = bool(diff.count >= min_paths and
+                                 conv['adv_se'] <= tol and
+                                 conv['prob_se'] <= prob_tol)
+
+        if conv['converged'] or diff.count >= max_paths:
+            break
+
+        # double the paths run so far, within the batch size and budget -
+        # all powers of 2 for sobol, so the last batch is one too
+        n = min(diff.count, batch_size, max_paths - diff.count)
+
+    return [stats, conv]
+
+
+def summarize(stats, quantiles=(0.05, 0.5, 0.95)):
+    '''
+    monthly bands of the tracked quantities
+
+    Parameters
+    ----------
+    stats: dict
+        statistics from simulate
+    quantiles: tuple of float
+        quantiles to report
+
+    Returns
+    -------
+    bands: dict
+        for every tracked quantity the monthly mean, std, min, max and
+        quantiles, keyed as p5, p50, p95 etc.
+    '''
+
+    bands = {}
+    for key in TRACKED:
+        moments = stats[key]['moments']
+        vals = stats[key]['sketch'].quantile(quantiles)
+        bands[key] = {'mean': moments.mean, 'std': moments.std,
+                      'min': moments.min, 'max': moments.max}
+        for q, val in zip(quantiles, vals):
+            bands[key]['p%g' % (q * 100)] = val
+
+    return bands
+
+
+def plot_bands(bands):
+    '''
+    Plots the median and P5-P95 band of the net worth for the buying and
+    renting scenarios
+
+    Parameters
+    ----------
+    bands: dict
+        monthly bands from summarize
+
+    Returns
+    -------
+    None
+    '''
+
+    print('\n' + '-'*50)
+    print('Plotting net worth bands - rent vs buy')
+    print('-'*50)
+
+    for label, key in (('Buying', 'mon_worth_buy_sell'),
+                       ('Renting', 'mon_worth_rent')):
+        mon = np.arange(1, len(bands[key]['p50']) + 1)
+        line, = plt.plot(mon, bands[key]['p50'], label=label + ' (P50)')
+        plt.fill_between(mon, bands[key]['p5'], bands[key]['p95'],
+                         color=line.get_color(), alpha=0.2,
+                         label=label + ' (P5-P95)')
+    plt.ylabel('Net worth [$]')
+    plt.xlabel('Months')
+    plt.legend()
+    plt.tight_layout()
+    plt.show()
+
+    return
+
+
+def main():
+    '''
+    Simulates the spread of net worth when buying vs renting, with the
+    annual rates varying at random around the entered values.
+    '''
+
+    # collect user input of the parameters
+    params = get_user_input()
+
+    # spread of the annual rates
+    vol = {}
+    for key, text in zip(RATES, ('interest rate', 'home appreciation',
+                                 'rent appreciation',
+                                 'investment returns')):
+        vol[key] = float(input('Std. dev. of annual ' + text + ' (%): '))
+    n_paths = int(input('Number of paths (0 to run until converged): '))
+    sampler = 'sobol' if qmc is not None and \
+        input('Quasi-random (Sobol) sampling (y/n): ').upper() == 'Y' \
+        else 'random'
+
+    if n_paths > 0:
+        stats = simulate(params, vol, n_paths, sampler=sampler)
+    else:
+        tol = float(input('Std. error of final advantage of buying ($): '))
+        prob_tol = float(input('Std. error of probability that buying '
+                               'wins (%): ')) / 100
+        stats, conv = simulate_adaptive(params, vol, tol, prob_tol,
+                                        sampler=sampler)
+        print('%s after %d paths: buying ahead by $%0.0f +/- %0.0f, '
+              'wins in %0.1f%% +/- %0.1f%% of paths'
+              % ('Converged' if conv['converged'] else 'Not converged',
+                 conv['n_paths'], conv['adv_mean'], conv['adv_se'],
+                 100 * conv['prob_buy'], 100 * conv['prob_se']))
+    bands = summarize(stats)
+
+    # yearly summary
+    print('%5s %42s %42s' % ('', 'Buying (P5 / P50 / P95)',
+                             'Renting (P5 / P50 / P95)'))
+    for yr in range(params['yrs']):
+        mon = 12 * yr + 11
+        row = []
+        for key in TRACKED:
+            row += [bands[key][p][mon] for p in ('p5', 'p50', 'p95')]
+        print('%5d ' % (yr + 1) + '%14.0f' * 6 % tuple(row))
+
+    plot_bands(bands)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,19 +5,39 @@ __license__ = '3-clause BSD'
 __maintainer__ = 'Arun Manohar'
 __email__ = 'arunmano121@outlook.com'
 
+# numpy for array tasks
+import numpy as np
 # modules necessary to write out excel files
 import xlsxwriter
 # plotting tools
 import matplotlib.pyplot as plt
-
-
-def visualize_payments(home_param):
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+# on-disk cache of computed schedules
+from housing_cache import ResultCache, scenario_key
+# shared numeric core
+from housing_core import ScheduleIndex, calc_mon_pay, calc_schedule, \
+    get_valid_input
+# monthly loop for path dependent schedules
+from housing_jit import calc_schedule_prepay
+
+# user inputs that determine the schedule and workbook, hashed as the cache
+# key
+CACHE_INPUTS = ('home_val', 'down_pay', 'loan_type', 'years', 'int_rate',
+                'extra_pay', 'mon_hoa', 'mon_maint', 'prop_tax_pct')
+
+
+def draw_payments(fig, ax, home_param):
     '''
-    Plot principal vs interest over life of loan, and proportion of
-    amounts over the life of loan.
+    Draw principal vs interest over life of loan, and proportion of
+    amounts over the life of loan, on the given figure
 
     Parameters
     ----------
+    fig: Figure
+        figure to draw on
+    ax: array of Axes
+        the two axes of the figure
     home_param: dict
         parameters of the home and the calculated quantities
 
@@ -26,11 +46,6 @@ def visualize_payments(home_param):
     None
     '''
 
-    print('-'*60)
-    print('visualizing payments...')
-    print('-'*60)
-
-    fig, ax = plt.subplots(nrows=1, ncols=2)
     fig.suptitle(('Home Value: \\$%0.2fM, Loan Term: %d years, Int Rate: '
                   '%0.2f%%, Monthly HOA/Mello-Roos: \\$%d, Monthly Maint.:'
                   ' \\$%d')
@@ -59,11 +74,64 @@ def visualize_payments(home_param):
     ax[1].set_title('Proportion of different components')
     ax[1].axis('equal')
 
+    return
+
+
+def visualize_payments(home_param):
+    '''
+    Plot principal vs interest over life of loan, and proportion of
+    amounts over the life of loan.
+
+    Parameters
+    ----------
+    home_param: dict
+        parameters of the home and the calculated quantities
+
+    Returns
+    -------
+    None
+    '''
+
+    print('-'*60)
+    print('visualizing payments...')
+    print('-'*60)
+
+    fig, ax = plt.subplots(nrows=1, ncols=2)
+    draw_payments(fig, ax, home_param)
+
     plt.tight_layout()
     plt.show()
     return
 
 
+def save_payments(home_param, path):
+    '''
+    Save the plots of visualize_payments to an image file. Uses a figure
+    of its own rather than pyplot, so it can run in a writer thread - one
+    at a time, as matplotlib is not thread safe (see pipeline.RENDER_LOCK).
+
+    Parameters
+    ----------
+    home_param: dict
+        parameters of the home and the calculated quantities
+    path: str
+        image file to write, e.g. schedule.png
+
+    Returns
+    -------
+    None
+    '''
+
+    fig = Figure(figsize=(12, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots(nrows=1, ncols=2)
+    draw_payments(fig, ax, home_param)
+    fig.tight_layout()
+    fig.savefig(path)
+
+    return
+
+
 def write_excel(title, home_param):
     '''
     write out payment schedule into excel sheet
@@ -158,104 +226,7 @@ def write_excel(title, home_param):
     return
 
 
-def calc_mon_pay(out_prin, months, int_rate):
-    '''
-    calculate monthly payment including interest and principal
-
-    Parameters
-    ----------
-    out_prin: float
-        outstanding principal amount owed to bank
-    months: int
-        number of remaining months in loan
-    int_rate: float
-        fixed interest rate
-
-    Returns
-    -------
-    [payment, interest, principal]: list
-        list containing total monthly payment to bank, interest component in
-        the monthly payment, principal component in the monthly payment
-    '''
-
-    # monthly payment not including home ins and property tax and HOA
-    # this only includes the loan amount based payment that is due to bank
-    payment = (out_prin * (int_rate / (12 * 100)) /
-               (1 - (1 + int_rate / (12 * 100))**(-months)))
-
-    # interest component
-    interest = (int_rate/(12 * 100))*out_prin
-
-    # principal component
-    principal = payment - interest
-
-    return [payment, interest, principal]
-
-
-def calc_schedule(loan_amt, years, int_rate, loan_type):
-    '''
-    Calculate schedule of payments month over month
-
-    Parameters
-    ----------
-    loan_amt: float
-        outstanding loan amount
-    years: int
-        number of years in the loan
-    int_rate: float
-        fixed interest rate at start of the loan
-    loan_type: str
-        Indicator to specify if the loan is a regular loan or interest only
-
-    Returns
-    -------
-    [pay_h, int_h, prin_h, month_h, out_prin_h]: list
-        list containing monthly total payment to bank, monthly interest
-        component to bank, monthly principal component to bank, month of
-        payment in numbers 1, 2, 3... etc, outstanding principal after
-        current monthly payment
-    '''
-
-    pay_h = []
-    int_h = []
-    prin_h = []
-    month_h = []
-    out_prin_h = []
-
-    # at the very start, the outstanding principal is the loan amount
-    out_prin = loan_amt
-
-    # iterate through the life of loan
-    for months in range(1, years*12 + 1):
-        [payment, interest, principal] = \
-            calc_mon_pay(out_prin,
-                         years*12 - months + 1, int_rate)
-
-        # interest only loan - so set back principal to 0
-        if loan_type == 'I':
-            principal = 0
-            payment = interest
-
-        # outstanding principal reduces every month
-        out_prin = out_prin - principal
-        # print(months, payment, interest, principal)
-
-        # append the monthly breakdown into the arrays
-        pay_h.append(payment)
-        int_h.append(interest)
-        prin_h.append(principal)
-        month_h.append(months)
-        out_prin_h.append(out_prin)
-
-        # when the loan is paid off - stop looping, this is relevant when
-        # there is additional monthly payments
-        if out_prin <= 0:
-            break
-
-    return [pay_h, int_h, prin_h, month_h, out_prin_h]
-
-
-def compute_mortgage_quantities(home_param):
+def compute_mortgage_quantities(home_param, cache=None):
     '''
     based on user inputs for the parameters of the home, and other purchase
     factors such as HOA, property tax, etc., this function computes the
@@ -266,6 +237,9 @@ def compute_mortgage_quantities(home_param):
     home_param: dict
         dictionary that contains the main input quantities and also carries
         the output and computed entities
+    cache: ResultCache, optional
+        on-disk cache consulted before computing the schedule, and updated
+        after
 
     Returns
     -------
@@ -278,6 +252,9 @@ def compute_mortgage_quantities(home_param):
     print('computing mortgage quantities...')
     print('-'*60)
 
+    # no additional principal payment unless given
+    home_param.setdefault('extra_pay', 0)
+
     # loan amount is home value minus down payment
     home_param['loan_amt'] = home_param['home_val'] - home_param['down_pay']
 
@@ -291,23 +268,66 @@ def compute_mortgage_quantities(home_param):
           % (home_param['home_val'], home_param['down_pay'],
              home_param['loan_amt']))
 
-    # calculate the schedule of payments
-    [home_param['pay_h'], home_param['int_h'], home_param['prin_h'],
-     home_param['month_h'], home_param['out_prin_h']] = \
-        calc_schedule(home_param['loan_amt'], home_param['years'],
-                      home_param['int_rate'], home_param['loan_type'])
-
+    if cache is not None:
+        # schedules computed before, by this or another process, are memory
+        # mapped from the cache
+        home_param['cache_key'] = scenario_key(
+            'mortgage', {key: home_param[key] for key in CACHE_INPUTS})
+        entry = cache.load(home_param['cache_key'])
+    else:
+        entry = None
+
+    # calculate the schedule of payments unless it is cached - additional
+    # principal payments make the schedule path dependent, so those use the
+    # monthly loop
+    if entry is not None:
+        sched = entry[0]
+        [home_param['pay_h'], home_param['int_h'], home_param['prin_h'],
+         home_param['out_prin_h']] = sched
+        home_param['month_h'] = np.arange(1, sched.shape[-1] + 1)
+    elif home_param['extra_pay'] > 0:
+        [home_param['pay_h'], home_param['int_h'], home_param['prin_h'],
+         home_param['month_h'], home_param['out_prin_h']] = \
+            calc_schedule_prepay(home_param['loan_amt'], home_param['years'],
+                                 home_param['int_rate'],
+                                 home_param['loan_type'],
+                                 home_param['extra_pay'])
+    else:
+        [home_param['pay_h'], home_param['int_h'], home_param['prin_h'],
+         home_param['month_h'], home_param['out_prin_h']] = \
+            calc_schedule(home_param['loan_amt'], home_param['years'],
+                          home_param['int_rate'], home_param['loan_type'])
+
+    if cache is not None and entry is None:
+        # pay, interest, principal and outstanding principal as one array
+        cache.store(home_param['cache_key'],
+                    np.stack([home_param['pay_h'], home_param['int_h'],
+                              home_param['prin_h'],
+                              home_param['out_prin_h']]))
+
+    # bank monthly payment is the level payment of the loan, without the
+    # additional principal
+    home_param['mon_bank_pay'] = calc_mon_pay(
+        home_param['loan_amt'], home_param['years']*12,
+        home_param['int_rate'], home_param['loan_type'])[0]
     if home_param['loan_type'] == 'R':
         # bank monthly payment is sum of principal and interest
-        home_param['mon_bank_pay'] = home_param['pay_h'][0]
         print('Monthly payment to bank (Principal + Interest): $%0.2f'
               % (home_param['mon_bank_pay']))
     else:
         # bank monthly payment is interest only
-        home_param['mon_bank_pay'] = home_param['pay_h'][0]
         print('Monthly payment to bank (Interest): $%0.2f'
               % (home_param['mon_bank_pay']))
 
+    if home_param['extra_pay'] > 0:
+        # additional principal on top of the bank payment, until the loan
+        # is paid off
+        paid = np.flatnonzero(home_param['out_prin_h'] <= 0)
+        print('Additional monthly principal: $%0.2f, loan paid off after '
+              '%s months' % (home_param['extra_pay'],
+                             paid[0] + 1 if len(paid) else
+                             home_param['years']*12))
+
     # total monthly commitment is sum of bank payment, hoa,
     # home ins, prop tax and maintenance
     home_param['mon_pay'] = home_param['mon_bank_pay'] + \
@@ -315,8 +335,14 @@ def compute_mortgage_quantities(home_param):
         home_param['mon_prop_tax'] + home_param['mon_maint']
     print('Total monthly commitment: $%0.2f' % (home_param['mon_pay']))
 
+    # cumulative interest and principal, to query any range of months
+    home_param['schedule'] = ScheduleIndex(home_param['loan_amt'],
+                                           home_param['int_h'],
+                                           home_param['prin_h'])
+
     # total interest over the life of loan
-    home_param['tot_int'] = sum(home_param['int_h'])
+    home_param['tot_int'] = \
+        home_param['schedule'].interest(0, home_param['years']*12)
     print('\nTotal interest payment over %d months: $%0.2f' %
           (home_param['years']*12, home_param['tot_int']))
 
@@ -344,9 +370,11 @@ def compute_mortgage_quantities(home_param):
     print('Total maintenance over the %d months: $%0.2f' %
           (home_param['years']*12, home_param['tot_maint']))
 
-    # total payment over the life of loan
-    home_param['tot_pay'] = home_param['down_pay'] + home_param['years'] * \
-        12 * home_param['mon_pay']
+    # total payment over the life of loan - the payments to bank, which
+    # include any additional principal, and the other monthly costs
+    home_param['tot_pay'] = home_param['down_pay'] + \
+        np.sum(home_param['pay_h']) + home_param['years'] * 12 * \
+        (home_param['mon_pay'] - home_param['mon_bank_pay'])
     print('Total payment over the %d months: $%0.2f' %
           (home_param['years']*12, home_param['tot_pay']))
 
@@ -355,90 +383,32 @@ def compute_mortgage_quantities(home_param):
         home_param['loan_amt']*100
     print('\nInterest-Loan Ratio: %0.2f%%' % (home_param['int_loan_rat']))
 
-    # interest that is paid over the first 7 years
-    home_param['int_7yr'] = sum(home_param['int_h'][0:7*12])
-    print('\nInterest paid over the first 7 years: $%0.2f'
-          % (home_param['int_7yr']))
-
-    # Proportion of interest that is paid over the first 7 years
-    home_param['int_7yr_tot_rat'] = home_param['int_7yr'] / \
-        home_param['tot_int'] * 100
-    print('Proportion of total interest paid in first 7 years: %0.2f%%' %
-          (home_param['int_7yr_tot_rat']))
-
-    # Outstanding principal after first 7 years
-    home_param['out_prin_7yr'] = home_param['out_prin_h'][7*12-1]
-    print('Outstanding principal after 7 years: $%0.2f'
-          % (home_param['out_prin_7yr']))
-
-    # Principal paid in 7 years
-    print('Principal paid in 7 years: $%0.2f'
-          % (home_param['loan_amt'] - home_param['out_prin_7yr']))
-
-    # interest that is paid over the first 10 years
-    home_param['int_10yr'] = sum(home_param['int_h'][0:10*12])
-    print('\nInterest paid over the first 10 years: $%0.2f'
-          % (home_param['int_10yr']))
-
-    # Proportion of interest that is paid over the first 10 years
-    home_param['int_10yr_tot_rat'] = home_param['int_10yr'] / \
-        home_param['tot_int'] * 100
-    print('Proportion of total interest paid in first 10 years: %0.2f%%' %
-          (home_param['int_10yr_tot_rat']))
-
-    # Outstanding principal after first 10 years
-    home_param['out_prin_10yr'] = home_param['out_prin_h'][10*12-1]
-    print('Outstanding principal after 10 years: $%0.2f'
-          % (home_param['out_prin_10yr']))
-
-    # Principal paid in 10 years
-    print('Principal paid in 10 years: $%0.2f'
-          % (home_param['loan_amt'] - home_param['out_prin_10yr']))
+    for yrs in (7, 10):
+        # interest that is paid over the first few years
+        home_param['int_%dyr' % yrs] = \
+            home_param['schedule'].interest(0, yrs*12)
+        print('\nInterest paid over the first %d years: $%0.2f'
+              % (yrs, home_param['int_%dyr' % yrs]))
+
+        # Proportion of interest that is paid over the first few years
+        home_param['int_%dyr_tot_rat' % yrs] = \
+            home_param['int_%dyr' % yrs] / home_param['tot_int'] * 100
+        print('Proportion of total interest paid in first %d years: %0.2f%%'
+              % (yrs, home_param['int_%dyr_tot_rat' % yrs]))
+
+        # Outstanding principal after first few years
+        home_param['out_prin_%dyr' % yrs] = \
+            home_param['schedule'].balance(yrs*12)
+        print('Outstanding principal after %d years: $%0.2f'
+              % (yrs, home_param['out_prin_%dyr' % yrs]))
+
+        # Principal paid in first few years
+        print('Principal paid in %d years: $%0.2f'
+              % (yrs, home_param['schedule'].principal(0, yrs*12)))
 
     return home_param
 
 
-def get_valid_input(msg):
-    '''
-    gets valid inputs for the home prices or down payments in a variety of
-    formats - the user could enter like 1M or 1000000 or 1000K or $1M, etc.
-
-    Parameters
-    ----------
-    msg: str
-        message to be printed on the screen
-
-    Returns
-    -------
-    None
-    '''
-
-    while True:
-        try:
-            # get input
-            inp = input(msg)
-            mod = float(inp.strip(' kK$%Mm,'))
-
-            # check to see if value is in 1000's
-            if 'k' in inp or 'K' in inp:
-                val = mod * 1000
-
-            # check to see if value is in 1000000's
-            elif 'm' in inp or 'M' in inp:
-                val = mod * 1000000
-
-            # else value is as listed
-            else:
-                val = mod
-            break
-
-        except Exception as e:
-            print(e)
-            print('Enter as 100000 or $10,000 or $100K or 100K')
-
-    return val
-
-
 def get_inputs(home_param):
     '''
     gets user inputs for the parameters of the home, and other purchase
@@ -501,6 +471,11 @@ def get_inputs(home_param):
     # visualize amortization schedule
     visualize_amort_flag = input('Visualize amortization schedule (y/n): ')
 
+    # additional monthly payment towards principal - optional, and asked
+    # last so answers scripted for the earlier prompts keep their order
+    home_param['extra_pay'] = get_valid_input(
+        'Additional monthly principal ($, blank for none): ', default=0)
+
     return home_param, write_amort_flag, visualize_amort_flag
 
 
@@ -522,13 +497,21 @@ def main():
     home_param, write_amort_flag, visualize_amort_flag = \
         get_inputs(home_param)
 
+    # cache shared with other runs, when HOUSING_CACHE_DIR is set
+    cache = ResultCache.from_env()
+
     # computing mortgage quantities
-    home_param = compute_mortgage_quantities(home_param)
+    home_param = compute_mortgage_quantities(home_param, cache)
 
     if write_amort_flag.upper() == 'Y':
-        # write the breakdown into excel file
+        # write the breakdown into excel file - a workbook cached for the
+        # same scenario is copied instead of written again
         title = 'monthly_schedule.xlsx'  # title for the excel file
-        write_excel(title, home_param)
+        if cache is None:
+            write_excel(title, home_param)
+        elif not cache.fetch_file(home_param['cache_key'], title):
+            write_excel(title, home_param)
+            cache.store_file(home_param['cache_key'], title)
 
     if visualize_amort_flag.upper() == 'Y':
         # plot principal vs interest over life of loan, and proportion of
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# rent vs buy model
+from rent_vs_buy import calc_params, get_user_input, init_params
+
+# inverse of the golden ratio, for the golden section search
+INV_PHI = (np.sqrt(5) - 1) / 2
+
+# quantities that can be maximized at the end of the modeled years
+OBJECTIVES = ('advantage', 'mon_worth_buy_sell')
+
+
+def evaluate(params, down_pct, loan_term, objective='advantage'):
+    '''
+    net worth at the end of the modeled years for a batch of down payment
+    percentages and loan terms, in one vectorized calc_params call
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input
+    down_pct: array of float
+        down payment as percentage of home value
+    loan_term: array of int
+        loan term in years, broadcast against down_pct
+    objective: str
+        'advantage' for the net worth after selling the home less the net
+        worth when renting and investing the down payment instead, or
+        'mon_worth_buy_sell' for the net worth after selling the home alone
+
+    Returns
+    -------
+    val: array of float
+        objective of every combination
+    '''
+
+    params = dict(params)
+    params['down_pay'] = params['home_val'] * np.asarray(down_pct) / 100
+    params['loan_term'] = np.asarray(loan_term)
+
+    params = calc_params(init_params(params))
+
+    monthly = params['monthly']
+    val = monthly['mon_worth_buy_sell'][..., -1]
+    if objective == 'advantage':
+        val = val - monthly['mon_worth_rent'][..., -1]
+
+    return val
+
+
+def optimize(params, down_pcts=np.linspace(0, 100, 21),
+             loan_terms=(10, 15, 20, 30), objective='advantage', tol=0.01):
+    '''
+    Searches for the down payment percentage and loan term that maximize
+    the objective at the end of the modeled years. All the combinations of
+    down_pcts and loan_terms are evaluated in one batch to get the response
+    surface, then the down payment is refined for every loan term at once
+    with a golden section search within the bracket around the best grid
+    point.
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input
+    down_pcts: array of float
+        grid of down payment percentages
+    loan_terms: tuple of int
+        candidate loan terms in years
+    objective: str
+        quantity to maximize, see evaluate
+    tol: float
+        width of the final bracket of down payment percentage
+
+    Returns
+    -------
+    res: dict
+        optimal down_pct, down_pay, loan_term and value, the optimal
+        down payment and value for every loan term, and the surface of
+        values over loan_terms x down_pcts
+    '''
+
+    if objective not in OBJECTIVES:
+        raise ValueError('objective must be one of %s' % (OBJECTIVES,))
+
+    down_pcts = np.asarray(down_pcts, dtype=float)
+    loan_terms = np.asarray(loan_terms)
+
+    # response surface - loan terms along axis 0, down payments along 1
+    surface = evaluate(params, down_pcts[None, :], loan_terms[:, None],
+                       objective)
+
+    # bracket around the best grid point of every loan term
+    best = np.argmax(surface, axis=1)
+    lo = down_pcts[np.maximum(best - 1, 0)]
+    hi = down_pcts[np.minimum(best + 1, len(down_pcts) - 1)]
+
+    # golden section search of every loan term at once - the inner point
+    # that survives a step is the other inner point of the next, so its
+    # value is kept and only one new point per loan term is evaluated
+    c = hi - INV_PHI * (hi - lo)
+    d = lo + INV_PHI * (hi - lo)
+    val_c, val_d = evaluate(params, np.stack([c, d]), loan_terms, objective)
+    while np.max(hi - lo) > tol:
+        left = val_c > val_d
+        # maximum left of d - d becomes the upper end and c the new d
+        hi = np.where(left, d, hi)
+        # maximum right of c - c becomes the lower end and d the new c
+        lo = np.where(left, lo, c)
+        kept = np.where(left, val_c, val_d)
+        c, d = (np.where(left, hi - INV_PHI * (hi - lo), d),
+                np.where(left, c, lo + INV_PHI * (hi - lo)))
+        new = evaluate(params, np.where(left, c, d), loan_terms, objective)
+        val_c = np.where(left, new, kept)
+        val_d = np.where(left, kept, new)
+
+    # the refined point, or the best grid point if that is better
+    pct = (lo + hi) / 2
+    val = evaluate(params, pct, loan_terms, objective)
+    grid_best = surface[np.arange(len(loan_terms)), best]
+    pct = np.where(val >= grid_best, pct, down_pcts[best])
+    val = np.maximum(val, grid_best)
+
+    i = np.argmax(val)
+
+    return {'down_pct': pct[i],
+            'down_pay': params['home_val'] * pct[i] / 100,
+            'loan_term': int(loan_terms[i]),
+            'value': val[i],
+            'term_down_pct': pct,
+            'term_value': val,
+            'down_pcts': down_pcts,
+            'loan_terms': loan_terms,
+            'surface': surface}
+
+
+def main():
+    '''
+    Finds the down payment and loan term that make buying come out furthest
+    ahead of renting at the end of the modeled years.
+    '''
+
+    # collect user input of the parameters - the down payment and loan
+    # term entered are replaced by the search
+    params = get_user_input()
+
+    res = optimize(params)
+
+    print('\n' + '-'*60)
+    print('Net worth buying less renting after %d years' % params['yrs'])
+    print('-'*60)
+    print('%10s' % 'Down pay.' +
+          ''.join('%14s' % ('%d yr loan' % term)
+                  for term in res['loan_terms']))
+    for j, pct in enumerate(res['down_pcts']):
+        print('%9.0f%%' % pct +
+              ''.join('%14.0f' % val for val in res['surface'][:, j]))
+    print('-'*60)
+
+    for term, pct, val in zip(res['loan_terms'], res['term_down_pct'],
+                              res['term_value']):
+        print('%d yr loan: best down payment %0.2f%% - $%0.2f'
+              % (term, pct, val))
+    print('\nOptimum: %d yr loan with %0.2f%% ($%0.2f) down payment - $%0.2f'
+          % (res['loan_term'], res['down_pct'], res['down_pay'],
+             res['value']))
+
+
+if __name__ == '__main__':
+    main()
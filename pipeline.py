@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+# scenario files
+import json
+import os
+# bounded hand off between the compute and output stages
+import queue
+import threading
+# numpy for array tasks
+import numpy as np
+# rent vs buy and mortgage models
+import mortgage_calculator
+import rent_vs_buy
+
+# marks the end of the results on the queue
+DONE = object()
+
+# matplotlib is not thread safe, even with a figure and canvas per image -
+# the font cache and text layout are shared - so the writer threads render
+# images one at a time, while the excel files are still written in parallel
+RENDER_LOCK = threading.Lock()
+
+
+def render(save, *args):
+    '''
+    calls save(*args), which renders and writes an image, holding
+    RENDER_LOCK
+
+    Parameters
+    ----------
+    save: function
+        function saving a figure, e.g. rent_vs_buy.save_net_worth
+    args: tuple
+        arguments of save
+
+    Returns
+    -------
+    None
+    '''
+
+    with RENDER_LOCK:
+        save(*args)
+
+
+def run_pipeline(items, compute, outputs, n_writers=2, max_queue=4):
+    '''
+    Runs compute on every item in the calling thread, and the outputs of
+    every result in n_writer threads. Results are handed over through a
+    queue of at most max_queue results, so compute blocks when the writers
+    fall behind instead of piling up results in memory. Writing the excel
+    files and images overlaps with computing the next items, so a batch
+    takes about max(compute, output) time rather than their sum.
+
+    Parameters
+    ----------
+    items: iterable
+        inputs of compute
+    compute: function
+        computes a result from an item
+    outputs: list of function
+        called with (index, result) of every result in a writer thread,
+        e.g. writing the excel file and saving the plots
+    n_writers: int
+        number of writer threads
+    max_queue: int
+        number of computed results that may wait for the writers
+
+    Returns
+    -------
+    n: int
+        number of items processed
+
+    Raises
+    ------
+    Exception
+        the first error raised by compute or an output, after the writers
+        have stopped
+    '''
+
+    results = queue.Queue(maxsize=max_queue)
+    errors = []
+
+    def writer():
+        while True:
+            job = results.get()
+            if job is DONE:
+                break
+            if errors:
+                # drain the queue without writing once something failed
+                continue
+            try:
+                for output in outputs:
+                    output(*job)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, daemon=True)
+               for _ in range(n_writers)]
+    for thread in threads:
+        thread.start()
+
+    n = 0
+    try:
+        for n, item in enumerate(items, 1):
+            if errors:
+                break
+            results.put((n - 1, compute(item)))
+    finally:
+        for thread in threads:
+            results.put(DONE)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return n
+
+
+def rates_for(params, yrs):
+    '''
+    annual rates of a scenario as arrays of yrs entries - a single value is
+    taken as fixed, like get_valid_rates
+
+    Parameters
+    ----------
+    params: dict
+        scenario with the annual rates as a number or a list
+    yrs: int
+        number of years to model
+
+    Returns
+    -------
+    params: dict
+        scenario with the annual rates as arrays
+    '''
+
+    for key in rent_vs_buy.ANNUAL_RATES:
+        rate = np.atleast_1d(np.asarray(params[key], dtype=float))
+        params[key] = np.repeat(rate, yrs) if len(rate) == 1 else rate
+
+    return params
+
+
+def compute_rent_vs_buy(params):
+    '''
+    rent vs buy model of one scenario, the compute stage of
+    run_rent_vs_buy
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input, where the
+        annual rates may also be given as a single number
+
+    Returns
+    -------
+    params: dict
+        inputs and monthly results
+    '''
+
+    params = rates_for(dict(params), params['yrs'])
+    params.setdefault('extra_pay', 0)
+    params['loan_amt'] = params['home_val'] - params['down_pay']
+
+    return rent_vs_buy.calc_params(rent_vs_buy.init_params(params))
+
+
+def compute_mortgage(home_param):
+    '''
+    mortgage quantities of one scenario, the compute stage of run_mortgage
+
+    Parameters
+    ----------
+    home_param: dict
+        mortgage inputs as from mortgage_calculator.get_inputs, where the
+        monthly property tax and home insurance may be left out
+
+    Returns
+    -------
+    home_param: dict
+        inputs and computed quantities
+    '''
+
+    home_param = dict(home_param)
+    home_param.setdefault('extra_pay', 0)
+    home_param.setdefault('loan_type', 'R')
+    home_param.setdefault('mon_prop_tax', home_param['home_val'] *
+                          home_param['prop_tax_pct'] / 100 / 12)
+    home_param.setdefault('mon_home_ins', home_param['home_val'] *
+                          home_param['prop_tax_pct'] / 100 / 10 / 12)
+
+    return mortgage_calculator.compute_mortgage_quantities(home_param)
+
+
+def run_rent_vs_buy(scenarios, out_dir='.', n_writers=2, max_queue=4):
+    '''
+    rent vs buy model of many scenarios, writing scenario_<i>.xlsx and
+    scenario_<i>.png for every scenario to out_dir
+
+    Parameters
+    ----------
+    scenarios: iterable of dict
+        rent vs buy inputs, see compute_rent_vs_buy
+    out_dir: str
+        directory to write to
+    n_writers: int
+        number of writer threads
+    max_queue: int
+        number of computed scenarios that may wait for the writers
+
+    Returns
+    -------
+    n: int
+        number of scenarios processed
+    '''
+
+    def path(i, ext):
+        return os.path.join(out_dir, 'scenario_%d.%s' % (i, ext))
+
+    outputs = [
+        lambda i, params: rent_vs_buy.write_to_excel(params,
+                                                     path(i, 'xlsx')),
+        lambda i, params: render(rent_vs_buy.save_net_worth, params,
+                                 path(i, 'png'), rent_vs_buy.PLOT_POINTS)]
+
+    return run_pipeline(scenarios, compute_rent_vs_buy, outputs, n_writers,
+                        max_queue)
+
+
+def run_mortgage(scenarios, out_dir='.', n_writers=2, max_queue=4):
+    '''
+    mortgage quantities of many scenarios, writing schedule_<i>.xlsx and
+    schedule_<i>.png for every scenario to out_dir
+
+    Parameters
+    ----------
+    scenarios: iterable of dict
+        mortgage inputs, see compute_mortgage
+    out_dir: str
+        directory to write to
+    n_writers: int
+        number of writer threads
+    max_queue: int
+        number of computed scenarios that may wait for the writers
+
+    Returns
+    -------
+    n: int
+        number of scenarios processed
+    '''
+
+    def path(i, ext):
+        return os.path.join(out_dir, 'schedule_%d.%s' % (i, ext))
+
+    outputs = [
+        lambda i, home_param: mortgage_calculator.write_excel(
+            path(i, 'xlsx'), home_param),
+        lambda i, home_param: render(mortgage_calculator.save_payments,
+                                     home_param, path(i, 'png'))]
+
+    return run_pipeline(scenarios, compute_mortgage, outputs, n_writers,
+                        max_queue)
+
+
+def main():
+    '''
+    Runs many rent vs buy or mortgage scenarios from a JSON file holding a
+    list of scenarios, computing the next scenarios while the excel files
+    and plots of earlier ones are written.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('kind', choices=('rent_vs_buy', 'mortgage'))
+    parser.add_argument('scenarios', help='JSON file with a list of inputs')
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--queue', type=int, default=4,
+                        help='computed scenarios waiting to be written')
+    args = parser.parse_args()
+
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    run = run_rent_vs_buy if args.kind == 'rent_vs_buy' else run_mortgage
+    n = run(scenarios, args.out_dir, args.writers, args.queue)
+    print('Processed %d scenarios' % n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+# reading the loan tape a chunk of lines at a time
+import csv
+import itertools
+# numpy for array tasks
+import numpy as np
+# shared numeric core
+from housing_core import calc_schedule, parse_money_array, split_csv
+
+# aggregate monthly cash flows of the book
+FLOWS = ('payment', 'interest', 'principal', 'balance')
+
+
+def read_loan_tape(path, chunk_size=10000, delimiter=','):
+    '''
+    reads a loan tape in chunks of chunk_size loans, so files larger than
+    memory can be processed. The tape is a CSV file with a header row and
+    the columns loan_amt, int_rate (%) and years, and optionally loan_type
+    (R for regular, I for interest only). Amounts may be formatted as in
+    parse_money, and fields containing commas have to be quoted. Rows that
+    can not be parsed, including rows with the wrong number of fields, are
+    flagged in the valid mask and the rest of the tape is still read.
+
+    Parameters
+    ----------
+    path: str
+        CSV file to read
+    chunk_size: int
+        number of loans per chunk
+    delimiter: str
+        field separator
+
+    Returns
+    -------
+    chunks: generator
+        yields a dictionary per chunk with the loan_amt, int_rate, years
+        and loan_type arrays, and a valid mask of the rows that parsed
+    '''
+
+    with open(path, newline='') as f:
+        header = [name.strip() for name in
+                  next(csv.reader(f, delimiter=delimiter))]
+        columns = ['loan_amt', 'int_rate', 'years']
+        usecols = [header.index(name) for name in columns]
+        if 'loan_type' in header:
+            usecols.append(header.index('loan_type'))
+
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+
+            texts, valid = split_csv(lines, usecols, len(header),
+                                     delimiter)
+
+            chunk = {}
+            for i, name in enumerate(columns):
+                chunk[name], ok = parse_money_array(texts[:, i])
+                valid &= ok
+
+            # loan terms are whole years
+            valid &= (chunk['years'] > 0) & \
+                (chunk['years'] == np.round(chunk['years']))
+            chunk['years'] = np.where(valid, chunk['years'], 0).astype(int)
+
+            if len(usecols) > len(columns):
+                chunk['loan_type'] = np.char.upper(
+                    np.char.strip(texts[:, len(columns)]))
+                valid &= np.isin(chunk['loan_type'], ['R', 'I'])
+            else:
+                chunk['loan_type'] = np.full(len(texts), 'R')
+
+            chunk['valid'] = valid
+            yield chunk
+
+
+def aggregate_portfolio(chunks):
+    '''
+    aggregate monthly cash flows of a book of loans. Every chunk is split
+    into groups of the same loan term and type, whose schedules are
+    computed together with calc_schedule and summed into running month
+    indexed totals, so peak memory is set by the chunk size and not by
+    the number of loans.
+
+    Parameters
+    ----------
+    chunks: iterable of dict
+        chunks of loans as yielded by read_loan_tape, with the loan_amt,
+        int_rate, years, loan_type and valid arrays
+
+    Returns
+    -------
+    book: dict
+        total monthly payment, interest, principal and outstanding balance
+        after the payment over all the loans, with the months along the
+        array, and the number of loans aggregated and skipped
+    '''
+
+    book = {key: np.zeros(0) for key in FLOWS}
+    book['n_loans'] = 0
+    book['n_invalid'] = 0
+
+    for chunk in chunks:
+        valid = chunk['valid']
+        book['n_invalid'] += int(np.count_nonzero(~valid))
+
+        groups = np.unique(np.stack(
+            [chunk['years'][valid].astype(str), chunk['loan_type'][valid]],
+            axis=1), axis=0)
+
+        for years, loan_type in groups:
+            years = int(years)
+            sel = valid & (chunk['years'] == years) & \
+                (chunk['loan_type'] == loan_type)
+            months = years * 12
+
+            # accumulators grow to the longest loan term seen
+            if months > len(book['payment']):
+                for key in FLOWS:
+                    book[key] = np.pad(book[key],
+                                       (0, months - len(book[key])))
+
+            pay_h, int_h, prin_h, month_h, out_prin_h = \
+                calc_schedule(chunk['loan_amt'][sel], years,
+                              chunk['int_rate'][sel], loan_type)
+
+            book['payment'][:months] += pay_h.sum(axis=0)
+            book['interest'][:months] += int_h.sum(axis=0)
+            book['principal'][:months] += prin_h.sum(axis=0)
+            book['balance'][:months] += out_prin_h.sum(axis=0)
+            book['n_loans'] += int(np.count_nonzero(sel))
+
+    return book
+
+
+def main():
+    '''
+    Aggregates the monthly cash flows of a loan tape - total payments,
+    interest, principal and outstanding balance of the whole book - reading
+    the tape in chunks so books with millions of loans fit in memory.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('tape', help='CSV file with loan_amt, int_rate, '
+                        'years and optionally loan_type columns')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--out', default=None,
+                        help='CSV file to write the monthly totals to')
+    args = parser.parse_args()
+
+    book = aggregate_portfolio(read_loan_tape(args.tape, args.chunk_size))
+
+    print('-'*60)
+    print('Loans: %d Skipped (invalid rows): %d'
+          % (book['n_loans'], book['n_invalid']))
+    print('Total interest: $%0.2f Total principal: $%0.2f'
+          % (book['interest'].sum(), book['principal'].sum()))
+    print('-'*60)
+
+    # yearly summary
+    print('%5s %18s %18s %18s' % ('Year', 'Interest', 'Principal',
+                                  'Balance'))
+    for yr in range(len(book['payment']) // 12):
+        months = slice(12 * yr, 12 * (yr + 1))
+        print('%5d %18.2f %18.2f %18.2f'
+              % (yr + 1, book['interest'][months].sum(),
+                 book['principal'][months].sum(),
+                 book['balance'][12 * yr + 11]))
+
+    if args.out is not None:
+        month = np.arange(1, len(book['payment']) + 1)
+        np.savetxt(args.out,
+                   np.column_stack([month] + [book[key] for key in FLOWS]),
+                   fmt=['%d'] + ['%.2f'] * len(FLOWS), delimiter=',',
+                   header=','.join(('month',) + FLOWS), comments='')
+
+
+if __name__ == '__main__':
+    main()
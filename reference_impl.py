@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# The original month by month loops of the first release, kept verbatim as
+# the reference the fast engines are checked against (see equivalence.py).
+# They work on one loan or scenario at a time, with python floats. Do not
+# change them - they are what the current engines must reproduce.
+
+# import numpy modules
+import numpy as np
+
+
+# mortgage_calculator.py
+
+def calc_mon_pay(out_prin, months, int_rate):
+    '''
+    calculate monthly payment including interest and principal
+
+    Parameters
+    ----------
+    out_prin: float
+        outstanding principal amount owed to bank
+    months: int
+        number of remaining months in loan
+    int_rate: float
+        fixed interest rate
+
+    Returns
+    -------
+    [payment, interest, principal]: list
+        list containing total monthly payment to bank, interest component in
+        the monthly payment, principal component in the monthly payment
+    '''
+
+    # monthly payment not including home ins and property tax and HOA
+    # this only includes the loan amount based payment that is due to bank
+    payment = (out_prin * (int_rate / (12 * 100)) /
+               (1 - (1 + int_rate / (12 * 100))**(-months)))
+
+    # interest component
+    interest = (int_rate/(12 * 100))*out_prin
+
+    # principal component
+    principal = payment - interest
+
+    return [payment, interest, principal]
+
+
+def calc_schedule(loan_amt, years, int_rate, loan_type):
+    '''
+    Calculate schedule of payments month over month
+
+    Parameters
+    ----------
+    loan_amt: float
+        outstanding loan amount
+    years: int
+        number of years in the loan
+    int_rate: float
+        fixed interest rate at start of the loan
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+
+    Returns
+    -------
+    [pay_h, int_h, prin_h, month_h, out_prin_h]: list
+        list containing monthly total payment to bank, monthly interest
+        component to bank, monthly principal component to bank, month of
+        payment in numbers 1, 2, 3... etc, outstanding principal after
+        current monthly payment
+    '''
+
+    pay_h = []
+    int_h = []
+    prin_h = []
+    month_h = []
+    out_prin_h = []
+
+    # at the very start, the outstanding principal is the loan amount
+    out_prin = loan_amt
+
+    # iterate through the life of loan
+    for months in range(1, years*12 + 1):
+        [payment, interest, principal] = \
+            calc_mon_pay(out_prin,
+                         years*12 - months + 1, int_rate)
+
+        # interest only loan - so set back principal to 0
+        if loan_type == 'I':
+            principal = 0
+            payment = interest
+
+        # outstanding principal reduces every month
+        out_prin = out_prin - principal
+        # print(months, payment, interest, principal)
+
+        # append the monthly breakdown into the arrays
+        pay_h.append(payment)
+        int_h.append(interest)
+        prin_h.append(principal)
+        month_h.append(months)
+        out_prin_h.append(out_prin)
+
+        # when the loan is paid off - stop looping, this is relevant when
+        # there is additional monthly payments
+        if out_prin <= 0:
+            break
+
+    return [pay_h, int_h, prin_h, month_h, out_prin_h]
+
+
+# interest_rates_vs_payments.py - renamed, as it differs from the
+# calc_mon_pay of mortgage_calculator.py above
+
+def calc_mon_pay_rates(out_prin, months, int_rate, loan_type):
+    '''
+    calculate monthly payment including interest and principal
+
+    Parameters
+    ----------
+    out_prin: float
+        outstanding principal amount owed to bank
+    months: int
+        number of remaining months in loan
+    int_rate: float
+        fixed interest rate
+    loan_type: str
+        Indicator to specify if the loan is a regular loan or interest only
+
+    Returns
+    -------
+    [payment, interest, principal]: list
+        list containing total monthly payment to bank, interest component in
+        the monthly payment, principal component in the monthly payment
+    '''
+
+    # monthly payment not including home ins and property tax and HOA
+    # this only includes the loan amount based payment that is due to bank
+    try:
+        payment = (out_prin * (int_rate / (12 * 100)) /
+                   (1 - (1 + int_rate / (12 * 100))**(-months)))
+    except ZeroDivisionError:
+        # if interest rate is 0%
+        payment = out_prin/months
+
+    # interest component
+    interest = (int_rate/(12 * 100))*out_prin
+
+    # principal component
+    principal = payment - interest
+
+    # interest only loan - so set back principal to 0
+    if loan_type == 'I':
+        principal = 0
+        payment = interest
+
+    return [payment, interest, principal]
+
+
+# rent_vs_buy.py
+
+def calc_params(params):
+    '''
+    Calculate monthly changes and store in arrays
+
+    Parameters
+    ----------
+    params: dictionary
+        contains all the placeholders for the intermediate and final arrays
+
+    Returns
+    -------
+    params: dictionary
+        contains the monthly computations of the different entities
+    '''
+
+    # iterate through the time period on a monthly basis
+    for month in range(len(params['mon'])):
+
+        # home value
+        if month == 0:
+            # in the first month, use the purchase price for home value
+            params['mon_home_val'][month] = \
+                (1 + params['mon_home_appr'][month]/100) * \
+                params['home_val']
+        else:
+            # use the previous month home value
+            params['mon_home_val'][month] = \
+                (1 + params['mon_home_appr'][month]/100) \
+                * params['mon_home_val'][month-1]
+
+        # interest component of loan
+        if month == 0:
+            # in the first month, the interest is based on loan amount
+            params['mon_int'][month] = \
+                params['mon_int_rate'][month]/100 * params['loan_amt']
+        else:
+            # use the previous months outstanding principal
+            params['mon_int'][month] = \
+                params['mon_int_rate'][month]/100 * \
+                params['mon_out_prin'][month-1]
+
+        # principal component of loan, and outstanding principal
+        # rem_term is the months left in life of loan
+        rem_term = params['loan_term'] * 12 - month
+        if month == 0:
+            # in the first month, the principal is based on loan amount
+            params['mon_prin'][month] = params['loan_amt'] * \
+                params['mon_int_rate'][month]/100 / \
+                (1 - (1 + params['mon_int_rate'][month]/100)
+                 ** (-rem_term)) \
+                - params['mon_int'][month]
+
+            params['mon_out_prin'][month] = params['loan_amt'] - \
+                params['mon_prin'][month]
+        else:
+            # use the previous months outstanding principal
+            params['mon_prin'][month] = \
+                params['mon_out_prin'][month-1] * \
+                params['mon_int_rate'][month] / 100 /\
+                (1 - (1 + params['mon_int_rate'][month]/100)
+                 ** (-rem_term)) \
+                - params['mon_int'][month]
+
+            params['mon_out_prin'][month] = \
+                params['mon_out_prin'][month-1] - \
+                params['mon_prin'][month]
+
+        # monthly property tax
+        if month == 0:
+            # in the first month, the property tax is based on home price
+            params['mon_proptax'][month] = params['prop_tax'] / (12*100)\
+                * params['home_val']
+        else:
+            # use the previous months home value
+            params['mon_proptax'][month] = params['prop_tax'] / (12*100)\
+                * params['mon_home_val'][month-1]
+
+        # monthly HOA
+        params['mon_hoa'][month] = params['hoa']
+
+        # monthly tax break based on mortgage interest and property tax
+        params['mon_taxbrk'][month] = params['tax_bkt'] / 100 * \
+            (params['mon_proptax'][month] + params['mon_int'][month])
+
+        # monthly maintenance
+        params['mon_maint'][month] = params['maint']
+
+        # monthly home insurance - assuming home insurance is 10% of prop tax
+        params['mon_homeins'][month] = \
+            params['mon_proptax'][month]/10
+
+        # monthly cash outflow to buy a home
+        params['mon_buy_outflow'][month] = \
+            params['mon_prin'][month] + \
+            params['mon_int'][month] + \
+            params['mon_proptax'][month] + \
+            params['mon_hoa'][month] + \
+            params['mon_homeins'][month] + \
+            params['mon_maint'][month] - \
+            params['mon_taxbrk'][month]
+
+        # monthly net worth if buying is the difference between home value
+        # outstanding principal
+        params['mon_worth_buy'][month] = \
+            params['mon_home_val'][month] - \
+            params['mon_out_prin'][month]
+
+        # monthly net worth if owning home and selling
+        # based on 6% realtor fees
+        params['mon_worth_buy_sell'][month] = \
+            params['mon_worth_buy'][month] - \
+            0.06 * params['mon_home_val'][month]
+
+        # renting scenario
+        # rent
+        if month == 0:
+            params['mon_rent'][month] = params['rent']
+        else:
+            params['mon_rent'][month] = \
+                (1 + params['mon_rent_appr'][month] / 100) * \
+                params['mon_rent'][month-1]
+
+        # monthly cash savings by renting
+        params['mon_savings_rent'][month] = \
+            params['mon_buy_outflow'][month] - \
+            params['mon_rent'][month]
+
+        # monthly net worth by renting and investing
+        if month == 0:
+            params['mon_worth_rent'][month] = \
+                (1 + params['mon_inv_ret'][month] / 100) * \
+                params['down_pay']
+        else:
+            params['mon_worth_rent'][month] = \
+                params['mon_savings_rent'][month] + \
+                (1 + params['mon_inv_ret'][month]/100) * \
+                (params['mon_worth_rent'][month-1])
+
+    return params
+
+
+def init_params(params):
+    '''
+    Initialize parameters and arrays that are required to compute monthly
+    changes
+
+    Parameters
+    ----------
+    params: dictionary
+        contains all the placeholders for the intermediate and final arrays
+
+    Returns
+    -------
+    params: dictionary
+        contains all the initialized placeholders for the intermediate
+        and final arrays
+    '''
+
+    # range of months to model on
+    params['mon'] = np.array([i+1 for i in range(12 * params['yrs'])])
+
+    # monthly home price appreciation is annual divided by 12
+    params['mon_home_appr'] = np.array(params['home_appr']
+                                       [(params['mon']-1)//12]/12)
+
+    # monthly rent appreciation is annual divided by 12
+    params['mon_rent_appr'] = np.array(params['rent_appr']
+                                       [(params['mon']-1)//12]/12)
+
+    # monthly interest rate is annual divided by 12
+    params['mon_int_rate'] = np.array(params['int_rate']
+                                      [(params['mon']-1)//12]/12)
+
+    # monthly investment return is annual divided by 12
+    params['mon_inv_ret'] = np.array(params['inv_ret']
+                                     [(params['mon']-1)//12]/12)
+
+    # initialize empty array to hold monthly values
+    # monthly home value
+    params['mon_home_val'] = np.zeros(params['mon'].shape)
+    # principal paid each month
+    params['mon_prin'] = np.zeros(params['mon'].shape)
+    # outstanding principal after each month
+    params['mon_out_prin'] = np.zeros(params['mon'].shape)
+    # monthly interest
+    params['mon_int'] = np.zeros(params['mon'].shape)
+    # monthly property tax
+    params['mon_proptax'] = np.zeros(params['mon'].shape)
+    # monthly HOA
+    params['mon_hoa'] = np.zeros(params['mon'].shape)
+    # monthly tax break
+    params['mon_taxbrk'] = np.zeros(params['mon'].shape)
+    # monthly home insurance
+    params['mon_homeins'] = np.zeros(params['mon'].shape)
+    # monthly maintenance
+    params['mon_maint'] = np.zeros(params['mon'].shape)
+    # monthly net outflow if buying
+    params['mon_buy_outflow'] = np.zeros(params['mon'].shape)
+    # monthly net worth if buying
+    params['mon_worth_buy'] = np.zeros(params['mon'].shape)
+    # monthly net worth if buying and factoring cost to sell
+    params['mon_worth_buy_sell'] = np.zeros(params['mon'].shape)
+    # monthly rent
+    params['mon_rent'] = np.zeros(params['mon'].shape)
+    # monthly savings if renting
+    params['mon_savings_rent'] = np.zeros(params['mon'].shape)
+    # monthly net worth if renting and investing
+    params['mon_worth_rent'] = np.zeros(params['mon'].shape)
+
+    return params
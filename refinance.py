@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# shared numeric core
+from housing_core import ScheduleIndex, calc_mon_pay, calc_schedule
+
+
+def refinance_grid(loan_amt, years, int_rate, refi_months, new_rates,
+                   closing_costs, new_years=None, loan_type='R'):
+    '''
+    Evaluates refinancing an existing loan for every combination of
+    refinance month, new interest rate and closing cost in one broadcasted
+    pass. The balance and remaining interest of the existing loan at every
+    refinance month come from the prefix sums of its schedule, and the new
+    loan is a regular loan on that balance paid off over new_years (or the
+    remaining term of the existing loan). Closing costs are paid in cash.
+
+    Lifetime savings compare the total payments still due on either loan,
+    which both pay back the whole balance, so they come down to the
+    difference in interest less the closing costs. The payments are not
+    discounted - with new_years set the two loans are paid over different
+    lengths of time, and a shorter new loan can come out ahead on lifetime
+    savings while costing more every month (see breakeven).
+
+    Parameters
+    ----------
+    loan_amt: float
+        loan amount of the existing loan
+    years: int
+        loan term of the existing loan in years
+    int_rate: float
+        interest rate of the existing loan (%)
+    refi_months: int or array of int
+        candidate refinance months, in months elapsed on the existing loan,
+        from 0 to one less than the months in the existing loan
+    new_rates: float or array of float
+        candidate interest rates of the new loan (%)
+    closing_costs: float or array of float
+        candidate closing costs of the new loan ($)
+    new_years: int, optional
+        loan term of the new loan in years, the remaining term of the
+        existing loan if not given
+    loan_type: str
+        Indicator to specify if the existing loan is a regular loan or
+        interest only
+
+    Returns
+    -------
+    grid: dict
+        balance at refinance (months), payments and monthly savings
+        (months x rates), and breakeven month after refinancing (inf if
+        not within the new loan term) and lifetime savings (months x rates
+        x costs), with a single month, rate or cost as an axis of length 1
+
+    Raises
+    ------
+    ValueError
+        a refinance month is outside the existing loan
+    '''
+
+    months = years * 12
+
+    # refinance month along axis 0, new rate along 1, closing cost along 2
+    refi = np.atleast_1d(np.asarray(refi_months, dtype=int))
+    if np.any((refi < 0) | (refi >= months)):
+        raise ValueError('refinance months must be from 0 to %d'
+                         % (months - 1))
+    rate = np.atleast_1d(np.asarray(new_rates, dtype=float))[None, :]
+    cost = np.atleast_1d(np.asarray(closing_costs, dtype=float))[None, None, :]
+
+    # existing loan - balance, payment and interest still to pay
+    pay_h, int_h, prin_h, month_h, out_prin_h = \
+        calc_schedule(loan_amt, years, int_rate, loan_type)
+    index = ScheduleIndex(loan_amt, int_h, prin_h)
+    balance = index.balance(refi)
+    old_pay = np.take(pay_h, refi)
+    old_int = index.interest(refi, months)
+
+    # new loan on the outstanding balance
+    if new_years is None:
+        new_term = (months - refi)[:, None]
+    else:
+        new_term = new_years * 12
+    new_pay = calc_mon_pay(balance[:, None], new_term, rate)[0]
+
+    # monthly savings pay back the closing costs - a shorter new loan can
+    # have a higher payment and never break even on cash flow, while still
+    # saving interest over its life
+    mon_savings = old_pay[:, None] - new_pay
+    with np.errstate(divide='ignore', invalid='ignore'):
+        breakeven = np.where(mon_savings[..., None] > 0,
+                             np.ceil(cost / mon_savings[..., None]), np.inf)
+    # the new loan is paid off before the savings cover the closing costs
+    breakeven[breakeven > np.asarray(new_term)[..., None]] = np.inf
+
+    # lifetime savings - difference in the total payments still due less
+    # the closing costs. Both loans repay the balance (an interest only
+    # loan at the end of its term), so this is the difference in interest
+    old_total = old_int + balance
+    new_total = new_pay * new_term
+    lifetime_savings = (old_total[:, None] - new_total)[..., None] - cost
+
+    return {'refi_month': refi,
+            'new_rate': rate[0],
+            'closing_cost': cost[0, 0],
+            'balance': balance,
+            'old_payment': old_pay,
+            'new_payment': new_pay,
+            'mon_savings': mon_savings,
+            'breakeven': breakeven,
+            'lifetime_savings': lifetime_savings}
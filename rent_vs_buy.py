@@ -5,36 +5,57 @@ __license__ = '3-clause BSD'
 __maintainer__ = 'Arun Manohar'
 __email__ = 'arunmano121@outlook.com'
 
+# streaming rows to csv
+import csv
 # import numpy modules
 import numpy as np
 # plotting tools
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 # writing to excel
 import xlsxwriter
+# on-disk cache of computed scenarios
+from housing_cache import ResultCache, scenario_key
+# shared numeric core
+from housing_core import RVB_COLUMNS, MonthlyBlock, calc_rent_vs_buy, \
+    get_valid_input, get_valid_rates, iter_rent_vs_buy, monthly_rates
+# monthly loop for path dependent scenarios
+from housing_jit import calc_rent_vs_buy_loop
 
+# user inputs of a scenario, and the annual rates entered for every year
+SCENARIO_INPUTS = ('home_val', 'down_pay', 'loan_term', 'extra_pay', 'hoa',
+                   'maint', 'prop_tax', 'tax_bkt', 'rent')
+ANNUAL_RATES = ('int_rate', 'home_appr', 'rent_appr', 'inv_ret')
 
-def write_to_excel(params):
+# user inputs that determine the monthly results, hashed as the cache key
+CACHE_INPUTS = SCENARIO_INPUTS + ('yrs',) + ANNUAL_RATES
+
+# most points per series on the net worth plot - longer horizons are
+# downsampled with LTTB
+PLOT_POINTS = 2000
+
+
+def write_excel_header(workbook, worksheet, params):
     '''
-    Writes the monthly buying and renting schedule into excel
+    Writes the scenario inputs and the column headers of the monthly
+    schedule, which starts at row 8
 
     Parameters
     ----------
+    workbook: xlsxwriter.Workbook
+        workbook being written
+    worksheet: xlsxwriter.Worksheet
+        worksheet to write to
     params: dictionary
-        contains all the monthly quantities
+        contains the scenario inputs
 
     Returns
     -------
-    None
+    money: xlsxwriter.Format
+        format of the monthly amounts
     '''
 
-    print('\n' + '-'*50)
-    print('Writing to excel file - rent_vs_buy.xlsx')
-    print('-'*50)
-
-    # file name to write out
-    workbook = xlsxwriter.Workbook('rent_vs_buy.xlsx')
-    worksheet = workbook.add_worksheet()
-
     # setting up necessary formats
     fmt = workbook.add_format({'bold': True})
     money = workbook.add_format({'num_format': '[$$]#,##0.00'})
@@ -82,24 +103,40 @@ def write_to_excel(params):
     worksheet.write(1+6, 14, 'Mon savings by renting', fmt)
     worksheet.write(1+6, 15, 'Net worth after investing', fmt)
 
-    # write out individual lines of data
+    return money
+
+
+def write_to_excel(params, title='rent_vs_buy.xlsx'):
+    '''
+    Writes the monthly buying and renting schedule into excel
+
+    Parameters
+    ----------
+    params: dictionary
+        contains all the monthly quantities
+    title: str
+        name of the excel file
+
+    Returns
+    -------
+    None
+    '''
+
+    print('\n' + '-'*50)
+    print('Writing to excel file - ' + title)
+    print('-'*50)
+
+    # file name to write out
+    workbook = xlsxwriter.Workbook(title)
+    worksheet = workbook.add_worksheet()
+    money = write_excel_header(workbook, worksheet, params)
+
+    # write out individual lines of data - the monthly block is expanded in
+    # the same order as the excel columns
+    rows = params['monthly'].export().T.tolist()
     for i in range(len(params['mon'])):
         worksheet.write(i + 8, 0, params['mon'][i])
-        worksheet.write(i + 8, 1, params['mon_home_val'][i], money)
-        worksheet.write(i + 8, 2, params['mon_int'][i], money)
-        worksheet.write(i + 8, 3, params['mon_prin'][i], money)
-        worksheet.write(i + 8, 4, params['mon_out_prin'][i], money)
-        worksheet.write(i + 8, 5, params['mon_proptax'][i], money)
-        worksheet.write(i + 8, 6, params['mon_hoa'][i], money)
-        worksheet.write(i + 8, 7, params['mon_taxbrk'][i], money)
-        worksheet.write(i + 8, 8, params['mon_maint'][i], money)
-        worksheet.write(i + 8, 9, params['mon_homeins'][i], money)
-        worksheet.write(i + 8, 10, params['mon_buy_outflow'][i], money)
-        worksheet.write(i + 8, 11, params['mon_worth_buy'][i], money)
-        worksheet.write(i + 8, 12, params['mon_worth_buy_sell'][i], money)
-        worksheet.write(i + 8, 13, params['mon_rent'][i], money)
-        worksheet.write(i + 8, 14, params['mon_savings_rent'][i], money)
-        worksheet.write(i + 8, 15, params['mon_worth_rent'][i], money)
+        worksheet.write_row(i + 8, 1, rows[i], money)
 
     # finished writing - close the workbook
     workbook.close()
@@ -107,7 +144,105 @@ def write_to_excel(params):
     return
 
 
-def plot_net_worth(params):
+def downsample_lttb(x, y, n_out):
+    '''
+    Downsample a line series to a target number of points using the
+    Largest-Triangle-Three-Buckets (LTTB) algorithm. The first and last
+    points are always kept, and for each bucket in between the point that
+    forms the largest triangle with the previously selected point and the
+    average of the next bucket is kept, so peaks and dips survive.
+
+    Parameters
+    ----------
+    x: array of float
+        x values of the series, in increasing order
+    y: array of float
+        y values of the series
+    n_out: int
+        target number of points after downsampling
+
+    Returns
+    -------
+    [x_out, y_out]: list
+        downsampled x and y values. The inputs are returned unchanged when
+        they already have n_out points or fewer.
+    '''
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    # nothing to do if the series is already small enough
+    if n_out >= n or n_out < 3:
+        return [x, y]
+
+    # split the interior points 1..n-2 into n_out-2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    idx = np.zeros(n_out, dtype=int)
+    idx[-1] = n - 1
+    prev = 0
+
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+
+        # average point of the next bucket, or the last point
+        if i < n_out - 3:
+            x_avg = x[hi:edges[i + 2]].mean()
+            y_avg = y[hi:edges[i + 2]].mean()
+        else:
+            x_avg = x[-1]
+            y_avg = y[-1]
+
+        # (twice the) triangle area for every candidate in the bucket
+        area = np.abs((x[prev] - x_avg) * (y[lo:hi] - y[prev]) -
+                      (x[prev] - x[lo:hi]) * (y_avg - y[prev]))
+
+        prev = lo + int(np.argmax(area))
+        idx[i + 1] = prev
+
+    return [x[idx], y[idx]]
+
+
+def draw_net_worth(ax, params, max_points=None):
+    '''
+    Draws net worth for the buying and renting scenarios on the given axes
+
+    Parameters
+    ----------
+    ax: Axes
+        axes to draw on
+    params: dictionary
+        contains all the monthly quantities
+    max_points: int, optional
+        if given, every series is downsampled with LTTB to at most this many
+        points, see plot_net_worth
+
+    Returns
+    -------
+    None
+    '''
+
+    monthly = params['monthly']
+
+    # series to plot - label, values, line style
+    series = [('Buying', monthly['mon_worth_buy_sell'], '--'),
+              ('Renting', monthly['mon_worth_rent'], '-.')]
+
+    # plot lines
+    for label, vals, style in series:
+        x, y = params['mon'], vals
+        if max_points is not None:
+            x, y = downsample_lttb(x, y, max_points)
+        ax.plot(x, y, label=label, linestyle=style)
+    ax.set_ylabel('Net worth [$]')
+    ax.set_xlabel('Months')
+    ax.legend()
+
+    return
+
+
+def plot_net_worth(params, max_points=None):
     '''
     Plots net worth for the buying and renting scenarios given the parameters
 
@@ -115,6 +250,10 @@ def plot_net_worth(params):
     ----------
     params: dictionary
         contains all the monthly quantities
+    max_points: int, optional
+        if given, every series is downsampled with LTTB to at most this many
+        points before plotting, so the plotting cost and figure size stay
+        constant for long horizons
 
     Returns
     -------
@@ -125,20 +264,42 @@ def plot_net_worth(params):
     print('Plotting net worth - rent vs buy')
     print('-'*50)
 
-    # plot lines
-    plt.plot(params['mon'], params['mon_worth_buy_sell'],
-             label='Buying', linestyle='--')
-    plt.plot(params['mon'], params['mon_worth_rent'],
-             label='Renting', linestyle='-.')
-    plt.ylabel('Net worth [$]')
-    plt.xlabel('Months')
-    plt.legend()
+    draw_net_worth(plt.gca(), params, max_points)
     plt.tight_layout()
     plt.show()
 
     return
 
 
+def save_net_worth(params, path, max_points=None):
+    '''
+    Saves the net worth plot to an image file. Uses a figure of its own
+    rather than pyplot, so it can run in a writer thread - one at a time,
+    as matplotlib is not thread safe (see pipeline.RENDER_LOCK).
+
+    Parameters
+    ----------
+    params: dictionary
+        contains all the monthly quantities
+    path: str
+        image file to write, e.g. rent_vs_buy.png
+    max_points: int, optional
+        see plot_net_worth
+
+    Returns
+    -------
+    None
+    '''
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    draw_net_worth(fig.subplots(), params, max_points)
+    fig.tight_layout()
+    fig.savefig(path)
+
+    return
+
+
 def print_monthly(params):
     '''
     Prints monthly changes
@@ -160,77 +321,237 @@ def print_monthly(params):
     print('Loan amount: $%0.2f' % (params['loan_amt']))
     print('Monthly rent: $%0.2f' % (params['rent']))
 
+    monthly = params['monthly']
+
     # iterate through the time period on a monthly basis
     for month in range(len(params['mon'])):
-        print('\n' + '-'*50)
-        print('Month: %d' % (month+1))
-
-        # home value
-        print('Buying scenario - home value: $%0.2f'
-              % (params['mon_home_val'][month]))
-
-        # interest component of loan
-        print('Buying scenario - interest on loan: $%0.2f'
-              % (params['mon_int'][month]))
-
-        # principal component of loan, and outstanding principal
-        # rem_term is the months left in life of loan
-        print('Buying scenario - principal on loan: $%0.2f'
-              % (params['mon_prin'][month]))
-        print('Buying scenario - outstanding principal: $%0.2f'
-              % (params['mon_out_prin'][month]))
-
-        # monthly property tax
-        print('Buying scenario - propery tax: $%0.2f'
-              % (params['mon_proptax'][month]))
-
-        # monthly HOA
-        print('Buying scenario - HOA: $%0.2f'
-              % (params['mon_hoa'][month]))
-
-        # monthly tax break based on mortgage interest and property tax
-        print('Buying scenario - tax break: $%0.2f'
-              % (params['mon_taxbrk'][month]))
-
-        # monthly maintenance
-        print('Buying scenario - maintenance: $%0.2f'
-              % (params['mon_maint'][month]))
-
-        # monthly home insurance - assuming home insurance is 10% of prop tax
-        print('Buying scenario - home insurance: $%0.2f'
-              % (params['mon_homeins'][month]))
-
-        # monthly cash outflow to buy a home
-        print('Buying scenario - cash outflow: $%0.2f'
-              % (params['mon_buy_outflow'][month]))
-
-        # monthly net worth if buying is the difference between home value
-        # outstanding principal
-        print('Buying scenario - net worth: $%0.2f'
-              % (params['mon_worth_buy'][month]))
-
-        # monthly net worth if owning home and selling
-        # based on 6% realtor fees
-        print('Buying scenario - net worth after selling home: $%0.2f' %
-              (params['mon_worth_buy_sell'][month]))
-
-        # renting scenario
-        # rent
-        print('Renting scenario - rent: $%0.2f'
-              % (params['mon_rent'][month]))
-
-        # monthly cash savings by renting
-        print('Renting scenario - monthly cash savings: $%0.2f'
-              % (params['mon_savings_rent'][month]))
-
-        # monthly net worth by renting and investing
-        print('Renting scenario - net worth after investing: $%0.2f'
-              % (params['mon_worth_rent'][month]))
+        row = {key: monthly[key][month] for key in RVB_COLUMNS}
+        row['month'] = month + 1
+        print_month(row)
 
     return
 
 
-def calc_params(params):
+def print_month(row):
+    '''
+    Prints the quantities of one month
+
+    Parameters
+    ----------
+    row: dict
+        month number and the monthly quantities of that month, as from
+        housing_core.iter_rent_vs_buy
+
+    Returns
+    -------
+    None
+    '''
+
+    print('\n' + '-'*50)
+    print('Month: %d' % (row['month']))
+
+    # home value
+    print('Buying scenario - home value: $%0.2f'
+          % (row['mon_home_val']))
+
+    # interest component of loan
+    print('Buying scenario - interest on loan: $%0.2f'
+          % (row['mon_int']))
+
+    # principal component of loan, and outstanding principal
+    # rem_term is the months left in life of loan
+    print('Buying scenario - principal on loan: $%0.2f'
+          % (row['mon_prin']))
+    print('Buying scenario - outstanding principal: $%0.2f'
+          % (row['mon_out_prin']))
+
+    # monthly property tax
+    print('Buying scenario - propery tax: $%0.2f'
+          % (row['mon_proptax']))
+
+    # monthly HOA
+    print('Buying scenario - HOA: $%0.2f'
+          % (row['mon_hoa']))
+
+    # monthly tax break based on mortgage interest and property tax
+    print('Buying scenario - tax break: $%0.2f'
+          % (row['mon_taxbrk']))
+
+    # monthly maintenance
+    print('Buying scenario - maintenance: $%0.2f'
+          % (row['mon_maint']))
+
+    # monthly home insurance - assuming home insurance is 10% of prop tax
+    print('Buying scenario - home insurance: $%0.2f'
+          % (row['mon_homeins']))
+
+    # monthly cash outflow to buy a home
+    print('Buying scenario - cash outflow: $%0.2f'
+          % (row['mon_buy_outflow']))
+
+    # monthly net worth if buying is the difference between home value
+    # outstanding principal
+    print('Buying scenario - net worth: $%0.2f'
+          % (row['mon_worth_buy']))
+
+    # monthly net worth if owning home and selling
+    # based on 6% realtor fees
+    print('Buying scenario - net worth after selling home: $%0.2f' %
+          (row['mon_worth_buy_sell']))
+
+    # renting scenario
+    # rent
+    print('Renting scenario - rent: $%0.2f'
+          % (row['mon_rent']))
+
+    # monthly cash savings by renting
+    print('Renting scenario - monthly cash savings: $%0.2f'
+          % (row['mon_savings_rent']))
+
+    # monthly net worth by renting and investing
+    print('Renting scenario - net worth after investing: $%0.2f'
+          % (row['mon_worth_rent']))
+
+    return
+
+
+def stream_months(params):
+    '''
+    Monthly quantities of a scenario, one month at a time, without
+    allocating the monthly arrays. Consumers such as print_rows, csv_rows
+    and excel_rows can be chained on the stream, and stopping the stream
+    early, e.g. with until_breakeven, skips the remaining months.
+
+    Parameters
+    ----------
+    params: dictionary
+        rent vs buy inputs as from get_user_input
+
+    Returns
+    -------
+    rows: generator of dict
+        see housing_core.iter_rent_vs_buy
+    '''
+
+    return iter_rent_vs_buy(
+        params['home_val'], params['down_pay'], params['loan_term'],
+        params['hoa'], params['maint'], params['prop_tax'],
+        params['tax_bkt'], params['rent'],
+        monthly_rates(params['int_rate'], params['yrs']),
+        monthly_rates(params['home_appr'], params['yrs']),
+        monthly_rates(params['rent_appr'], params['yrs']),
+        monthly_rates(params['inv_ret'], params['yrs']),
+        params.get('extra_pay', 0))
+
+
+def until_breakeven(rows):
+    '''
+    Passes rows on up to and including the first month in which the net
+    worth after selling the home reaches the net worth when renting, then
+    stops
+
+    Parameters
+    ----------
+    rows: iterable of dict
+        monthly rows, e.g. from stream_months
+
+    Yields
+    ------
+    row: dict
+        monthly row
+    '''
+
+    for row in rows:
+        yield row
+        if np.all(row['mon_worth_buy_sell'] >= row['mon_worth_rent']):
+            return
+
+
+def print_rows(rows):
+    '''
+    Prints every row as it arrives and passes it on
+
+    Parameters
+    ----------
+    rows: iterable of dict
+        monthly rows, e.g. from stream_months
+
+    Yields
+    ------
+    row: dict
+        monthly row
+    '''
+
+    for row in rows:
+        print_month(row)
+        yield row
+
+
+def csv_rows(rows, path):
+    '''
+    Writes every row to a CSV file as it arrives and passes it on. The file
+    holds the month and the columns in RVB_COLUMNS, and is closed when the
+    stream ends or is stopped.
+
+    Parameters
+    ----------
+    rows: iterable of dict
+        monthly rows of a single scenario, e.g. from stream_months
+    path: str
+        CSV file to write
+
+    Yields
+    ------
+    row: dict
+        monthly row
+    '''
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(('month',) + RVB_COLUMNS)
+        for row in rows:
+            writer.writerow([row['month']] +
+                            [float(row[key]) for key in RVB_COLUMNS])
+            yield row
+
+
+def excel_rows(rows, params, title='rent_vs_buy.xlsx'):
+    '''
+    Writes every row to excel as it arrives and passes it on, in the same
+    layout as write_to_excel. The workbook is written in constant memory
+    mode, which flushes every row to disk once the next one starts, and is
+    closed when the stream ends or is stopped.
+
+    Parameters
+    ----------
+    rows: iterable of dict
+        monthly rows of a single scenario, e.g. from stream_months
+    params: dictionary
+        contains the scenario inputs
+    title: str
+        name of the excel file
+
+    Yields
+    ------
+    row: dict
+        monthly row
+    '''
+
+    workbook = xlsxwriter.Workbook(title, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet()
+        money = write_excel_header(workbook, worksheet, params)
+        for i, row in enumerate(rows):
+            worksheet.write(i + 8, 0, row['month'])
+            worksheet.write_row(i + 8, 1,
+                                [float(row[key]) for key in RVB_COLUMNS],
+                                money)
+            yield row
+    finally:
+        workbook.close()
+
+
+def calc_params(params, cache=None):
     '''
     Calculate monthly changes and store in arrays
 
@@ -238,6 +559,8 @@ def calc_params(params):
     ----------
     params: dictionary
         contains all the placeholders for the intermediate and final arrays
+    cache: ResultCache, optional
+        on-disk cache consulted before computing, and updated after
 
     Returns
     -------
@@ -245,128 +568,42 @@ def calc_params(params):
         contains the monthly computations of the different entities
     '''
 
-    # iterate through the time period on a monthly basis
-    for month in range(len(params['mon'])):
-
-        # home value
-        if month == 0:
-            # in the first month, use the purchase price for home value
-            params['mon_home_val'][month] = \
-                (1 + params['mon_home_appr'][month]/100) * \
-                params['home_val']
-        else:
-            # use the previous month home value
-            params['mon_home_val'][month] = \
-                (1 + params['mon_home_appr'][month]/100) \
-                * params['mon_home_val'][month-1]
-
-        # interest component of loan
-        if month == 0:
-            # in the first month, the interest is based on loan amount
-            params['mon_int'][month] = \
-                params['mon_int_rate'][month]/100 * params['loan_amt']
-        else:
-            # use the previous months outstanding principal
-            params['mon_int'][month] = \
-                params['mon_int_rate'][month]/100 * \
-                params['mon_out_prin'][month-1]
-
-        # principal component of loan, and outstanding principal
-        # rem_term is the months left in life of loan
-        rem_term = params['loan_term'] * 12 - month
-        if month == 0:
-            # in the first month, the principal is based on loan amount
-            params['mon_prin'][month] = params['loan_amt'] * \
-                params['mon_int_rate'][month]/100 / \
-                (1 - (1 + params['mon_int_rate'][month]/100)
-                 ** (-rem_term)) \
-                - params['mon_int'][month]
-
-            params['mon_out_prin'][month] = params['loan_amt'] - \
-                params['mon_prin'][month]
-        else:
-            # use the previous months outstanding principal
-            params['mon_prin'][month] = \
-                params['mon_out_prin'][month-1] * \
-                params['mon_int_rate'][month] / 100 /\
-                (1 - (1 + params['mon_int_rate'][month]/100)
-                 ** (-rem_term)) \
-                - params['mon_int'][month]
-
-            params['mon_out_prin'][month] = \
-                params['mon_out_prin'][month-1] - \
-                params['mon_prin'][month]
-
-        # monthly property tax
-        if month == 0:
-            # in the first month, the property tax is based on home price
-            params['mon_proptax'][month] = params['prop_tax'] / (12*100)\
-                * params['home_val']
-        else:
-            # use the previous months home value
-            params['mon_proptax'][month] = params['prop_tax'] / (12*100)\
-                * params['mon_home_val'][month-1]
-
-        # monthly HOA
-        params['mon_hoa'][month] = params['hoa']
-
-        # monthly tax break based on mortgage interest and property tax
-        params['mon_taxbrk'][month] = params['tax_bkt'] / 100 * \
-            (params['mon_proptax'][month] + params['mon_int'][month])
-
-        # monthly maintenance
-        params['mon_maint'][month] = params['maint']
-
-        # monthly home insurance - assuming home insurance is 10% of prop tax
-        params['mon_homeins'][month] = \
-            params['mon_proptax'][month]/10
-
-        # monthly cash outflow to buy a home
-        params['mon_buy_outflow'][month] = \
-            params['mon_prin'][month] + \
-            params['mon_int'][month] + \
-            params['mon_proptax'][month] + \
-            params['mon_hoa'][month] + \
-            params['mon_homeins'][month] + \
-            params['mon_maint'][month] - \
-            params['mon_taxbrk'][month]
-
-        # monthly net worth if buying is the difference between home value
-        # outstanding principal
-        params['mon_worth_buy'][month] = \
-            params['mon_home_val'][month] - \
-            params['mon_out_prin'][month]
-
-        # monthly net worth if owning home and selling
-        # based on 6% realtor fees
-        params['mon_worth_buy_sell'][month] = \
-            params['mon_worth_buy'][month] - \
-            0.06 * params['mon_home_val'][month]
-
-        # renting scenario
-        # rent
-        if month == 0:
-            params['mon_rent'][month] = params['rent']
-        else:
-            params['mon_rent'][month] = \
-                (1 + params['mon_rent_appr'][month] / 100) * \
-                params['mon_rent'][month-1]
-
-        # monthly cash savings by renting
-        params['mon_savings_rent'][month] = \
-            params['mon_buy_outflow'][month] - \
-            params['mon_rent'][month]
-
-        # monthly net worth by renting and investing
-        if month == 0:
-            params['mon_worth_rent'][month] = \
-                (1 + params['mon_inv_ret'][month] / 100) * \
-                params['down_pay']
-        else:
-            params['mon_worth_rent'][month] = \
-                params['mon_savings_rent'][month] + \
-                (1 + params['mon_inv_ret'][month]/100) * \
-                (params['mon_worth_rent'][month-1])
+    # no additional principal payment unless given
+    params.setdefault('extra_pay', 0)
+
+    if cache is not None:
+        # scenarios computed before, by this or another process, are
+        # memory mapped from the cache
+        params['cache_key'] = scenario_key(
+            'rent_vs_buy', {key: params[key] for key in CACHE_INPUTS})
+        entry = cache.load(params['cache_key'])
+        if entry is not None:
+            data, meta = entry
+            params['monthly'] = MonthlyBlock(
+                data, consts={key: np.asarray(val)
+                              for key, val in meta['consts'].items()})
+            return params
+
+    args = (params['home_val'], params['down_pay'], params['loan_term'],
+            params['hoa'], params['maint'], params['prop_tax'],
+            params['tax_bkt'], params['rent'], params['mon_int_rate'],
+            params['mon_home_appr'], params['mon_rent_appr'],
+            params['mon_inv_ret'])
+
+    if np.any(np.asarray(params['extra_pay']) > 0):
+        # additional principal payments are path dependent - use the
+        # (numba compiled when available) monthly loop
+        calc_rent_vs_buy_loop(*args, extra_pay=params['extra_pay'],
+                              out=params['monthly'])
+    else:
+        # all months are computed at once by the shared vectorized kernel
+        calc_rent_vs_buy(*args, out=params['monthly'])
+
+    if cache is not None:
+        monthly = params['monthly']
+        cache.store(params['cache_key'], monthly.data,
+                    {'consts': {key: val.tolist() for key, val in
+                                monthly.consts.items()}})
 
     return params
 
@@ -388,109 +625,55 @@ def init_params(params):
         and final arrays
     '''
 
+    # no additional principal payment unless given
+    params.setdefault('extra_pay', 0)
+
     # range of months to model on
-    params['mon'] = np.array([i+1 for i in range(12 * params['yrs'])])
+    params['mon'] = np.arange(1, 12 * params['yrs'] + 1)
 
+    # monthly rates only change once a year, so they are kept as one value
+    # per year and expanded to months when needed
     # monthly home price appreciation is annual divided by 12
-    params['mon_home_appr'] = np.array(params['home_appr']
-                                       [(params['mon']-1)//12]/12)
+    params['mon_home_appr'] = monthly_rates(params['home_appr'],
+                                            params['yrs'])
 
     # monthly rent appreciation is annual divided by 12
-    params['mon_rent_appr'] = np.array(params['rent_appr']
-                                       [(params['mon']-1)//12]/12)
+    params['mon_rent_appr'] = monthly_rates(params['rent_appr'],
+                                            params['yrs'])
 
     # monthly interest rate is annual divided by 12
-    params['mon_int_rate'] = np.array(params['int_rate']
-                                      [(params['mon']-1)//12]/12)
+    params['mon_int_rate'] = monthly_rates(params['int_rate'],
+                                           params['yrs'])
 
     # monthly investment return is annual divided by 12
-    params['mon_inv_ret'] = np.array(params['inv_ret']
-                                     [(params['mon']-1)//12]/12)
-
-    # initialize empty array to hold monthly values
-    # monthly home value
-    params['mon_home_val'] = np.zeros(params['mon'].shape)
-    # principal paid each month
-    params['mon_prin'] = np.zeros(params['mon'].shape)
-    # outstanding principal after each month
-    params['mon_out_prin'] = np.zeros(params['mon'].shape)
-    # monthly interest
-    params['mon_int'] = np.zeros(params['mon'].shape)
-    # monthly property tax
-    params['mon_proptax'] = np.zeros(params['mon'].shape)
-    # monthly HOA
-    params['mon_hoa'] = np.zeros(params['mon'].shape)
-    # monthly tax break
-    params['mon_taxbrk'] = np.zeros(params['mon'].shape)
-    # monthly home insurance
-    params['mon_homeins'] = np.zeros(params['mon'].shape)
-    # monthly maintenance
-    params['mon_maint'] = np.zeros(params['mon'].shape)
-    # monthly net outflow if buying
-    params['mon_buy_outflow'] = np.zeros(params['mon'].shape)
-    # monthly net worth if buying
-    params['mon_worth_buy'] = np.zeros(params['mon'].shape)
-    # monthly net worth if buying and factoring cost to sell
-    params['mon_worth_buy_sell'] = np.zeros(params['mon'].shape)
-    # monthly rent
-    params['mon_rent'] = np.zeros(params['mon'].shape)
-    # monthly savings if renting
-    params['mon_savings_rent'] = np.zeros(params['mon'].shape)
-    # monthly net worth if renting and investing
-    params['mon_worth_rent'] = np.zeros(params['mon'].shape)
+    params['mon_inv_ret'] = monthly_rates(params['inv_ret'], params['yrs'])
 
-    return params
+    # scenario axes - the inputs may also be arrays of scenarios, with the
+    # years of the annual rates along the last axis
+    shape = np.broadcast_shapes(
+        *[np.shape(params[key]) for key in SCENARIO_INPUTS],
+        *[np.shape(params[key])[:-1] for key in ANNUAL_RATES])
 
+    # one contiguous block holding all the monthly values - home value,
+    # interest, principal, outstanding principal, property tax, HOA, tax
+    # break, maintenance, home insurance, cash outflow and net worth if
+    # buying, rent, savings and net worth if renting. HOA and maintenance
+    # are constant, so only a single value is kept for them
+    params['monthly'] = MonthlyBlock.zeros(len(params['mon']), shape)
 
-def get_valid_input(disp_text, yrs):
-    '''
-    setup a loop to make sure entities are valid, either fixed with
-    length 1 or match length of modeling period.
+    return params
 
-    Parameters
-    ----------
-    disp_text: str
-        display text
-    yrs: int
-        number of years to simulate
 
-    Returns
-    -------
-    inp: list of float
-        list of validated inputs
-    '''
-    while True:
-        try:
-            # input statement
-            msg = 'Enter ' + disp_text + ' (%): '
-            inp = np.array(input(msg).strip(' []()').split(','))
-
-            # if length is not equal to yrs, or fixed, then ask to re-enter
-            j_len = len(inp)
-            if j_len == yrs or j_len == 1:
-                # if fixed rate, repeat the entry to match yrs
-                if j_len == 1:
-                    inp = np.repeat(inp[0], yrs)
-                # convert to float from string for further operations
-                inp = inp.astype(float)
-                break
-            print('You entered %d entries! Enter %d entries, '
-                  'or 1 entry to denote fixed!' % (j_len, yrs))
-        except Exception as e:
-            print(e)
-
-    return inp
-
-
-def get_user_input():
+def get_user_input(rates=True):
     '''
     Get a variety of user inputs to simulate the scenario of buying vs
     renting a similar property.
 
     Parameters
     ----------
-    None:
-        No input arguments
+    rates: bool
+        ask for the annual interest rate, appreciation and investment
+        returns - False when they come from elsewhere, e.g. a history file
 
     Returns
     -------
@@ -502,58 +685,12 @@ def get_user_input():
     params = {}
 
     # home value
-    while True:
-        try:
-            # get input
-            inp = input('Home value : ')
-            mod = float(inp.strip(' kK$%Mm,'))
-
-            # check to see if home value is in 1000's
-            if 'k' in inp or 'K' in inp:
-                params['home_val'] = mod * 1000
-
-            # check to see if home value is in 1000000's
-            elif 'm' in inp or 'M' in inp:
-                params['home_val'] = mod * 1000000
-
-            # else home value is as listed
-            else:
-                params['home_val'] = mod
-            break
-
-        except Exception as e:
-            print(e)
-            print('Enter as 100000 or $10,000 or $100K or 100K')
+    params['home_val'] = get_valid_input('Home value : ')
 
     # downpayment - typically less than 30% of home value or amount
-    while True:
-        try:
-            # get input
-            inp = input('Down-payment (% or $): ')
-            mod = float(inp.strip(' kK$%Mm,'))
-
-            # check to see if downpayment is in 1000's
-            if 'k' in inp or 'K' in inp:
-                params['down_pay'] = mod * 1000
-
-            # check to see if downpayment is in 1000000's
-            elif 'm' in inp or 'M' in inp:
-                params['down_pay'] = mod * 1000000
-
-            # check to see if is listed in percentage or less than 100
-            elif '%' in inp or mod <= 100:
-                params['down_pct'] = mod
-                params['down_pay'] = params['home_val'] * \
-                    params['down_pct']/100
-
-            # else downpayment is as listed
-            else:
-                params['down_pay'] = mod
-            break
-
-        except Exception as e:
-            print(e)
-            print('Enter as 10000 or $10,000 or $10K or 10K or 10%')
+    params['down_pay'] = get_valid_input('Down-payment (% or $): ',
+                                         params['home_val'])
+    params['down_pct'] = params['down_pay'] / params['home_val'] * 100
 
     # loan amount is home value minus down payment
     params['loan_amt'] = params['home_val'] - params['down_pay']
@@ -580,22 +717,48 @@ def get_user_input():
     # Years to model
     params['yrs'] = int(input('Years to model: '))
 
+    if not rates:
+        return get_extra_pay(params)
+
     # Annual interest rate
-    params['int_rate'] = get_valid_input('annual interest rate',
+    params['int_rate'] = get_valid_rates('annual interest rate',
                                          params['yrs'])
 
     # Annual home price appreciation
-    params['home_appr'] = get_valid_input('annual home appreciation',
+    params['home_appr'] = get_valid_rates('annual home appreciation',
                                           params['yrs'])
 
     # Annual rent price appreciation
-    params['rent_appr'] = get_valid_input('annual rent appreciation',
+    params['rent_appr'] = get_valid_rates('annual rent appreciation',
                                           params['yrs'])
 
     # Investment returns
-    params['inv_ret'] = get_valid_input('annual investment returns',
+    params['inv_ret'] = get_valid_rates('annual investment returns',
                                         params['yrs'])
 
+    return get_extra_pay(params)
+
+
+def get_extra_pay(params):
+    '''
+    Get the optional additional monthly principal payment. It is asked
+    last, so answers scripted for the earlier prompts keep their order, and
+    a blank entry means none.
+
+    Parameters
+    ----------
+    params: dictionary
+        parameters entered so far
+
+    Returns
+    -------
+    params: dictionary
+        parameters with extra_pay added
+    '''
+
+    params['extra_pay'] = get_valid_input(
+        'Additional monthly principal ($, blank for none): ', default=0)
+
     return params
 
 
@@ -618,17 +781,25 @@ def main():
     # initialize the necessary arrays based on input parameters
     params = init_params(params)
 
+    # cache shared with other runs, when HOUSING_CACHE_DIR is set
+    cache = ResultCache.from_env()
+
     # calculate monthly updates
-    params = calc_params(params)
+    params = calc_params(params, cache)
 
     # print monthly updates
     print_monthly(params)
 
     # plot net worth in both scenarios
-    plot_net_worth(params)
-
-    # write monthly schedule into excel sheet
-    write_to_excel(params)
+    plot_net_worth(params, PLOT_POINTS)
+
+    # write monthly schedule into excel sheet - a workbook cached for the
+    # same scenario is copied instead of written again
+    if cache is None:
+        write_to_excel(params)
+    elif not cache.fetch_file(params['cache_key'], 'rent_vs_buy.xlsx'):
+        write_to_excel(params)
+        cache.store_file(params['cache_key'], 'rent_vs_buy.xlsx')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# command line options
+import argparse
+# scenario files
+import json
+# numpy for array tasks
+import numpy as np
+# shared numeric core
+from housing_core import calc_schedule
+# rent vs buy model
+from rent_vs_buy import ANNUAL_RATES, SCENARIO_INPUTS, calc_params, \
+    init_params
+
+# inputs of every kind of scenario, and the inputs a batch has in common
+KINDS = {'rent_vs_buy': SCENARIO_INPUTS + ('yrs',) + ANNUAL_RATES,
+         'schedule': ('loan_amt', 'years', 'int_rate', 'loan_type')}
+
+# dollar amounts are compared to the cent, rates to 1e-6 %
+MONEY = ('home_val', 'down_pay', 'extra_pay', 'hoa', 'maint', 'rent',
+         'loan_amt')
+RATE_DECIMALS = 6
+
+
+def canonicalize(scenario, kind='rent_vs_buy'):
+    '''
+    canonical form of a scenario, so scenarios that compute the same
+    result compare equal - missing optional inputs get their defaults, a
+    single annual rate is repeated for every year like get_valid_rates,
+    and amounts are rounded to the cent and rates to RATE_DECIMALS
+
+    Parameters
+    ----------
+    scenario: dict
+        inputs of the scenario, see KINDS - other entries such as the
+        priority are left out
+    kind: str
+        'rent_vs_buy' or 'schedule'
+
+    Returns
+    -------
+    inputs: dict
+        canonical inputs
+    '''
+
+    scenario = dict(scenario)
+    if kind == 'rent_vs_buy':
+        scenario.setdefault('extra_pay', 0)
+        scenario['yrs'] = int(scenario['yrs'])
+        scenario['loan_term'] = int(scenario['loan_term'])
+        for key in ANNUAL_RATES:
+            rate = np.atleast_1d(np.asarray(scenario[key], dtype=float))
+            scenario[key] = np.broadcast_to(rate, (scenario['yrs'],))
+    else:
+        scenario.setdefault('loan_type', 'R')
+        scenario['years'] = int(scenario['years'])
+
+    inputs = {}
+    for key in KINDS[kind]:
+        val = scenario[key]
+        if isinstance(val, (str, int)):
+            inputs[key] = val
+        else:
+            # adding 0 turns -0.0 into 0.0, so equal inputs have equal
+            # bytes
+            inputs[key] = np.round(np.asarray(val, dtype=float),
+                                   2 if key in MONEY else RATE_DECIMALS) + 0
+
+    return inputs
+
+
+def group_of(inputs, kind='rent_vs_buy'):
+    '''
+    inputs that have to be the same for scenarios to be computed in one
+    vectorized call
+
+    Parameters
+    ----------
+    inputs: dict
+        canonical inputs
+    kind: str
+        'rent_vs_buy' or 'schedule'
+
+    Returns
+    -------
+    group: tuple
+        the years modeled and whether the monthly loop is needed for rent
+        vs buy, the loan term and type for a schedule
+    '''
+
+    if kind == 'rent_vs_buy':
+        # loan terms vary per scenario within a call, but scenarios with
+        # extra principal need the monthly loop
+        return (inputs['yrs'], bool(inputs['extra_pay'] > 0))
+
+    return (inputs['years'], inputs['loan_type'])
+
+
+def plan(scenarios, kind='rent_vs_buy', max_batch=4096):
+    '''
+    Plans the computation of a list of scenarios. Every scenario is
+    canonicalized and exact duplicates are collapsed into one computation,
+    the unique scenarios are grouped into batches that can be computed in
+    one vectorized call, and the batches are ordered by priority. A
+    scenario may carry a 'priority' entry (higher runs first, 0 by
+    default) - duplicates take the highest priority of their copies, and
+    a batch runs at the priority of its most urgent scenario.
+
+    Parameters
+    ----------
+    scenarios: list of dict
+        inputs of every scenario
+    kind: str
+        'rent_vs_buy' or 'schedule'
+    max_batch: int
+        most unique scenarios in a batch
+
+    Returns
+    -------
+    batches: list of dict
+        in the order to run, with the common inputs in group, the
+        canonical inputs of every unique scenario, the indices into
+        scenarios each of them stands for, and the priority of the batch
+    '''
+
+    if kind not in KINDS:
+        raise ValueError('kind must be one of %s' % (tuple(KINDS),))
+
+    # collapse exact duplicates, in order of first appearance
+    unique = {}
+    for i, scenario in enumerate(scenarios):
+        inputs = canonicalize(scenario, kind)
+        key = tuple(val.tobytes() if isinstance(val, np.ndarray) else val
+                    for val in inputs.values())
+        priority = scenario.get('priority', 0)
+        if key in unique:
+            job = unique[key]
+            job['members'].append(i)
+            job['priority'] = max(job['priority'], priority)
+        else:
+            unique[key] = {'inputs': inputs, 'members': [i],
+                           'priority': priority}
+
+    # compatible scenarios, most urgent first within every group
+    groups = {}
+    for job in unique.values():
+        groups.setdefault(group_of(job['inputs'], kind), []).append(job)
+
+    batches = []
+    for group, jobs in groups.items():
+        jobs.sort(key=lambda job: -job['priority'])
+        for start in range(0, len(jobs), max_batch):
+            chunk = jobs[start:start + max_batch]
+            batches.append({'group': group,
+                            'inputs': [job['inputs'] for job in chunk],
+                            'members': [job['members'] for job in chunk],
+                            'priority': chunk[0]['priority']})
+
+    # sorting is stable, so batches of equal priority keep their order
+    batches.sort(key=lambda batch: -batch['priority'])
+
+    return batches
+
+
+def run_batch(batch, kind='rent_vs_buy'):
+    '''
+    computes the unique scenarios of a batch in one vectorized call
+
+    Parameters
+    ----------
+    batch: dict
+        batch from plan
+    kind: str
+        'rent_vs_buy' or 'schedule'
+
+    Returns
+    -------
+    results: list
+        result of every unique scenario - the MonthlyBlock of a rent vs
+        buy scenario, or [pay_h, int_h, prin_h, month_h, out_prin_h] of a
+        schedule
+    '''
+
+    inputs = batch['inputs']
+
+    if kind == 'rent_vs_buy':
+        params = {key: np.array([val[key] for val in inputs])
+                  for key in KINDS[kind]}
+        params['yrs'] = batch['group'][0]
+        monthly = calc_params(init_params(params))['monthly']
+        return [monthly.take(j) for j in range(len(inputs))]
+
+    years, loan_type = batch['group']
+    res = calc_schedule(np.array([val['loan_amt'] for val in inputs]),
+                        years,
+                        np.array([val['int_rate'] for val in inputs]),
+                        loan_type)
+    return [[res[0][j], res[1][j], res[2][j], res[3], res[4][j]]
+            for j in range(len(inputs))]
+
+
+def run_plan(batches, kind='rent_vs_buy'):
+    '''
+    computes the batches of a plan in order
+
+    Parameters
+    ----------
+    batches: list of dict
+        batches from plan
+    kind: str
+        'rent_vs_buy' or 'schedule'
+
+    Yields
+    ------
+    [batch, results]: list
+        every batch as it is computed, with the result of every unique
+        scenario, see run_batch
+    '''
+
+    for batch in batches:
+        yield [batch, run_batch(batch, kind)]
+
+
+def gather(batches, n, kind='rent_vs_buy'):
+    '''
+    computes the batches of a plan and hands every result to the
+    scenarios it stands for
+
+    Parameters
+    ----------
+    batches: list of dict
+        batches from plan
+    n: int
+        number of scenarios planned
+    kind: str
+        'rent_vs_buy' or 'schedule'
+
+    Returns
+    -------
+    results: list
+        result of every scenario, in the order planned - duplicates share
+        the same result
+    '''
+
+    results = [None] * n
+    for batch, res in run_plan(batches, kind):
+        for members, val in zip(batch['members'], res):
+            for i in members:
+                results[i] = val
+
+    return results
+
+
+def run(scenarios, kind='rent_vs_buy', max_batch=4096):
+    '''
+    computes every scenario, with each unique computation done once
+
+    Parameters
+    ----------
+    scenarios: list of dict
+        inputs of every scenario
+    kind: str
+        'rent_vs_buy' or 'schedule'
+    max_batch: int
+        most unique scenarios in a batch
+
+    Returns
+    -------
+    results: list
+        result of every scenario, in the order given, see gather
+    '''
+
+    return gather(plan(scenarios, kind, max_batch), len(scenarios), kind)
+
+
+def main():
+    '''
+    Computes the rent vs buy or amortization schedule scenarios of a JSON
+    file holding a list of scenarios, with duplicates computed once and
+    compatible scenarios computed in batches.
+    '''
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('kind', choices=tuple(KINDS))
+    parser.add_argument('scenarios', help='JSON file with a list of inputs')
+    parser.add_argument('--max-batch', type=int, default=4096)
+    args = parser.parse_args()
+
+    with open(args.scenarios) as f:
+        scenarios = json.load(f)
+
+    batches = plan(scenarios, args.kind, args.max_batch)
+    print('%d scenarios, %d unique, in %d batches'
+          % (len(scenarios), sum(len(batch['inputs']) for batch in batches),
+             len(batches)))
+
+    results = gather(batches, len(scenarios), args.kind)
+    for i, val in enumerate(results):
+        if args.kind == 'rent_vs_buy':
+            print('Scenario %d: net worth buying $%0.2f, renting $%0.2f'
+                  % (i, val['mon_worth_buy_sell'][-1],
+                     val['mon_worth_rent'][-1]))
+        else:
+            print('Scenario %d: monthly payment $%0.2f, total interest '
+                  '$%0.2f' % (i, val[0][0], np.sum(val[1])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# process pool for the batches
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+# numpy for array tasks
+import numpy as np
+# shared numeric core
+from housing_core import RVB_COLUMNS, RVB_CONST_COLUMNS, MonthlyBlock, \
+    calc_rent_vs_buy, calc_schedule, monthly_rates
+# monthly loop for path dependent scenarios
+from housing_jit import calc_rent_vs_buy_loop
+# user inputs of a rent vs buy scenario
+from rent_vs_buy import ANNUAL_RATES, SCENARIO_INPUTS
+
+
+class SharedArray:
+    '''
+    numpy array in a named shared memory segment, which worker processes
+    attach to by name and write into, so results are never pickled or
+    copied back to the parent.
+
+    The process that creates the segment owns it and unlinks it on close,
+    processes that attach only close their own mapping. Use it as a context
+    manager, or call close in a finally block, so the segment is removed
+    even when a worker fails. Views of the array have to be deleted before
+    closing - the segment is still unlinked, but the mapping stays until
+    the views are gone and close raises BufferError.
+
+    Parameters
+    ----------
+    shape: tuple of int
+        shape of the array
+    dtype: str or numpy.dtype
+        type of the array
+    name: str, optional
+        name of an existing segment to attach to, a new segment is created
+        if not given
+    '''
+
+    __slots__ = ('shm', 'array', 'owner')
+
+    def __init__(self, shape, dtype=float, name=None):
+        dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        # the array holds an export of the buffer, so the segment cannot
+        # be unmapped while any view of it is alive
+        self.array = np.frombuffer(self.shm.buf, dtype,
+                                   int(np.prod(shape))).reshape(shape)
+
+    @property
+    def spec(self):
+        '''
+        name, shape and type of the segment, to attach to it from another
+        process
+        '''
+        return (self.shm.name, self.array.shape, self.array.dtype.str)
+
+    @classmethod
+    def attach(cls, spec):
+        '''
+        attach to a segment created by another process
+
+        Parameters
+        ----------
+        spec: tuple
+            spec of the segment
+
+        Returns
+        -------
+        shared: SharedArray
+            array mapped onto the segment
+        '''
+
+        name, shape, dtype = spec
+        return cls(shape, dtype, name)
+
+    def close(self):
+        '''
+        release the mapping of this process, and remove the segment if this
+        process created it
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        BufferError
+            views of the array are still in use
+        '''
+
+        if self.array is None:
+            return
+        self.array = None
+        try:
+            if self.owner:
+                self.shm.unlink()
+        finally:
+            try:
+                self.shm.close()
+            except BufferError:
+                raise BufferError('views of shared array %s are still in '
+                                  'use - delete them before closing'
+                                  % self.shm.name) from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _rent_vs_buy_worker(spec, start, inputs, yrs):
+    '''
+    computes a chunk of rent vs buy scenarios into the shared block
+
+    Parameters
+    ----------
+    spec: tuple
+        spec of the (scenarios, stored columns, months) shared block
+    start: int
+        first scenario of the chunk
+    inputs: dict
+        SCENARIO_INPUTS of every scenario in the chunk, and the
+        ANNUAL_RATES as (scenarios, yrs) arrays
+    yrs: int
+        number of years to model
+
+    Returns
+    -------
+    consts: dict
+        value of every constant column for the scenarios in the chunk
+    '''
+
+    n = len(inputs['home_val'])
+    consts = {key: np.zeros(n) for key in RVB_CONST_COLUMNS}
+
+    with SharedArray.attach(spec) as shared:
+        out = MonthlyBlock(shared.array[start:start + n], RVB_COLUMNS,
+                           consts)
+        args = [inputs[key] for key in ('home_val', 'down_pay', 'loan_term',
+                                        'hoa', 'maint', 'prop_tax',
+                                        'tax_bkt', 'rent')]
+        args += [monthly_rates(inputs[key], yrs) for key in ANNUAL_RATES]
+        if np.any(inputs['extra_pay'] > 0):
+            calc_rent_vs_buy_loop(*args, extra_pay=inputs['extra_pay'],
+                                  out=out)
+        else:
+            calc_rent_vs_buy(*args, out=out)
+        del out
+
+    return consts
+
+
+def run_rent_vs_buy(params, n_workers=None, chunk_size=1000):
+    '''
+    rent vs buy model of a batch of scenarios in a process pool. Every
+    worker computes a chunk of scenarios straight into one shared memory
+    block, and only the chunk inputs and the per-scenario constant columns
+    are pickled, so the monthly results are never serialized.
+
+    Parameters
+    ----------
+    params: dict
+        rent vs buy inputs as from rent_vs_buy.get_user_input, where the
+        scenario inputs may be arrays of scenarios and the annual rates
+        have the years along the last axis
+    n_workers: int, optional
+        number of worker processes, the number of CPUs if not given
+    chunk_size: int
+        number of scenarios computed by a worker at a time
+
+    Returns
+    -------
+    [params, shared]: list
+        inputs with the monthly results in params['monthly'] as a view of
+        the shared block, and the SharedArray owning the block - close it
+        once done with the results
+    '''
+
+    params = dict(params)
+    params.setdefault('extra_pay', 0)
+    yrs = params['yrs']
+    shape = np.broadcast_shapes(
+        *[np.shape(params[key]) for key in SCENARIO_INPUTS],
+        *[np.shape(params[key])[:-1] for key in ANNUAL_RATES])
+    n = int(np.prod(shape))
+    months = 12 * yrs
+
+    # flat inputs of every scenario
+    flat = {key: np.broadcast_to(np.asarray(params[key], dtype=float),
+                                 shape).ravel()
+            for key in SCENARIO_INPUTS}
+    for key in ANNUAL_RATES:
+        flat[key] = np.broadcast_to(np.asarray(params[key], dtype=float),
+                                    shape + (yrs,)).reshape(n, yrs)
+
+    n_stored = len(RVB_COLUMNS) - len(RVB_CONST_COLUMNS)
+    shared = SharedArray((n, n_stored, months))
+    try:
+        with ProcessPoolExecutor(n_workers) as pool:
+            starts = range(0, n, chunk_size)
+            jobs = [pool.submit(_rent_vs_buy_worker, shared.spec, start,
+                                {key: val[start:start + chunk_size]
+                                 for key, val in flat.items()}, yrs)
+                    for start in starts]
+            chunks = [job.result() for job in jobs]
+    except BaseException:
+        shared.close()
+        raise
+
+    consts = {key: np.concatenate([chunk[key] for chunk in chunks])
+              .reshape(shape) for key in RVB_CONST_COLUMNS}
+
+    params['mon'] = np.arange(1, months + 1)
+    params['monthly'] = MonthlyBlock(
+        shared.array.reshape(shape + (n_stored, months)), RVB_COLUMNS,
+        consts)
+
+    return [params, shared]
+
+
+def _schedule_worker(spec, start, loan_amt, years, int_rate, loan_type):
+    '''
+    computes a chunk of amortization schedules into the shared block
+
+    Parameters
+    ----------
+    spec: tuple
+        spec of the (loans, 4, months) shared block
+    start: int
+        first loan of the chunk
+    loan_amt, int_rate: array of float
+        loan amount and interest rate (%) of every loan in the chunk
+    years: int
+        number of years in the loans
+    loan_type: str
+        Indicator to specify if the loans are regular or interest only
+
+    Returns
+    -------
+    None
+    '''
+
+    pay_h, int_h, prin_h, _, out_prin_h = calc_schedule(
+        loan_amt, years, int_rate, loan_type)
+
+    with SharedArray.attach(spec) as shared:
+        out = shared.array[start:start + len(loan_amt)]
+        out[:, 0], out[:, 1], out[:, 2], out[:, 3] = \
+            pay_h, int_h, prin_h, out_prin_h
+        del out
+
+
+def run_schedule(loan_amt, years, int_rate, loan_type='R', n_workers=None,
+                 chunk_size=10000):
+    '''
+    amortization schedules of a batch of loans in a process pool, with the
+    workers writing into one shared memory block, see run_rent_vs_buy
+
+    Parameters
+    ----------
+    loan_amt: float or array of float
+        outstanding loan amount
+    years: int
+        number of years in the loans
+    int_rate: float or array of float
+        fixed interest rate at start of the loan (%)
+    loan_type: str
+        Indicator to specify if the loans are regular or interest only
+    n_workers: int, optional
+        number of worker processes, the number of CPUs if not given
+    chunk_size: int
+        number of loans computed by a worker at a time
+
+    Returns
+    -------
+    [res, shared]: list
+        [pay_h, int_h, prin_h, month_h, out_prin_h] as from
+        housing_core.calc_schedule, as views of the shared block, and the
+        SharedArray owning the block - close it once done with the results
+    '''
+
+    shape = np.broadcast_shapes(np.shape(loan_amt), np.shape(int_rate))
+    n = int(np.prod(shape))
+    months = years * 12
+    loan_amt = np.broadcast_to(np.asarray(loan_amt, dtype=float),
+                               shape).ravel()
+    int_rate = np.broadcast_to(np.asarray(int_rate, dtype=float),
+                               shape).ravel()
+
+    shared = SharedArray((n, 4, months))
+    try:
+        with ProcessPoolExecutor(n_workers) as pool:
+            jobs = [pool.submit(_schedule_worker, shared.spec, start,
+                                loan_amt[start:start + chunk_size], years,
+                                int_rate[start:start + chunk_size],
+                                loan_type)
+                    for start in range(0, n, chunk_size)]
+            for job in jobs:
+                job.result()
+    except BaseException:
+        shared.close()
+        raise
+
+    out = shared.array.reshape(shape + (4, months))
+    res = [out[..., 0, :], out[..., 1, :], out[..., 2, :],
+           np.arange(1, months + 1), out[..., 3, :]]
+
+    return [res, shared]
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+
+
+class RunningMoments:
+    '''
+    Running count, mean, variance, minimum and maximum of a stream of
+    batches, kept separately for every month (or any other trailing axis).
+    Batches are combined with the parallel update of Chan et al., so
+    moments computed by different workers can be merged exactly.
+
+    Parameters
+    ----------
+    size: int
+        number of months
+    '''
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, size):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def update(self, batch):
+        '''
+        add a batch of values
+
+        Parameters
+        ----------
+        batch: array of float
+            (values, months) array
+
+        Returns
+        -------
+        None
+        '''
+
+        batch = np.asarray(batch, dtype=float)
+        other = RunningMoments(batch.shape[-1])
+        other.count = len(batch)
+        other.mean = batch.mean(axis=0)
+        other.m2 = ((batch - other.mean)**2).sum(axis=0)
+        other.min = batch.min(axis=0)
+        other.max = batch.max(axis=0)
+        self.merge(other)
+
+    def merge(self, other):
+        '''
+        combine with the moments of another stream
+
+        Parameters
+        ----------
+        other: RunningMoments
+            moments to merge in
+
+        Returns
+        -------
+        None
+        '''
+
+        count = self.count + other.count
+        if count == 0:
+            return
+
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + \
+            delta**2 * self.count * other.count / count
+        self.count = count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    @property
+    def var(self):
+        '''
+        sample variance
+        '''
+        return self.m2 / max(self.count - 1, 1)
+
+    @property
+    def std(self):
+        '''
+        sample standard deviation
+        '''
+        return np.sqrt(self.var)
+
+
+class QuantileSketch:
+    '''
+    Mergeable quantile sketch for every month, a merging t-digest. Every
+    month keeps a bounded number of weighted centroids, which are small
+    near the tails and large near the median, so tail quantiles such as P5
+    and P95 stay accurate while memory is O(months x compression) however
+    many values are added. Batches are added and sketches merged by sorting
+    the centroids of every month together and greedily merging neighbours
+    while the merged centroid stays within one unit of the arcsine k-scale,
+    so centroids that are already small enough are kept as they are. The
+    greedy pass steps over the merged centroids, all months at once.
+
+    Parameters
+    ----------
+    size: int
+        number of months
+    compression: int
+        accuracy parameter - a little over compression / 2 centroids per
+        month, and never more than compression
+    '''
+
+    __slots__ = ('compression', 'means', 'weights', 'min', 'max')
+
+    def __init__(self, size, compression=200):
+        self.compression = compression
+        self.means = np.zeros((size, 0))
+        self.weights = np.zeros((size, 0))
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def update(self, batch):
+        '''
+        add a batch of values
+
+        Parameters
+        ----------
+        batch: array of float
+            (values, months) array
+
+        Returns
+        -------
+        None
+        '''
+
+        # sorted batch - the centroids are sorted already, so the merge sort
+        # in _compress only has to merge two runs per month
+        batch = np.sort(np.asarray(batch, dtype=float).T, axis=1)
+        self._compress(np.concatenate([self.means, batch], axis=1),
+                       np.concatenate([self.weights, np.ones(batch.shape)],
+                                      axis=1))
+        self.min = np.minimum(self.min, batch[:, 0])
+        self.max = np.maximum(self.max, batch[:, -1])
+
+    def merge(self, other):
+        '''
+        combine with the sketch of another stream
+
+        Parameters
+        ----------
+        other: QuantileSketch
+            sketch to merge in
+
+        Returns
+        -------
+        None
+        '''
+
+        self._compress(np.concatenate([self.means, other.means], axis=1),
+                       np.concatenate([self.weights, other.weights], axis=1))
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+
+    def _k(self, q):
+        # arcsine scale function, compression / 4 units from the median to
+        # either tail
+        return self.compression / (2 * np.pi) * np.arcsin(2 * q - 1)
+
+    def _k_inv(self, k):
+        k = np.minimum(k, self.compression / 4)
+        return (np.sin(2 * np.pi * k / self.compression) + 1) / 2
+
+    def _compress(self, means, weights):
+        # sort the centroids of every month by their mean
+        order = np.argsort(means, axis=1, kind='stable')
+        means = np.take_along_axis(means, order, axis=1)
+        weights = np.take_along_axis(weights, order, axis=1)
+        size, m = means.shape
+
+        # quantile at the right edge of every centroid - every month is
+        # shifted by 2 per month in the flat array, so one sorted search
+        # covers all months
+        total = weights.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            q_right = np.cumsum(weights, axis=1) / total[:, None]
+        q_right = np.nan_to_num(q_right)
+        shift = 2 * np.arange(size)
+        flat = (q_right + shift[:, None]).ravel()
+
+        # greedy merge - a merged centroid starts at the first centroid not
+        # taken yet and takes its neighbours while it spans at most one
+        # unit of k, and always at least one centroid
+        starts = np.zeros((size, m), dtype=bool)
+        first = np.zeros(size, dtype=int)
+        q_left = np.zeros(size)
+        rows = np.arange(size)
+        while True:
+            todo = first < m
+            if not np.any(todo):
+                break
+            starts[rows[todo], first[todo]] = True
+            q_limit = self._k_inv(self._k(q_left[todo]) + 1)
+            end = np.searchsorted(flat, q_limit + shift[todo],
+                                  side='right') - m * rows[todo]
+            end = np.maximum(end, first[todo] + 1)
+            first[todo] = end
+            q_left[todo] = q_right[rows[todo], np.minimum(end, m) - 1]
+
+        # weighted mean of the centroids merged into each new centroid of
+        # each month, with zero weight padding after the last one
+        ids = np.cumsum(starts, axis=1) - 1
+        n_out = max(int(ids[:, -1].max()) + 1, 1) if m else 1
+        ids = (ids + n_out * rows[:, None]).ravel()
+        weight = np.bincount(ids, weights.ravel(), size * n_out)
+        total = np.bincount(ids, (weights * means).ravel(), size * n_out)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(weight > 0, total / weight, 0)
+
+        self.weights = weight.reshape(size, n_out)
+        self.means = mean.reshape(size, n_out)
+
+    def quantile(self, q):
+        '''
+        estimated quantiles of every month
+
+        Parameters
+        ----------
+        q: float or array of float
+            quantiles between 0 and 1
+
+        Returns
+        -------
+        vals: array of float
+            (months,) estimates, or (len(q), months) for an array of q
+        '''
+
+        q = np.asarray(q, dtype=float)
+
+        # centroids of every month as (quantile, mean) points, with the
+        # minimum and maximum at the ends - empty centroids are moved to
+        # the end, onto the maximum
+        weights = self.weights
+        size = len(weights)
+        total = weights.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pos = (np.cumsum(weights, axis=1) - weights / 2) / total
+        empty = weights <= 0
+        pos = np.concatenate([np.zeros((size, 1)),
+                              np.where(empty, 1, pos), np.ones((size, 1))],
+                             axis=1)
+        vals = np.concatenate([self.min[:, None],
+                               np.where(empty, self.max[:, None],
+                                        self.means),
+                               self.max[:, None]], axis=1)
+        order = np.argsort(pos, axis=1, kind='stable')
+        pos = np.take_along_axis(pos, order, axis=1)
+        vals = np.take_along_axis(vals, order, axis=1)
+
+        # linear interpolation between the points around every quantile,
+        # with one sorted search over all months shifted by 2 per month
+        n = pos.shape[1]
+        shift = 2 * np.arange(size)
+        target = q[..., None] + shift
+        i = np.searchsorted((pos + shift[:, None]).ravel(), target,
+                            side='right') - 1
+        i = np.clip(i - n * np.arange(size), 0, n - 2) + \
+            n * np.arange(size)
+        x0, x1 = pos.ravel()[i], pos.ravel()[i + 1]
+        v0, v1 = vals.ravel()[i], vals.ravel()[i + 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(x1 > x0, (target - shift - x0) / (x1 - x0), 0)
+
+        return v0 + np.clip(frac, 0, 1) * (v1 - v0)
@@ -0,0 +1,101 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+import pytest
+# loops being tested
+from housing_core import MonthlyBlock, iter_rent_vs_buy, monthly_rates
+from housing_jit import calc_rent_vs_buy_loop, calc_schedule_prepay
+
+# $10,000 at 12% over 1 year with $2,000 additional principal, worked out
+# by hand - level payment of $888.49, interest and balance after every
+# payment
+PAYMENT = 888.4878867834161
+INTEREST = [100.0, 72.11512113216584, 43.95139347565334, 15.506028542575715]
+BALANCE = [7211.512113216584, 4395.139347565334, 1550.6028542575714, 0.0]
+
+
+@pytest.mark.parametrize('use_jit', [False, True])
+def test_schedule_prepay_pays_off_early(use_jit):
+    pay_h, int_h, prin_h, _, out_prin_h = calc_schedule_prepay(
+        10000, 1, 12, extra_pay=2000, use_jit=use_jit)
+
+    np.testing.assert_allclose(int_h[:4], INTEREST)
+    np.testing.assert_allclose(out_prin_h[:4], BALANCE, atol=1e-9)
+    np.testing.assert_allclose(pay_h[:3], PAYMENT + 2000)
+    np.testing.assert_allclose(np.sum(int_h), 231.57254315039486)
+
+    # paid off in the 4th month, nothing is due after
+    assert np.flatnonzero(out_prin_h <= 0)[0] + 1 == 4
+    assert not np.any(pay_h[4:])
+
+
+def test_schedule_prepay_zero_rate():
+    pay_h, int_h, prin_h, _, out_prin_h = calc_schedule_prepay(
+        1200, 1, 0, extra_pay=100)
+
+    # $100 due and $100 extra every month pays off $1,200 in 6 months
+    np.testing.assert_allclose(prin_h[:6], 200)
+    assert not np.any(int_h)
+    assert not np.any(pay_h[6:])
+
+
+def test_schedule_prepay_matches_hand_loop():
+    loan_amt, rate, months, extra = 800000, 6.5 / 1200, 360, 500
+    payment = loan_amt * rate / (1 - (1 + rate)**-months)
+
+    # prepayment schedule - level payment plus the extra, capped at the
+    # balance
+    balance, tot_int, paid = loan_amt, 0.0, None
+    for month in range(months):
+        interest = balance * rate
+        balance -= min(payment - interest + extra, balance)
+        tot_int += interest
+        if balance <= 0:
+            paid = month + 1
+            break
+
+    _, int_h, _, _, out_prin_h = calc_schedule_prepay(loan_amt, 30, 6.5,
+                                                      extra_pay=extra)
+    assert np.flatnonzero(out_prin_h <= 0)[0] + 1 == paid
+    assert np.sum(int_h) == pytest.approx(tot_int, rel=1e-9)
+    assert paid < months
+
+
+def rent_vs_buy_args(yrs, int_rate):
+    return [1e6, 2e5, 30, 500, 300, 1.25, 30, 3000,
+            monthly_rates(np.asarray(int_rate, dtype=float), yrs),
+            monthly_rates(np.full(yrs, 3.0), yrs),
+            monthly_rates(np.full(yrs, 3.0), yrs),
+            monthly_rates(np.full(yrs, 7.0), yrs)]
+
+
+@pytest.mark.parametrize('use_jit', [False, True])
+def test_rent_vs_buy_loop_prepay_matches_schedule(use_jit):
+    # at a fixed rate the loan part follows the prepayment schedule
+    res = calc_rent_vs_buy_loop(*rent_vs_buy_args(30, np.full(30, 6.5)),
+                                extra_pay=500, use_jit=use_jit)
+    _, int_h, prin_h, _, out_prin_h = calc_schedule_prepay(
+        8e5, 30, 6.5, extra_pay=500)
+
+    np.testing.assert_allclose(res['mon_int'], int_h, atol=1e-6)
+    np.testing.assert_allclose(res['mon_prin'], prin_h, atol=1e-6)
+    np.testing.assert_allclose(res['mon_out_prin'], out_prin_h, atol=1e-6)
+
+
+def test_iter_rent_vs_buy_prepay_matches_loop():
+    # rates that change every year re-set the payment due, extra principal
+    # still shortens the loan
+    args = rent_vs_buy_args(30, np.linspace(4, 8, 30))
+    block = calc_rent_vs_buy_loop(*args, extra_pay=500, use_jit=False)
+    rows = list(iter_rent_vs_buy(*args, extra_pay=500))
+
+    for key in ('mon_int', 'mon_prin', 'mon_out_prin', 'mon_worth_rent'):
+        np.testing.assert_allclose([row[key] for row in rows], block[key],
+                                   rtol=1e-9, atol=1e-6)
+    assert block['mon_out_prin'][-1] == 0
+    assert np.flatnonzero(block['mon_out_prin'] <= 0)[0] < 359
+    assert isinstance(block, MonthlyBlock)
@@ -0,0 +1,40 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# simulation being tested
+from housing_core import monthly_rates
+from housing_jit import calc_rent_vs_buy_loop
+from monte_carlo import simulate_paths
+
+PARAMS = {'home_val': 1e6, 'down_pay': 2e5, 'loan_term': 30, 'hoa': 500,
+          'maint': 300, 'prop_tax': 1.25, 'tax_bkt': 30, 'rent': 3000,
+          'yrs': 30, 'int_rate': np.full(30, 6.5),
+          'home_appr': np.full(30, 3.0), 'rent_appr': np.full(30, 3.0),
+          'inv_ret': np.full(30, 7.0)}
+
+
+def test_simulate_paths_with_extra_pay():
+    # without any spread, every path is the entered scenario, including
+    # the additional principal
+    params = dict(PARAMS, extra_pay=500)
+    res = simulate_paths(params, {}, {}, 4)
+    ref = calc_rent_vs_buy_loop(
+        *[params[key] for key in ('home_val', 'down_pay', 'loan_term', 'hoa',
+                                  'maint', 'prop_tax', 'tax_bkt', 'rent')],
+        *[monthly_rates(params[key], 30) for key in
+          ('int_rate', 'home_appr', 'rent_appr', 'inv_ret')],
+        extra_pay=500)
+
+    for key in ('mon_out_prin', 'mon_worth_buy_sell', 'mon_worth_rent'):
+        np.testing.assert_allclose(res[key], np.broadcast_to(
+            ref[key], res[key].shape), rtol=1e-9)
+    assert np.all(res['mon_out_prin'][:, -12:] == 0)
+
+
+def test_simulate_paths_without_extra_pay():
+    res = simulate_paths(dict(PARAMS, extra_pay=0), {}, {}, 2)
+    assert np.all(res['mon_out_prin'][:, -2] > 0)
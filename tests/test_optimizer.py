@@ -0,0 +1,47 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# search being tested
+import optimizer
+
+PARAMS = {'home_val': 1e6, 'down_pay': 2e5, 'loan_term': 30, 'hoa': 500,
+          'maint': 300, 'prop_tax': 1.25, 'tax_bkt': 30, 'rent': 3000,
+          'yrs': 10, 'int_rate': np.full(10, 6.5),
+          'home_appr': np.full(10, 3.0), 'rent_appr': np.full(10, 3.0),
+          'inv_ret': np.full(10, 7.0)}
+
+
+def test_one_new_point_per_step(monkeypatch):
+    # concave objective with its peak off the grid at 1.37 x loan term
+    calls = []
+
+    def evaluate(params, down_pct, loan_term, objective='advantage'):
+        down_pct, loan_term = np.broadcast_arrays(down_pct, loan_term)
+        calls.append(down_pct.shape)
+        return -(down_pct - 1.37 * loan_term)**2
+
+    monkeypatch.setattr(optimizer, 'evaluate', evaluate)
+    terms = (15, 30)
+    res = optimizer.optimize(PARAMS, loan_terms=terms, tol=1e-3)
+
+    # surface, both first inner points, one point a step, the refined point
+    steps = calls[2:-1]
+    assert calls[1] == (2, len(terms))
+    assert len(steps) > 10
+    assert all(shape == (len(terms),) for shape in steps)
+    np.testing.assert_allclose(res['term_down_pct'],
+                               1.37 * np.array(terms), atol=1e-3)
+
+
+def test_matches_fine_grid():
+    terms = np.array([15, 30])
+    res = optimizer.optimize(PARAMS, loan_terms=terms, tol=1e-3)
+
+    fine = np.linspace(0, 100, 10001)
+    val = optimizer.evaluate(PARAMS, fine[None, :], terms[:, None])
+    np.testing.assert_allclose(res['term_value'], val.max(axis=1),
+                               rtol=1e-9)
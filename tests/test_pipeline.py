@@ -0,0 +1,41 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# writer threads
+import threading
+import time
+# pipeline being tested
+from pipeline import render, run_pipeline
+
+
+class Tracker:
+    '''
+    largest number of calls running at the same time
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def __call__(self, *args):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+
+
+def test_images_are_rendered_one_at_a_time():
+    excel, image = Tracker(), Tracker()
+    outputs = [lambda i, res: excel(i, res),
+               lambda i, res: render(image, i, res)]
+
+    n = run_pipeline(range(12), lambda item: item, outputs, n_writers=4)
+
+    assert n == 12
+    assert image.most == 1
+    assert excel.most > 1
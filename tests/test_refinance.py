@@ -0,0 +1,43 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+import pytest
+# refinance grid being tested
+from housing_core import calc_schedule
+from refinance import refinance_grid
+
+
+def test_scalar_inputs():
+    grid = refinance_grid(8e5, 30, 7, 12, 5, 5000)
+
+    assert grid['breakeven'].shape == (1, 1, 1)
+    assert grid['lifetime_savings'].shape == (1, 1, 1)
+
+
+def test_out_of_range_months():
+    for month in (-1, 360):
+        with pytest.raises(ValueError):
+            refinance_grid(8e5, 30, 7, [0, month], [5], [5000])
+
+
+def test_lifetime_savings_are_remaining_payments():
+    # a 15 year loan at 5% after a year of a 30 year loan at 7% - the
+    # payments still due on the old loan against all the new payments
+    pay_h, _, _, _, out_prin_h = calc_schedule(8e5, 30, 7)
+    new_pay, _, _, _, _ = calc_schedule(out_prin_h[11], 15, 5)
+
+    grid = refinance_grid(8e5, 30, 7, 12, 5, 5000, new_years=15)
+    assert grid['lifetime_savings'][0, 0, 0] == pytest.approx(
+        np.sum(pay_h[12:]) - np.sum(new_pay) - 5000)
+
+
+def test_breakeven_after_new_term():
+    # 10 months before the end of the loan, the small monthly savings would
+    # take longer than the 10 months left to pay back the closing costs
+    grid = refinance_grid(8e5, 30, 7, [12, 350], 6.9, 5000)
+    assert np.isfinite(grid['breakeven'][0, 0, 0])
+    assert np.isinf(grid['breakeven'][1, 0, 0])
@@ -0,0 +1,43 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+import pytest
+# downsampling being tested
+from rent_vs_buy import downsample_lttb
+
+
+@pytest.mark.parametrize('n, n_out', [(600, 100), (6000, 2000), (10, 9),
+                                      (1000, 3)])
+def test_downsample_lttb_keeps_ends(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.arange(1, n + 1)
+    y = np.cumsum(rng.normal(size=n))
+
+    x_out, y_out = downsample_lttb(x, y, n_out)
+
+    # exactly n_out points of the series, in order, with both ends kept
+    assert len(x_out) == len(y_out) == n_out
+    assert x_out[0] == x[0] and x_out[-1] == x[-1]
+    assert y_out[0] == y[0] and y_out[-1] == y[-1]
+    assert np.all(np.diff(x_out) > 0)
+    np.testing.assert_array_equal(y_out, y[x_out.astype(int) - 1])
+
+
+def test_downsample_lttb_keeps_peak():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[537] = 10
+
+    _, y_out = downsample_lttb(x, y, 50)
+    assert y_out.max() == 10
+
+
+def test_downsample_lttb_short_series():
+    x, y = np.arange(5), np.arange(5) ** 2
+    x_out, y_out = downsample_lttb(x, y, 2000)
+    np.testing.assert_array_equal(x_out, x)
+    np.testing.assert_array_equal(y_out, y)
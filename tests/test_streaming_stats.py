@@ -0,0 +1,83 @@
+__authors__ = 'Arun Manohar'
+__license__ = '3-clause BSD'
+__maintainer__ = 'Arun Manohar'
+__email__ = 'arunmano121@outlook.com'
+
+# numpy for array tasks
+import numpy as np
+# sketches being tested
+from streaming_stats import QuantileSketch, RunningMoments
+
+QUANTILES = np.array([0.05, 0.5, 0.95])
+
+
+def batches(seed, n_batches=4, n=1000, months=24):
+    # skewed values with a different spread every month
+    rng = np.random.default_rng(seed)
+    scale = np.linspace(1, 5, months)
+    return [rng.lognormal(0, 1, (n, months)) * scale - rng.normal(3, 1, (n, 1))
+            for _ in range(n_batches)]
+
+
+def test_quantiles_after_merges():
+    # every worker sketches its own batches, and the sketches are merged in
+    # a chain and in a tree
+    data = [batches(seed) for seed in range(8)]
+    sketches = []
+    for worker in data:
+        sketch = QuantileSketch(24)
+        for batch in worker:
+            sketch.update(batch)
+        sketches.append(sketch)
+    while len(sketches) > 1:
+        sketches[0].merge(sketches.pop())
+        if len(sketches) > 2:
+            sketches[1].merge(sketches.pop())
+            sketches[0].merge(sketches.pop(1))
+    sketch = sketches[0]
+
+    values = np.sort(np.concatenate([b for worker in data for b in worker]),
+                     axis=0)
+    est = sketch.quantile(QUANTILES)
+    ref = np.percentile(values, 100 * QUANTILES, axis=0)
+
+    # the estimates fall within 0.5% in rank of the true quantiles
+    rank = np.array([[np.searchsorted(values[:, j], est[i, j]) / len(values)
+                      for j in range(24)] for i in range(3)])
+    assert np.all(np.abs(rank - QUANTILES[:, None]) < 0.005)
+    spread = ref[2] - ref[0]
+    assert np.all(np.abs(est - ref) < 0.01 * spread)
+
+    # memory stays bounded by the compression
+    assert sketch.means.shape[1] <= 200
+    assert np.all(sketch.weights.sum(axis=1) == len(values))
+
+
+def test_quantile_shapes_and_ends():
+    sketch = QuantileSketch(3)
+    batch = np.arange(30, dtype=float).reshape(10, 3)
+    sketch.update(batch)
+
+    assert sketch.quantile(0.5).shape == (3,)
+    assert sketch.quantile([0.05, 0.95]).shape == (2, 3)
+    np.testing.assert_allclose(sketch.quantile(0), batch.min(axis=0))
+    np.testing.assert_allclose(sketch.quantile(1), batch.max(axis=0))
+    # few values are kept as they are
+    np.testing.assert_allclose(sketch.quantile(0.5),
+                               np.percentile(batch, 50, axis=0))
+
+
+def test_running_moments_merge():
+    data = batches(0, n_batches=3)
+    moments = RunningMoments(24)
+    for batch in data[:2]:
+        moments.update(batch)
+    other = RunningMoments(24)
+    other.update(data[2])
+    moments.merge(other)
+
+    values = np.concatenate(data)
+    np.testing.assert_allclose(moments.mean, values.mean(axis=0))
+    np.testing.assert_allclose(moments.var, values.var(axis=0, ddof=1))
+    np.testing.assert_allclose(moments.min, values.min(axis=0))
+    assert moments.count == len(values)